@@ -3,13 +3,25 @@ import random as rand_module
 import time
 import uuid
 
+from .resolution_buckets import (
+    MULTIPLES,
+    PRESET_NAMES,
+    filter_buckets,
+    get_bucket_table,
+    nearest_bucket,
+    resolve_spec,
+)
+from .step_cursors import STEP_CURSORS
+
 class ICHIS_Aspect_Ratio_Plus:
     """
-    A node that provides a selection of common SDXL-optimized aspect ratios with advanced control options.
+    A node that provides a selection of common aspect ratios with advanced control options,
+    sized for SDXL by default or for another model family's resolution buckets.
     It outputs width, height, and an empty latent tensor.
     """
     
-    # Class variable to keep track of the current step index for all instances
+    # Step cursor for direct calls without a unique_id; graph nodes keep
+    # their own persisted cursor in STEP_CURSORS
     step_index = 0
     # Class variable to track the last time the step was updated
     last_step_time = 0
@@ -43,7 +55,16 @@ class ICHIS_Aspect_Ratio_Plus:
                 "include_16_9": ("BOOLEAN", {"default": True}),
                 "include_21_9": ("BOOLEAN", {"default": True}),
                 "reset_step": ("BOOLEAN", {"default": False}),
-            }
+                # Resolution buckets: a model preset or a custom spec
+                "model_preset": (PRESET_NAMES, {"default": "SDXL"}),
+                "base_resolution": ("INT", {"default": 1024, "min": 256, "max": 4096, "step": 64}),
+                "multiple_of": (MULTIPLES, {"default": "64"}),
+                "custom_ratios": ("STRING", {"default": "", "placeholder": "custom: ratios like 1:1, 4:3, 16:9 (empty = the ratios above)"}),
+                "latent_channels": ("INT", {"default": 4, "min": 1, "max": 64}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            },
         }
     
     RETURN_TYPES = ("INT", "INT", "LATENT", "STRING", "INT")
@@ -64,73 +85,64 @@ class ICHIS_Aspect_Ratio_Plus:
             return f"{current_time}_{uuid.uuid4()}"
              
         return None
+
+    def _advance_step(self, unique_id, signature, size, reset):
+        if unique_id:
+            return STEP_CURSORS.advance(f"aspect_ratio_plus:{unique_id}", signature, size, 1, reset)
+        position = 0 if reset else self.step_index % size
+        self.step_index = (position + 1) % size
+        return position
+
+    def _peek_step(self, unique_id, signature, reset):
+        if unique_id:
+            key = f"aspect_ratio_plus:{unique_id}"
+            if reset:
+                STEP_CURSORS.reset(key)
+            return STEP_CURSORS.peek(key, signature)
+        if reset:
+            self.step_index = 0
+        return self.step_index
     
     def get_aspect_ratio(self, aspect_ratio, upscale=1.0, batch_size=1, mode="normal", 
                         size_mode="all", seed=0, 
                         include_1_1=True, include_3_4=True, include_5_8=True, 
                         include_9_16=True, include_9_21=True, include_3_2=True, 
                         include_16_9=True, include_21_9=True,
-                        reset_step=False):
+                        reset_step=False, model_preset="SDXL", base_resolution=1024,
+                        multiple_of="64", custom_ratios="", latent_channels=4, unique_id=None):
         
-        step_to_use = ICHIS_Aspect_Ratio_Plus.step_index
-        next_step_index_internal = step_to_use # Default next step
-
-        # --- Handle Reset ---        
-        if reset_step:
-            step_to_use = 0
-            next_step_index_internal = 1 # Set next step after reset
-            ICHIS_Aspect_Ratio_Plus.step_index = 0 # Reset to 0
-            
-        # Mapping of options to dimensions
-        aspect_ratios = {
-            "1:1 square 1024x1024": (1024, 1024),
-            "3:4 portrait 896x1152": (896, 1152),
-            "5:8 portrait 832x1216": (832, 1216),
-            "9:16 portrait 768x1344": (768, 1344),
-            "9:21 portrait 640x1536": (640, 1536),
-            "3:2 landscape 1216x832": (1216, 832),
-            "16:9 landscape 1344x768": (1344, 768),
-            "21:9 landscape 1536x640": (1536, 640),
-        }
+        # Bucket tables are built once per preset/custom spec and cached
+        spec = resolve_spec(model_preset, base_resolution, multiple_of, custom_ratios, latent_channels)
+        table = get_bucket_table(spec)
         
-        # Map between aspect ratio names and include toggles
+        # Map between ratios and include toggles
         include_map = {
-            "1:1 square 1024x1024": include_1_1,
-            "3:4 portrait 896x1152": include_3_4,
-            "5:8 portrait 832x1216": include_5_8,
-            "9:16 portrait 768x1344": include_9_16,
-            "9:21 portrait 640x1536": include_9_21,
-            "3:2 landscape 1216x832": include_3_2,
-            "16:9 landscape 1344x768": include_16_9,
-            "21:9 landscape 1536x640": include_21_9,
+            "1:1": include_1_1,
+            "3:4": include_3_4,
+            "5:8": include_5_8,
+            "9:16": include_9_16,
+            "9:21": include_9_21,
+            "3:2": include_3_2,
+            "16:9": include_16_9,
+            "21:9": include_21_9,
         }
+        excluded = frozenset(ratio for ratio, include in include_map.items() if not include)
         
-        # Store the selected aspect ratio name for output
-        selected_ratio = aspect_ratio
+        # The manually selected ratio ("3:4 portrait 896x1152" -> "3:4") in this table
+        manual_bucket = nearest_bucket(table, aspect_ratio.split(" ", 1)[0])
         
-        # Filter aspect ratios based on size_mode and individual toggles
-        filtered_ratios = {}
+        # Store the selected aspect ratio name for output
+        selected_ratio = manual_bucket.name
         
-        for key, value in aspect_ratios.items():
-            # Skip if toggle is set to False
-            if not include_map[key]:
-                continue
-                
-            # Apply size_mode filtering
-            if size_mode == "portrait only" and "portrait" not in key and "square" not in key:
-                continue
-            elif size_mode == "landscape only" and "landscape" not in key and "square" not in key:
-                continue
-                
-            # Include this ratio
-            filtered_ratios[key] = value
+        # Filter aspect ratios based on size_mode and individual toggles (cached)
+        ratio_keys = filter_buckets(spec, excluded, size_mode)
         
         # In case all toggles are off, use the manually selected aspect ratio
-        if not filtered_ratios:
-            filtered_ratios = {aspect_ratio: aspect_ratios[aspect_ratio]}
+        if not ratio_keys:
+            ratio_keys = (manual_bucket.name,)
         
-        ratio_keys = sorted(filtered_ratios.keys())
-        max_index = len(ratio_keys) - 1
+        # A node's cursor belongs to the ratio list it steps through
+        signature = "|".join(ratio_keys)
         
         # --- Determine selected ratio based on mode ---        
         if mode == "random":
@@ -139,22 +151,20 @@ class ICHIS_Aspect_Ratio_Plus:
                 rand_module.seed(seed)
                 
             selected_ratio = rand_module.choice(ratio_keys)
-            # Keep internal step_index unchanged in random mode
-        elif mode == "step":
-            # Use the index determined above (either from reset or internal state)
-            step_to_use = step_to_use % len(ratio_keys)
+        
+        if mode == "step":
+            # Take this node's cursor (0 after a reset) and advance it atomically
+            step_to_use = self._advance_step(unique_id, signature, len(ratio_keys), reset_step)
             selected_ratio = ratio_keys[step_to_use]
-            
-            # Calculate and store the next step for the subsequent run
             next_step_index_internal = (step_to_use + 1) % len(ratio_keys)
-            if not reset_step: # Only update if we weren't resetting
-                 ICHIS_Aspect_Ratio_Plus.step_index = next_step_index_internal
-            # If we reset, the index is already set to 0 
-            
-        # else mode == "normal", use the manually selected aspect_ratio
+        else:
+            # Keep the step cursor unchanged outside step mode
+            # (normal mode uses the manually selected aspect_ratio)
+            next_step_index_internal = self._peek_step(unique_id, signature, reset_step)
             
         # Get dimensions for the selected ratio
-        width, height = aspect_ratios[selected_ratio]
+        bucket = table.by_name[selected_ratio]
+        width, height = bucket.width, bucket.height
         
         # Apply upscaling
         if upscale != 1.0:
@@ -162,7 +172,7 @@ class ICHIS_Aspect_Ratio_Plus:
             height = int(height * upscale)
         
         # Create empty latent tensor
-        channels = 4
+        channels = spec.latent_channels
         latent_height = height // 8
         latent_width = width // 8
         tensor = torch.zeros([batch_size, channels, latent_height, latent_width])
@@ -0,0 +1,202 @@
+"""Memory-bounded "seen before?" filters for canonicalised tag combinations."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+COMBINATION_SEPARATOR = "\x1f"
+DIGEST_SIZE = 16
+# Memory of one digest object held in the exact set (the set's own table is
+# measured with sys.getsizeof)
+_DIGEST_OBJECT_BYTES = sys.getsizeof(bytes(DIGEST_SIZE))
+
+
+def combination_digest(tags: Iterable[str]) -> bytes:
+    """Return a 16-byte digest of the tag combination, independent of tag order."""
+    canonical = COMBINATION_SEPARATOR.join(sorted(tags))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def _hash_pair(digest: bytes) -> Tuple[int, int]:
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return h1, h2
+
+
+def bloom_num_bits(capacity: int, error_rate: float) -> int:
+    """Bits of an optimally sized Bloom filter for ``capacity`` items at ``error_rate``."""
+    ln2 = math.log(2)
+    return max(8, int(math.ceil(-capacity * math.log(error_rate) / (ln2 * ln2))))
+
+
+def bloom_capacity_for(max_bytes: int, error_rate: float) -> int:
+    """Largest capacity whose Bloom filter at ``error_rate`` fits in ``max_bytes``."""
+    ln2 = math.log(2)
+    capacity = max(1, int(max_bytes * 8 * ln2 * ln2 / -math.log(error_rate)))
+    while capacity > 1 and (bloom_num_bits(capacity, error_rate) + 7) // 8 > max_bytes:
+        capacity -= 1
+    return capacity
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0) -> None:
+        self.capacity = max(1, int(capacity))
+        self.error_rate = min(max(float(error_rate), 1e-12), 0.5)
+        ln2 = math.log(2)
+        self.num_bits = bloom_num_bits(self.capacity, self.error_rate)
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * ln2)))
+        size = (self.num_bits + 7) // 8
+        self.bits = bits if bits is not None and len(bits) == size else bytearray(size)
+        self.count = count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    def _positions(self, digest: bytes) -> Iterable[int]:
+        # Kirsch-Mitzenmacher double hashing
+        h1, h2 = _hash_pair(digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(digest))
+
+    def add(self, digest: bytes) -> None:
+        bits = self.bits
+        for p in self._positions(digest):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class CombinationFilter:
+    """Remember which tag combinations have already been emitted.
+
+    Digests are kept in an exact set until ``exact_limit`` entries (or until
+    the set's real memory reaches ``max_bytes``), then moved into a scalable
+    Bloom filter: each new slice doubles capacity and halves its error rate so
+    the compound false-positive rate stays near ``error_rate``. A slice is
+    never sized beyond ``max_bytes``, and once the slices together exceed it
+    the oldest slice is dropped, trading long-term memory for a hard memory
+    bound.
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(
+        self,
+        error_rate: float = 0.001,
+        exact_limit: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.error_rate = min(max(float(error_rate), 1e-9), 0.5)
+        self.exact_limit = max(0, int(exact_limit))
+        self.max_bytes = max(1024, int(max_bytes))
+        self._exact: Optional[Set[bytes]] = set()
+        self._slices: List[BloomFilter] = []
+
+    def __len__(self) -> int:
+        if self._exact is not None:
+            return len(self._exact)
+        return sum(s.count for s in self._slices)
+
+    @property
+    def is_exact(self) -> bool:
+        return self._exact is not None
+
+    @property
+    def nbytes(self) -> int:
+        if self._exact is not None:
+            return sys.getsizeof(self._exact) + len(self._exact) * _DIGEST_OBJECT_BYTES
+        return sum(s.nbytes for s in self._slices)
+
+    def __contains__(self, tags: Iterable[str]) -> bool:
+        digest = combination_digest(tags)
+        if self._exact is not None:
+            return digest in self._exact
+        return any(digest in s for s in self._slices)
+
+    def _new_slice(self) -> BloomFilter:
+        index = len(self._slices)
+        capacity = max(self.exact_limit, 1024) * (self.GROWTH ** index)
+        # First slice takes half the error budget; the geometric series sums to error_rate
+        error = self.error_rate * (1 - self.TIGHTENING) * (self.TIGHTENING ** index)
+        # A single slice must fit in max_bytes on its own
+        capacity = min(capacity, bloom_capacity_for(self.max_bytes, error))
+        return BloomFilter(capacity, error)
+
+    def _add_digest(self, digest: bytes) -> None:
+        if not self._slices or self._slices[-1].full:
+            self._slices.append(self._new_slice())
+            while len(self._slices) > 1 and self.nbytes > self.max_bytes:
+                self._slices.pop(0)
+        self._slices[-1].add(digest)
+
+    def add(self, tags: Iterable[str]) -> None:
+        digest = combination_digest(tags)
+        if self._exact is not None:
+            self._exact.add(digest)
+            if len(self._exact) > self.exact_limit or self.nbytes > self.max_bytes:
+                pending, self._exact = self._exact, None
+                for item in pending:
+                    self._add_digest(item)
+            return
+        self._add_digest(digest)
+
+    def to_bytes(self) -> bytes:
+        """Encode as a JSON header line followed by the raw digests or Bloom bits."""
+        header: Dict[str, object] = {
+            "error_rate": self.error_rate,
+            "exact_limit": self.exact_limit,
+            "max_bytes": self.max_bytes,
+        }
+        if self._exact is not None:
+            header["exact"] = len(self._exact)
+            body = b"".join(sorted(self._exact))
+        else:
+            header["slices"] = [
+                {"capacity": s.capacity, "error_rate": s.error_rate, "count": s.count, "nbytes": s.nbytes}
+                for s in self._slices
+            ]
+            body = b"".join(bytes(s.bits) for s in self._slices)
+        return json.dumps(header, sort_keys=True).encode("utf-8") + b"\n" + body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CombinationFilter":
+        head, _, body = data.partition(b"\n")
+        header = json.loads(head.decode("utf-8"))
+        if not isinstance(header, dict):
+            raise ValueError("invalid combination filter header")
+        filt = cls(
+            float(header.get("error_rate", 0.001)),
+            int(header.get("exact_limit", 10000)),
+            int(header.get("max_bytes", 64 * 1024 * 1024)),
+        )
+        if "slices" in header:
+            filt._exact = None
+            offset = 0
+            for meta in header.get("slices") or []:
+                size = int(meta.get("nbytes", 0))
+                bits = bytearray(body[offset:offset + size])
+                offset += size
+                filt._slices.append(BloomFilter(
+                    int(meta.get("capacity", 1)),
+                    float(meta.get("error_rate", 0.001)),
+                    bits=bits,
+                    count=int(meta.get("count", 0)),
+                ))
+        else:
+            filt._exact = {body[i:i + DIGEST_SIZE] for i in range(0, len(body), DIGEST_SIZE)}
+        return filt
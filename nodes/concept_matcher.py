@@ -0,0 +1,262 @@
+"""Multi-pattern concept matching used by ICHIS Extract Tags."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from collections import OrderedDict, deque
+from typing import Dict, List, Sequence, Tuple
+
+from .fuzzy_index import DeletionIndex
+from .prompt_tokenizer import tokenize_prompt
+
+# Below this many concepts a plain ``in`` test per concept (implemented in C)
+# beats walking the automaton character by character in Python.
+AUTOMATON_MIN_CONCEPTS = 32
+MATCHER_CACHE_SIZE = 64
+MATCH_MODES = ["substring", "word", "tag", "fuzzy"]
+# Words shorter than this only match exactly in fuzzy mode ("red" vs "bed")
+FUZZY_MIN_LENGTH = 4
+FUZZY_MEMO_SIZE = 65536
+
+# Letters and digits; underscores, hyphens and punctuation separate words
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def parse_concepts(concepts: str) -> List[str]:
+    """Split concepts on newlines and commas, strip and lower-case them."""
+    concept_list: List[str] = []
+    for line in concepts.split("\n"):
+        concept_list.extend(c.strip().lower() for c in line.split(",") if c.strip())
+    return concept_list
+
+
+def split_segments(text: str) -> List[str]:
+    """Split a prompt on commas and strip each segment."""
+    return [segment.strip() for segment in text.split(",")]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens of ``text``."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class AhoCorasick:
+    """Aho–Corasick automaton over a fixed set of patterns.
+
+    Built once in O(total pattern length); ``search`` then decides whether a
+    text contains any pattern in a single left-to-right pass, independent of
+    how many patterns there are.
+    """
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+        for pattern_id, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(())
+                state = nxt
+            outputs[state] += (pattern_id,)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                # Inherit matches that end here through the suffix link
+                outputs[nxt] += outputs[fail[nxt]]
+        self.patterns = list(patterns)
+        self._goto = goto
+        self._fail = fail
+        self._outputs = outputs
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def search(self, text: str) -> bool:
+        """Return True if any pattern occurs in ``text``."""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for ch in text:
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if outputs[state]:
+                return True
+        return False
+
+
+class ConceptMatcher:
+    """Case-insensitive "segment contains a concept" test.
+
+    ``substring`` mode is equivalent to ``any(c in segment.lower() for c in
+    concepts)``; large concept lists are compiled into an ``AhoCorasick``
+    automaton. ``word`` mode only matches concepts on whole-word boundaries
+    (``red`` no longer matches ``tired``) and ``tag`` mode requires the whole
+    segment to equal a concept. Both tokenize each segment once and look its
+    words up in an inverted index, so their cost does not grow with the
+    number of concepts. ``fuzzy`` mode accepts any run of words within
+    ``max_distance`` edits of a concept (``blond`` matches ``blonde-haired``),
+    using a symmetric-deletion index so a lookup never compares against the
+    whole concept list.
+    """
+
+    def __init__(self, concepts: Sequence[str], mode: str = "substring", max_distance: int = 1) -> None:
+        self.concepts = list(dict.fromkeys(concepts))
+        self.mode = mode if mode in MATCH_MODES else "substring"
+        self.max_distance = max(0, int(max_distance))
+        self._automaton = None
+        # first token -> remaining tokens of every concept starting with it
+        self._index: Dict[str, List[Tuple[str, ...]]] = {}
+        self._whole: set = set()
+        if self.mode == "substring":
+            if len(self.concepts) >= AUTOMATON_MIN_CONCEPTS:
+                self._automaton = AhoCorasick(self.concepts)
+            return
+        if self.mode == "fuzzy":
+            phrases = {" ".join(tokenize(concept)) for concept in self.concepts} - {""}
+            self._whole = phrases
+            self._window_sizes = sorted({phrase.count(" ") + 1 for phrase in phrases})
+            self._fuzzy = DeletionIndex(
+                (p for p in sorted(phrases) if len(p) >= FUZZY_MIN_LENGTH), self.max_distance
+            )
+            self._memo: Dict[str, bool] = {}
+            return
+        for concept in self.concepts:
+            tokens = tokenize(concept)
+            if not tokens:
+                continue
+            if self.mode == "tag":
+                self._whole.add(" ".join(tokens))
+            else:
+                tails = self._index.setdefault(tokens[0], [])
+                tail = tuple(tokens[1:])
+                if tail not in tails:
+                    tails.append(tail)
+
+    def _matches_words(self, tokens: List[str]) -> bool:
+        index = self._index
+        for i, token in enumerate(tokens):
+            tails = index.get(token)
+            if tails is None:
+                continue
+            for tail in tails:
+                if not tail or tuple(tokens[i + 1:i + 1 + len(tail)]) == tail:
+                    return True
+        return False
+
+    def _matches_fuzzy(self, tokens: List[str]) -> bool:
+        memo = self._memo
+        for size in self._window_sizes:
+            for i in range(len(tokens) - size + 1):
+                phrase = " ".join(tokens[i:i + size])
+                hit = memo.get(phrase)
+                if hit is None:
+                    hit = phrase in self._whole or (
+                        len(phrase) >= FUZZY_MIN_LENGTH
+                        and self._fuzzy.contains_near(phrase)
+                    )
+                    if len(memo) >= FUZZY_MEMO_SIZE:
+                        memo.clear()
+                    memo[phrase] = hit
+                if hit:
+                    return True
+        return False
+
+    def matches(self, segment: str) -> bool:
+        if self.mode == "fuzzy":
+            return self._matches_fuzzy(tokenize(segment))
+        if self.mode == "word":
+            return self._matches_words(tokenize(segment))
+        if self.mode == "tag":
+            return " ".join(tokenize(segment)) in self._whole
+        segment_lower = segment.lower()
+        if self._automaton is not None:
+            return self._automaton.search(segment_lower)
+        return any(concept in segment_lower for concept in self.concepts)
+
+    def filter(self, segments: Sequence[str]) -> List[str]:
+        return [segment for segment in segments if self.matches(segment)]
+
+
+class MatcherCache:
+    """Bounded LRU of compiled ``ConceptMatcher`` objects.
+
+    Keyed by a hash of the raw concepts string and the matching options, so
+    repeated executions with static concepts skip parsing and compilation.
+    """
+
+    def __init__(self, maxsize: int = MATCHER_CACHE_SIZE) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self._entries: "OrderedDict[str, ConceptMatcher]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(concepts: str, **options: object) -> str:
+        hasher = hashlib.sha1(concepts.encode("utf-8"))
+        for name in sorted(options):
+            hasher.update(f"\x1f{name}={options[name]!r}".encode("utf-8"))
+        return hasher.hexdigest()
+
+    def get(self, concepts: str, **options: object) -> ConceptMatcher:
+        key = self.key(concepts, **options)
+        matcher = self._entries.get(key)
+        if matcher is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return matcher
+        self.misses += 1
+        matcher = ConceptMatcher(parse_concepts(concepts), **options)
+        self._entries[key] = matcher
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return matcher
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+MATCHER_CACHE = MatcherCache()
+
+
+def get_concept_matcher(concepts: str, mode: str = "substring", max_distance: int = 1) -> ConceptMatcher:
+    """Return the cached matcher for ``concepts`` and the matching options."""
+    if mode == "fuzzy":
+        return MATCHER_CACHE.get(concepts, mode=mode, max_distance=max(0, int(max_distance)))
+    return MATCHER_CACHE.get(concepts, mode=mode)
+
+
+def extract_matches(text: str, matcher: ConceptMatcher, prompt_syntax: bool = False) -> List[str]:
+    """Segments of ``text`` that match ``matcher``, as written in the prompt.
+
+    With ``prompt_syntax`` the prompt is split by ``tokenize_prompt`` (groups
+    such as ``(red dress, lace:1.2)`` stay whole and are matched on their
+    plain text); otherwise every comma splits.
+    """
+    if prompt_syntax:
+        return [segment.text for segment in tokenize_prompt(text) if matcher.matches(segment.plain)]
+    return matcher.filter(split_segments(text))
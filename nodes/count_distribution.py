@@ -0,0 +1,129 @@
+"""Distributions for how many tags a sampled prompt should contain."""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+COUNT_DISTRIBUTIONS = ["uniform", "poisson", "normal", "histogram"]
+
+
+def parse_histogram(value: str) -> Tuple[Tuple[int, float], ...]:
+    """Parse ``"count:weight"`` pairs separated by commas or newlines.
+
+    Bare weights (``"1, 4, 9"``) are assigned to counts 0, 1, 2, ... in order,
+    which makes it easy to paste a caption-length histogram. Invalid or
+    negative entries are skipped.
+    """
+    if not value:
+        return ()
+    entries = []
+    position = 0
+    for fragment in value.replace("\n", ",").split(","):
+        fragment = fragment.strip()
+        if not fragment:
+            continue
+        try:
+            if ":" in fragment:
+                count_str, weight_str = fragment.split(":", 1)
+                count = int(count_str.strip())
+                weight = float(weight_str.strip())
+            else:
+                count = position
+                weight = float(fragment)
+        except ValueError:
+            continue
+        position = count + 1
+        if count >= 0 and weight > 0 and math.isfinite(weight):
+            entries.append((count, weight))
+    return tuple(entries)
+
+
+@lru_cache(maxsize=512)
+def count_table(
+    distribution: str,
+    lower: int,
+    upper: int,
+    mean: float = 0.0,
+    stddev: float = 1.0,
+    histogram: Tuple[Tuple[int, float], ...] = (),
+) -> Optional[Tuple[float, ...]]:
+    """Cumulative weights for counts ``lower..upper`` (``None`` means uniform).
+
+    Distributions are truncated to the range and renormalised implicitly by
+    ``random.choices``. Falls back to uniform when no weight lands in range.
+    """
+    if distribution == "uniform" or upper < lower:
+        return None
+    counts = range(lower, upper + 1)
+    if distribution == "poisson":
+        lam = max(mean, 1e-9)
+        log_lam = math.log(lam)
+        logs = [k * log_lam - lam - math.lgamma(k + 1) for k in counts]
+        peak = max(logs)
+        weights = [math.exp(v - peak) for v in logs]
+    elif distribution == "normal":
+        sigma = max(stddev, 1e-9)
+        weights = [math.exp(-0.5 * ((k - mean) / sigma) ** 2) for k in counts]
+    elif distribution == "histogram":
+        lookup = {}
+        for count, weight in histogram:
+            lookup[count] = lookup.get(count, 0.0) + weight
+        weights = [lookup.get(k, 0.0) for k in counts]
+    else:
+        return None
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    if total <= 0.0:
+        return None
+    return tuple(cumulative)
+
+
+class CountDistribution:
+    """Draw prompt lengths from a (truncated) distribution.
+
+    Tables are precomputed once per ``(distribution, lower, upper, params)``
+    and cached, and ``draw`` produces all ``n`` counts with a single
+    ``rng.choices`` call.
+    """
+
+    def __init__(
+        self,
+        distribution: str = "uniform",
+        mean: float = 3.0,
+        stddev: float = 1.0,
+        histogram: str = "",
+    ) -> None:
+        self.distribution = distribution if distribution in COUNT_DISTRIBUTIONS else "uniform"
+        self.mean = float(mean)
+        self.stddev = float(stddev)
+        self.histogram = parse_histogram(histogram) if self.distribution == "histogram" else ()
+
+    def table(self, lower: int, upper: int) -> Optional[Tuple[float, ...]]:
+        return count_table(self.distribution, lower, upper, self.mean, self.stddev, self.histogram)
+
+    def draw(self, rng, lower: int, upper: int, n: int = 1) -> List[int]:
+        if upper < lower:
+            return [0] * n
+        table = self.table(lower, upper)
+        if table is None:
+            if n == 1:
+                # Matches the historical randint() call so stored seeds replay
+                return [rng.randint(lower, upper)]
+            return rng.choices(range(lower, upper + 1), k=n)
+        return rng.choices(range(lower, upper + 1), cum_weights=table, k=n)
+
+
+@lru_cache(maxsize=64)
+def get_count_distribution(
+    distribution: str = "uniform",
+    mean: float = 3.0,
+    stddev: float = 1.0,
+    histogram: str = "",
+) -> CountDistribution:
+    """Cached ``CountDistribution`` so repeated executions reuse parsed settings."""
+    return CountDistribution(distribution, mean, stddev, histogram)
@@ -1,5 +1,12 @@
-import re
-from typing import List
+from typing import List, Sequence
+
+from .concept_matcher import (
+    MATCH_MODES,
+    MATCHER_CACHE,
+    ConceptMatcher,
+    extract_matches,
+    get_concept_matcher,
+)
 
 class ICHIS_Extract_Tags:
     """
@@ -13,39 +20,74 @@ class ICHIS_Extract_Tags:
                 "text": ("STRING", {"multiline": True}),
                 "concepts": ("STRING", {"multiline": True, "placeholder": "Enter tags separated by commas or new lines"}),
                 "delimiter": ("STRING", {"default": ", ", "placeholder": "Enter delimiter to join matches"}),
-            }
+            },
+            "optional": {
+                "match_mode": (MATCH_MODES, {"default": "substring"}),
+                "prompt_syntax": ("BOOLEAN", {"default": False}),
+                "max_distance": ("INT", {"default": 1, "min": 0, "max": 2}),
+                "texts": ("LIST", {}),
+                "debug": ("BOOLEAN", {"default": False}),
+            },
         }
     
-    RETURN_TYPES = ("STRING",)
-    RETURN_NAMES = ("extracted_text",)
+    RETURN_TYPES = ("STRING", "LIST")
+    RETURN_NAMES = ("extracted_text", "extracted_list")
     FUNCTION = "extract_text"
     CATEGORY = "ICHIS"
+
+    @classmethod
+    def clear_cache(cls):
+        MATCHER_CACHE.clear()
+
+    def _extract_batch(
+        self,
+        texts: Sequence[str],
+        matcher: ConceptMatcher,
+        delimiter: str,
+        prompt_syntax: bool,
+    ) -> List[str]:
+        # Matching is pure Python and holds the GIL, so a thread pool would only
+        # add overhead; dataset-scale runs belong in Extract Tags Files
+        return [delimiter.join(extract_matches(text, matcher, prompt_syntax)) for text in texts]
     
-    def extract_text(self, text: str, concepts: str, delimiter: str) -> tuple:
+    def extract_text(
+        self,
+        text: str,
+        concepts: str,
+        delimiter: str,
+        match_mode: str = "substring",
+        prompt_syntax: bool = False,
+        max_distance: int = 1,
+        texts=None,
+        debug: bool = False,
+    ) -> tuple:
         # Default delimiter to ", " if none provided
         if not delimiter:
             delimiter = ", "
-        # Split input text by commas and clean up whitespace
-        segments = [segment.strip() for segment in text.split(',')]
-        
-        # Split concepts by newlines and commas, and clean up whitespace
-        # First split by newlines, then by commas if any
-        concept_lines = concepts.split('\n')
-        concept_list = []
-        for line in concept_lines:
-            # Split each line by commas if they exist
-            concepts_in_line = [concept.strip().lower() for concept in line.split(',') if concept.strip()]
-            concept_list.extend(concepts_in_line)
-        
-        # Find segments that match any of the concepts
-        matching_segments = []
-        for segment in segments:
-            # Check if any concept is in the segment (case-insensitive)
-            segment_lower = segment.lower()
-            if any(concept in segment_lower for concept in concept_list):
-                matching_segments.append(segment)
-        
+
+        # Parsed and compiled concepts are cached across executions
+        matcher = get_concept_matcher(concepts, match_mode, max_distance)
+
+        if texts:
+            # Batch mode: one extracted string per input text, same compiled matcher
+            items = [item if isinstance(item, str) else str(item) for item in texts]
+            results = self._extract_batch(items, matcher, delimiter, prompt_syntax)
+            if debug:
+                stats = MATCHER_CACHE.stats()
+                print(f"[Extract_Tags] mode={matcher.mode}, concepts={len(matcher.concepts)}, texts={len(items)}")
+                print(f"[Extract_Tags] Matcher cache: hits={stats['hits']}, misses={stats['misses']}, size={stats['size']}")
+            return ("\n".join(results), results)
+
+        # Split the prompt on top-level commas (or every comma without
+        # prompt_syntax) and keep segments containing any concept
+        matching_segments = extract_matches(text, matcher, prompt_syntax)
+
+        if debug:
+            stats = MATCHER_CACHE.stats()
+            print(f"[Extract_Tags] mode={matcher.mode}, concepts={len(matcher.concepts)}, prompt_syntax={prompt_syntax}, matched={len(matching_segments)}")
+            print(f"[Extract_Tags] Matcher cache: hits={stats['hits']}, misses={stats['misses']}, size={stats['size']}")
+
         # Join matching segments with the specified delimiter
         result = delimiter.join(matching_segments)
         
-        return (result,) 
\ No newline at end of file
+        return (result, [result])
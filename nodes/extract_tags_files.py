@@ -0,0 +1,311 @@
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .concept_matcher import MATCH_MODES, ConceptMatcher, extract_matches, get_concept_matcher
+
+try:
+    import comfy.utils  # type: ignore
+except Exception:  # pragma: no cover - comfy is only importable inside ComfyUI
+    comfy = None  # type: ignore
+
+PROGRESS_EVERY = 10000
+EXECUTORS = ["thread", "process"]
+
+# (matcher, delimiter, prompt_syntax) of a worker process, built once by the pool initializer
+_WORKER_JOB: Optional[Tuple[ConceptMatcher, str, bool]] = None
+
+
+def _init_worker(concepts: str, match_mode: str, max_distance: int, delimiter: str, prompt_syntax: bool) -> None:
+    global _WORKER_JOB
+    _WORKER_JOB = (get_concept_matcher(concepts, match_mode, max_distance), delimiter, prompt_syntax)
+
+
+def _extract_chunk(texts: Sequence[str], job: Optional[tuple] = None) -> List[str]:
+    matcher, delimiter, prompt_syntax = job or _WORKER_JOB
+    return [delimiter.join(extract_matches(text, matcher, prompt_syntax)) for text in texts]
+
+
+class ICHIS_Extract_Tags_Files:
+    """
+    Apply Extract Tags to a whole caption dataset: a directory of .txt sidecars
+    or a single .jsonl file.
+
+    Captions are read lazily in chunks, filtered (optionally in a worker pool)
+    and written incrementally, so memory stays bounded by ``chunk_size`` times
+    the number of chunks in flight, regardless of dataset size. The concept
+    matcher is compiled once up front and shared by every worker thread;
+    worker processes compile their own copy once when the pool starts.
+
+    ``executor="thread"`` (default) works anywhere. ``"process"`` needs worker
+    processes that can re-import this module, which a spawned worker cannot do
+    when the custom node folder is not a valid package name (e.g. it contains
+    a hyphen); the pool is probed first and falls back to threads.
+
+    Output:
+    - ``.jsonl`` output path: one JSON object per caption. JSONL input records
+      are copied with ``text_field`` replaced; .txt input becomes
+      ``{"file": relative_path, "<text_field>": extracted}``.
+    - Any other output path is treated as a directory of .txt sidecars that
+      mirrors the input layout (JSONL input writes ``<line_number>.txt``).
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "input_path": ("STRING", {"placeholder": "Directory of .txt captions or a .jsonl file"}),
+                "output_path": ("STRING", {"placeholder": "Output .jsonl file or directory for .txt sidecars"}),
+                "concepts": ("STRING", {"multiline": True, "placeholder": "Enter tags separated by commas or new lines"}),
+                "delimiter": ("STRING", {"default": ", ", "placeholder": "Enter delimiter to join matches"}),
+            },
+            "optional": {
+                "match_mode": (MATCH_MODES, {"default": "substring"}),
+                "prompt_syntax": ("BOOLEAN", {"default": False}),
+                "max_distance": ("INT", {"default": 1, "min": 0, "max": 2}),
+                "text_field": ("STRING", {"default": "text", "placeholder": "JSONL field holding the caption"}),
+                "recursive": ("BOOLEAN", {"default": True}),
+                "count_files": ("BOOLEAN", {"default": False}),
+                "workers": ("INT", {"default": 0, "min": 0, "max": 64}),
+                "executor": (EXECUTORS, {"default": "thread"}),
+                "chunk_size": ("INT", {"default": 1000, "min": 1, "max": 1000000}),
+                "run_now": ("BOOLEAN", {"default": False}),
+                "debug": ("BOOLEAN", {"default": False}),
+            },
+        }
+
+    RETURN_TYPES = ("STRING", "INT", "STRING")
+    RETURN_NAMES = ("output_path", "processed", "report")
+    FUNCTION = "extract_files"
+    CATEGORY = "ICHIS"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # The dataset on disk may change between runs; always re-run when armed
+        if kwargs.get("run_now", False):
+            return f"run_{time.time()}_{uuid.uuid4()}"
+        return None
+
+    def _iter_txt_paths(self, root: str, recursive: bool, skip_dir: str = "") -> Iterator[str]:
+        for dirpath, dirnames, filenames in os.walk(root):
+            if os.path.abspath(dirpath) == skip_dir:
+                # Never read back sidecars written by this run
+                dirnames[:] = []
+                continue
+            dirnames.sort()
+            if not recursive:
+                dirnames[:] = []
+            for name in sorted(filenames):
+                if name.lower().endswith(".txt"):
+                    yield os.path.join(dirpath, name)
+
+    def _iter_txt(self, root: str, recursive: bool, skip_dir: str = "") -> Iterator[Tuple[str, str]]:
+        for path in self._iter_txt_paths(root, recursive, skip_dir):
+            with open(path, "r", encoding="utf-8", errors="replace") as fh:
+                yield os.path.relpath(path, root), fh.read().strip()
+
+    def _progress_bar(self, total: Optional[int]):
+        """ComfyUI progress bar when running inside ComfyUI and ``total`` is known, otherwise ``None``."""
+        if comfy is None or not total:
+            return None
+        try:
+            return comfy.utils.ProgressBar(total)
+        except Exception:
+            return None
+
+    def _iter_jsonl(self, path: str, text_field: str) -> Iterator[Tuple[object, str]]:
+        """Yield ``((line_number, record, end_offset), text)``; the byte offset drives progress."""
+        offset = 0
+        with open(path, "rb") as fh:
+            for line_number, raw in enumerate(fh, start=1):
+                offset += len(raw)
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                text = record.get(text_field)
+                yield (line_number, record, offset), text if isinstance(text, str) else ""
+
+    def _chunks(self, items: Iterator[Tuple[object, str]], size: int) -> Iterator[list]:
+        chunk: list = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _open_pool(self, executor: str, workers: int, job: tuple, options: tuple, debug: bool) -> tuple:
+        """Return ``(pool, extract)``: a process pool if requested and usable, else threads.
+
+        Threads share ``job``'s compiled matcher; processes rebuild it from
+        the plain ``options`` in their initializer.
+        """
+        if executor == "process":
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=options)
+            try:
+                # Fails here, before any chunk is consumed, when workers cannot
+                # import this module or the initializer breaks the pool
+                pool.submit(_extract_chunk, []).result()
+                return pool, _extract_chunk
+            except Exception as exc:
+                pool.shutdown(wait=False)
+                print(f"[Extract_Tags_Files] Process pool unavailable ({exc!r}); falling back to threads")
+        elif debug:
+            print(f"[Extract_Tags_Files] Using a thread pool of {workers} workers")
+        return ThreadPoolExecutor(max_workers=workers), partial(_extract_chunk, job=job)
+
+    def _results(
+        self,
+        chunks: Iterator[list],
+        job: tuple,
+        options: tuple,
+        workers: int,
+        executor: str = "thread",
+        debug: bool = False,
+    ) -> Iterator[Tuple[list, List[str]]]:
+        if workers <= 1:
+            for chunk in chunks:
+                yield chunk, _extract_chunk([text for _, text in chunk], job)
+            return
+        pool, extract = self._open_pool(executor, workers, job, options, debug)
+        # Keep a bounded window of chunks in flight so memory does not grow
+        # with the dataset; results are yielded in input order.
+        with pool:
+            pending: deque = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(extract, [text for _, text in chunk])))
+                if len(pending) >= workers * 2:
+                    done_chunk, future = pending.popleft()
+                    yield done_chunk, future.result()
+            while pending:
+                done_chunk, future = pending.popleft()
+                yield done_chunk, future.result()
+
+    def extract_files(
+        self,
+        input_path: str,
+        output_path: str,
+        concepts: str,
+        delimiter: str,
+        match_mode: str = "substring",
+        prompt_syntax: bool = False,
+        max_distance: int = 1,
+        text_field: str = "text",
+        recursive: bool = True,
+        count_files: bool = False,
+        workers: int = 0,
+        executor: str = "thread",
+        chunk_size: int = 1000,
+        run_now: bool = False,
+        debug: bool = False,
+    ) -> tuple:
+        if not delimiter:
+            delimiter = ", "
+        text_field = text_field or "text"
+        if not (input_path or "").strip():
+            return (output_path or "", 0, "input_path is required")
+        if not (output_path or "").strip():
+            return ("", 0, "output_path is required")
+        input_path = os.path.abspath(os.path.expandvars(os.path.expanduser(input_path.strip())))
+        output_path = os.path.abspath(os.path.expandvars(os.path.expanduser(output_path.strip())))
+        if debug:
+            print("[Extract_Tags_Files] ===== Debug Enabled =====")
+            print(f"[Extract_Tags_Files] input={input_path}, output={output_path}")
+            print(
+                f"[Extract_Tags_Files] match_mode={match_mode}, workers={workers}, "
+                f"executor={executor}, chunk_size={chunk_size}"
+            )
+
+        if not run_now:
+            return (output_path, 0, "run_now is False; nothing processed")
+        if output_path == input_path:
+            return (output_path, 0, "output_path must differ from input_path")
+        write_jsonl = output_path.lower().endswith(".jsonl")
+        if os.path.isdir(input_path):
+            source_is_jsonl = False
+            skip_dir = "" if write_jsonl else output_path
+            items = self._iter_txt(input_path, recursive, skip_dir)
+            # Knowing the total means walking the tree twice, so it is opt-in
+            total = None
+            if count_files and comfy is not None:
+                total = sum(1 for _ in self._iter_txt_paths(input_path, recursive, skip_dir))
+            progress = self._progress_bar(total)
+        elif os.path.isfile(input_path):
+            source_is_jsonl = True
+            items = self._iter_jsonl(input_path, text_field)
+            # Progress is measured in bytes read, so no extra pass over the file
+            progress = self._progress_bar(os.path.getsize(input_path))
+        else:
+            return (output_path, 0, f"Input not found: {input_path}")
+
+        parent = os.path.dirname(output_path) if write_jsonl else output_path
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        out_fh = open(output_path, "w", encoding="utf-8") if write_jsonl else None
+
+        processed = 0
+        matched = 0
+        start = time.perf_counter()
+        try:
+            chunks = self._chunks(items, max(1, chunk_size))
+            # Compiled once here, on the calling thread, and shared by thread workers
+            job = (get_concept_matcher(concepts, match_mode, max_distance), delimiter, prompt_syntax)
+            options = (concepts, match_mode, max_distance, delimiter, prompt_syntax)
+            for chunk, results in self._results(chunks, job, options, workers, executor, debug):
+                for (key, _), extracted in zip(chunk, results):
+                    if extracted:
+                        matched += 1
+                    if source_is_jsonl:
+                        line_number, record, _ = key
+                        if out_fh is not None:
+                            out_record = dict(record)
+                            out_record[text_field] = extracted
+                            out_fh.write(json.dumps(out_record, ensure_ascii=False) + "\n")
+                        else:
+                            self._write_sidecar(output_path, f"{line_number}.txt", extracted)
+                    elif out_fh is not None:
+                        out_fh.write(json.dumps({"file": key, text_field: extracted}, ensure_ascii=False) + "\n")
+                    else:
+                        self._write_sidecar(output_path, str(key), extracted)
+                before = processed
+                processed += len(chunk)
+                if progress is not None:
+                    done = chunk[-1][0][2] if source_is_jsonl else processed
+                    progress.update_absolute(min(done, progress.total))
+                if processed // PROGRESS_EVERY != before // PROGRESS_EVERY:
+                    elapsed = max(time.perf_counter() - start, 1e-9)
+                    print(f"[Extract_Tags_Files] {processed} captions, {processed / elapsed:.0f}/s")
+            if progress is not None:
+                # Trailing blank or invalid JSONL lines are never yielded
+                progress.update_absolute(progress.total)
+        finally:
+            if out_fh is not None:
+                out_fh.close()
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        report = (
+            f"{processed} captions ({matched} with matches) in {elapsed:.2f}s, "
+            f"{processed / elapsed:.0f} captions/s"
+        )
+        print(f"[Extract_Tags_Files] {report}")
+        return (output_path, processed, report)
+
+    def _write_sidecar(self, root: str, relative: str, text: str) -> None:
+        path = os.path.join(root, relative)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
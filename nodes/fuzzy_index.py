@@ -0,0 +1,73 @@
+"""Edit-distance lookups for fuzzy concept matching."""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def levenshtein(a: str, b: str, limit: Optional[int] = None) -> int:
+    """Edit distance between ``a`` and ``b``.
+
+    With ``limit`` the computation stops as soon as the distance is known to
+    exceed it and returns ``limit + 1``.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current = [i]
+        for j, cb in enumerate(b, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def deletion_variants(word: str, max_deletions: int) -> Set[str]:
+    """``word`` plus every string reachable by deleting up to ``max_deletions`` characters."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_deletions):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class DeletionIndex:
+    """Symmetric-deletion index for "is any word within ``d`` edits?" queries.
+
+    If two strings are within ``d`` edits of each other, deleting at most
+    ``d`` characters from each yields a common string. Every deletion
+    variant of every indexed word is stored, so a query only generates its
+    own variants, looks them up, and verifies the few candidates with a
+    bounded Levenshtein; nothing is compared against the whole word list.
+    """
+
+    def __init__(self, words: Iterable[str], max_distance: int = 1) -> None:
+        self.max_distance = max(0, int(max_distance))
+        self._variants: Dict[str, List[str]] = {}
+        for word in dict.fromkeys(words):
+            for variant in deletion_variants(word, self.max_distance):
+                self._variants.setdefault(variant, []).append(word)
+
+    def __len__(self) -> int:
+        return len(self._variants)
+
+    def contains_near(self, word: str) -> bool:
+        """True if any indexed word lies within ``max_distance`` edits of ``word``."""
+        limit = self.max_distance
+        variants = self._variants
+        for variant in deletion_variants(word, limit):
+            for candidate in variants.get(variant, ()):
+                if levenshtein(word, candidate, limit) <= limit:
+                    return True
+        return False
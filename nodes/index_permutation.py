@@ -0,0 +1,58 @@
+"""Lazy seeded permutations of ``range(n)`` for walking huge index spaces."""
+
+from __future__ import annotations
+
+from .stable_random import GOLDEN_GAMMA, MASK64, mix64
+
+FEISTEL_ROUNDS = 6
+
+
+class FeistelPermutation:
+    """Seeded bijection on ``range(size)`` evaluated one index at a time.
+
+    A balanced Feistel network over the smallest even-width bit domain that
+    covers ``size`` is a permutation of that domain for any round function;
+    out-of-range outputs are fed back in (cycle walking) until they land in
+    ``range(size)``. The domain is under four times ``size``, so a lookup
+    takes a few rounds on average and no O(n) table is ever built. Round
+    keys come from SplitMix64, so the order is the same on every Python
+    version.
+    """
+
+    __slots__ = ("size", "seed", "_half_bits", "_half_mask", "_keys")
+
+    def __init__(self, size: int, seed: int, rounds: int = FEISTEL_ROUNDS) -> None:
+        self.size = max(0, int(size))
+        self.seed = int(seed) & MASK64
+        half_bits = 1
+        while (1 << (2 * half_bits)) < self.size:
+            half_bits += 1
+        self._half_bits = half_bits
+        self._half_mask = (1 << half_bits) - 1
+        self._keys = tuple(
+            mix64((self.seed + (r + 1) * GOLDEN_GAMMA) & MASK64) for r in range(max(1, int(rounds)))
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _encrypt(self, value: int) -> int:
+        bits, mask = self._half_bits, self._half_mask
+        left, right = value >> bits, value & mask
+        for key in self._keys:
+            left, right = right, left ^ (mix64(key ^ right) & mask)
+        return (left << bits) | right
+
+    def __getitem__(self, position: int) -> int:
+        if position < 0:
+            position += self.size
+        if not 0 <= position < self.size:
+            raise IndexError("permutation index out of range")
+        value = self._encrypt(position)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def __iter__(self):
+        for position in range(self.size):
+            yield self[position]
@@ -0,0 +1,140 @@
+"""Sorted sets of integers stored as disjoint closed intervals."""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+
+class IntervalSet(Sequence):
+    """Immutable sorted integer set backed by merged ``[start, end]`` intervals.
+
+    Memory scales with the number of intervals, not their width. The set
+    behaves like a sorted sequence: ``len`` is O(1), ``s[k]`` (select) and
+    ``x in s`` / ``s.index(x)`` (rank) are O(log intervals) via bisect over
+    interval starts and cumulative sizes.
+    """
+
+    __slots__ = ("_starts", "_ends", "_offsets", "_size")
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()) -> None:
+        merged: List[List[int]] = []
+        for start, end in sorted((int(a), int(b)) for a, b in intervals if a <= b):
+            if merged and start <= merged[-1][1] + 1:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        self._starts = [start for start, _ in merged]
+        self._ends = [end for _, end in merged]
+        # _offsets[i] = number of members before interval i
+        offsets = []
+        total = 0
+        for start, end in merged:
+            offsets.append(total)
+            total += end - start + 1
+        self._offsets = offsets
+        self._size = total
+
+    @classmethod
+    def span(cls, start: int, end: int) -> "IntervalSet":
+        return cls([(start, end)])
+
+    @property
+    def intervals(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(self._size))]
+        if k < 0:
+            k += self._size
+        if not 0 <= k < self._size:
+            raise IndexError("IntervalSet index out of range")
+        i = bisect_right(self._offsets, k) - 1
+        return self._starts[i] + (k - self._offsets[i])
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, int):
+            return False
+        i = bisect_right(self._starts, value) - 1
+        return i >= 0 and value <= self._ends[i]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, IntervalSet):
+            return self.intervals == other.intervals
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.intervals))
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({self.intervals!r})"
+
+    def index(self, value: int, start: int = 0, stop: int = None) -> int:  # type: ignore[override]
+        """Rank of ``value`` (its position in sorted order)."""
+        i = bisect_right(self._starts, value) - 1
+        if i < 0 or value > self._ends[i]:
+            raise ValueError(f"{value} is not in IntervalSet")
+        return self._offsets[i] + (value - self._starts[i])
+
+    def count(self, value: int) -> int:  # type: ignore[override]
+        return 1 if value in self else 0
+
+    def intersection(self, other: "IntervalSet") -> "IntervalSet":
+        result = []
+        a, b = self.intervals, other.intervals
+        i = j = 0
+        while i < len(a) and j < len(b):
+            start = max(a[i][0], b[j][0])
+            end = min(a[i][1], b[j][1])
+            if start <= end:
+                result.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return IntervalSet(result)
+
+    def difference(self, other: "IntervalSet") -> "IntervalSet":
+        result = []
+        cuts = other.intervals
+        cut_ends = other._ends
+        for start, end in self.intervals:
+            # Only the cuts overlapping [start, end] matter
+            j = bisect_left(cut_ends, start)
+            cursor = start
+            while j < len(cuts) and cuts[j][0] <= end:
+                cut_start, cut_end = cuts[j]
+                if cut_start > cursor:
+                    result.append((cursor, cut_start - 1))
+                cursor = max(cursor, cut_end + 1)
+                j += 1
+            if cursor <= end:
+                result.append((cursor, end))
+        return IntervalSet(result)
+
+    def nearest(self, value: int) -> int:
+        """Member closest to ``value``; ties go to the smaller member."""
+        if not self._size:
+            raise ValueError("nearest() on an empty IntervalSet")
+        i = bisect_right(self._starts, value) - 1
+        if i >= 0 and value <= self._ends[i]:
+            return value
+        below = self._ends[i] if i >= 0 else None
+        above = self._starts[i + 1] if i + 1 < len(self._starts) else None
+        if below is None:
+            return above  # type: ignore[return-value]
+        if above is None or value - below <= above - value:
+            return below
+        return above
@@ -0,0 +1,169 @@
+"""Resolution bucket tables for ICHIS Aspect Ratio Plus.
+
+A ``BucketSpec`` describes a model family: its pixel budget (``base`` x
+``base``), the multiple every side must snap to, the aspect ratios on
+offer and the latent channel count. ``get_bucket_table`` turns a spec into
+an immutable ``BucketTable`` once and memoises it, so a node execution is
+only dict lookups.
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+MULTIPLES = ["8", "16", "64"]
+DEFAULT_RATIOS: Tuple[Tuple[int, int], ...] = (
+    (1, 1), (3, 4), (5, 8), (9, 16), (9, 21), (3, 2), (16, 9), (21, 9),
+)
+TABLE_CACHE_SIZE = 32
+
+
+class Bucket(NamedTuple):
+    name: str
+    ratio: str
+    width: int
+    height: int
+    orientation: str
+
+
+class BucketSpec(NamedTuple):
+    """Hashable description of a bucket table.
+
+    ``sizes`` pins exact ``(width, height)`` pairs per ratio (the classic
+    SDXL buckets are hand-tuned rather than derived); ratios without a pinned
+    size are computed from ``base`` and ``multiple``.
+    """
+
+    base: int = 1024
+    multiple: int = 64
+    ratios: Tuple[Tuple[int, int], ...] = DEFAULT_RATIOS
+    latent_channels: int = 4
+    sizes: Tuple[Tuple[Tuple[int, int], Tuple[int, int]], ...] = ()
+
+
+class BucketTable(NamedTuple):
+    spec: BucketSpec
+    buckets: Tuple[Bucket, ...]
+    by_name: Mapping[str, Bucket]
+    by_ratio: Mapping[str, Bucket]
+
+
+SDXL_SIZES = (
+    ((1, 1), (1024, 1024)),
+    ((3, 4), (896, 1152)),
+    ((5, 8), (832, 1216)),
+    ((9, 16), (768, 1344)),
+    ((9, 21), (640, 1536)),
+    ((3, 2), (1216, 832)),
+    ((16, 9), (1344, 768)),
+    ((21, 9), (1536, 640)),
+)
+
+PRESETS: Mapping[str, BucketSpec] = MappingProxyType({
+    "SDXL": BucketSpec(base=1024, multiple=64, sizes=SDXL_SIZES),
+    "SD1.5": BucketSpec(base=512, multiple=64),
+    "SD3": BucketSpec(base=1024, multiple=64, latent_channels=16),
+    "Flux": BucketSpec(base=1024, multiple=16, latent_channels=16),
+})
+PRESET_NAMES = list(PRESETS) + ["custom"]
+
+
+def ratio_key(width: int, height: int) -> str:
+    return f"{width}:{height}"
+
+
+def snap(value: float, multiple: int) -> int:
+    """Round ``value`` to the nearest positive multiple of ``multiple``."""
+    return max(multiple, int(round(value / multiple)) * multiple)
+
+
+def bucket_size(ratio: Tuple[int, int], base: int, multiple: int) -> Tuple[int, int]:
+    """Width and height with area close to ``base**2`` and the given aspect ratio."""
+    aspect = ratio[0] / ratio[1]
+    area = float(base) * base
+    return snap(math.sqrt(area * aspect), multiple), snap(math.sqrt(area / aspect), multiple)
+
+
+def _orientation(width: int, height: int) -> str:
+    if width == height:
+        return "square"
+    return "landscape" if width > height else "portrait"
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def get_bucket_table(spec: BucketSpec) -> BucketTable:
+    pinned = dict(spec.sizes)
+    buckets = []
+    for ratio in dict.fromkeys(spec.ratios):
+        width, height = pinned.get(ratio) or bucket_size(ratio, spec.base, spec.multiple)
+        key = ratio_key(*ratio)
+        orientation = _orientation(*ratio)
+        buckets.append(Bucket(f"{key} {orientation} {width}x{height}", key, width, height, orientation))
+    return BucketTable(
+        spec,
+        tuple(buckets),
+        MappingProxyType({bucket.name: bucket for bucket in buckets}),
+        MappingProxyType({bucket.ratio: bucket for bucket in buckets}),
+    )
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE)
+def parse_ratios(text: str) -> Tuple[Tuple[int, int], ...]:
+    """Parse ``"1:1, 4:3, 16x9"``; invalid entries are skipped, nothing valid gives the defaults."""
+    ratios = []
+    for part in text.replace("\n", ",").split(","):
+        part = part.strip().lower().replace("x", ":")
+        if not part:
+            continue
+        pieces = part.split(":")
+        try:
+            width, height = int(pieces[0]), int(pieces[1])
+        except (ValueError, IndexError):
+            print(f"[Aspect_Ratio_Plus] Ignoring invalid ratio '{part}'")
+            continue
+        if len(pieces) == 2 and width > 0 and height > 0:
+            ratios.append((width, height))
+        else:
+            print(f"[Aspect_Ratio_Plus] Ignoring invalid ratio '{part}'")
+    return tuple(ratios) or DEFAULT_RATIOS
+
+
+def resolve_spec(preset: str, base: int = 1024, multiple: int = 64, ratios: str = "",
+                 latent_channels: int = 4) -> BucketSpec:
+    """Preset spec by name, or a custom spec built from the remaining arguments."""
+    if preset in PRESETS:
+        return PRESETS[preset]
+    return BucketSpec(int(base), int(multiple), parse_ratios(ratios or ""), int(latent_channels))
+
+
+@lru_cache(maxsize=TABLE_CACHE_SIZE * 8)
+def filter_buckets(spec: BucketSpec, excluded: frozenset = frozenset(), size_mode: str = "all") -> Tuple[str, ...]:
+    """Sorted names of the buckets that survive ``excluded`` ratios and ``size_mode``.
+
+    ``"portrait only"`` / ``"landscape only"`` keep square buckets too.
+    """
+    names = []
+    for bucket in get_bucket_table(spec).buckets:
+        if bucket.ratio in excluded:
+            continue
+        if size_mode == "portrait only" and bucket.orientation == "landscape":
+            continue
+        if size_mode == "landscape only" and bucket.orientation == "portrait":
+            continue
+        names.append(bucket.name)
+    return tuple(sorted(names))
+
+
+def nearest_bucket(table: BucketTable, ratio: str) -> Optional[Bucket]:
+    """Bucket for ``ratio`` (``"W:H"``), or the one with the closest aspect ratio."""
+    if ratio in table.by_ratio:
+        return table.by_ratio[ratio]
+    try:
+        width, height = (int(part) for part in ratio.split(":"))
+        target = math.log(width / height)
+    except (ValueError, ZeroDivisionError):
+        return table.buckets[0] if table.buckets else None
+    return min(table.buckets, key=lambda b: abs(math.log(b.width / b.height) - target), default=None)
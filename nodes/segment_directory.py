@@ -0,0 +1,233 @@
+"""A folder of ``.txt`` prompt files presented as one selectable sequence."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .segment_file import count_segments, get_segment_file, normalize_segment
+from .text_segments import SegmentIndex, build_segment_index
+
+ENTRY_MODES = ["segment", "file"]
+TEXT_EXTENSIONS = (".txt",)
+OPEN_DIRECTORIES_CACHE_SIZE = 8
+# IS_CHANGED and the node run of one execution share a single refresh
+REFRESH_INTERVAL = 1.0
+# Seconds between re-stats of every known file; in between, an in-place
+# edit is noticed when the edited file is read
+STAT_INTERVAL = 10.0
+
+
+class SegmentDirectory:
+    """Every ``.txt`` file under ``path`` (recursively), in sorted path order.
+
+    With ``entries="file"`` each file is one entry; with ``"segment"`` each
+    ``@`` segment of each file is. ``refresh()`` re-lists a directory only
+    when its mtime changes and, at most every ``STAT_INTERVAL`` seconds,
+    stats every known file, so only files that are new or were edited in
+    place (which leaves the directory mtime alone) are re-counted, using the
+    persistent offset index from ``segment_file``. Reading a file that was
+    edited since the last count also marks it for re-counting.
+    Entry ``k`` is then ``files[k]`` in file mode, or a bisect over per-file
+    segment counts in segment mode.
+    """
+
+    def __init__(self, path: str, entries: str = "segment") -> None:
+        self.path = os.path.abspath(path)
+        self.entries = entries if entries in ENTRY_MODES else "segment"
+        self.generation = 0
+        self._lock = threading.RLock()
+        # directory -> (mtime_ns, text files, sub-directories)
+        self._dirs: Dict[str, Tuple[int, List[str], List[str]]] = {}
+        # file -> ((mtime_ns, size), segment count); the count is 1 in file mode
+        self._counts: Dict[str, Tuple[Tuple[int, int], int]] = {}
+        self._stale: Set[str] = set()
+        self._files: List[str] = []
+        self._starts = array("Q", [0])
+        self._segment_index: Optional[SegmentIndex] = None
+        self._refreshed = float("-inf")
+        self._stat_time = float("-inf")
+        if not os.path.isdir(self.path):
+            raise NotADirectoryError(f"Not a directory: {self.path}")
+
+    def __len__(self) -> int:
+        if self.entries == "file":
+            return len(self._files)
+        return self._starts[-1]
+
+    @staticmethod
+    def _list(directory: str) -> Tuple[List[str], List[str]]:
+        files, subdirs = [], []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(TEXT_EXTENSIONS):
+                        files.append(entry.path)
+                except OSError:
+                    continue
+        return files, subdirs
+
+    def refresh(self) -> bool:
+        """Pick up added, removed and edited files; returns True if the entries changed.
+
+        A call within ``REFRESH_INTERVAL`` of the previous one does nothing
+        unless a read found an edited file.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.generation and not self._stale and now - self._refreshed < REFRESH_INTERVAL:
+                return False
+            self._refreshed = now
+            changed = False
+            seen = set()
+            pending = [self.path]
+            while pending:
+                directory = pending.pop()
+                if directory in seen:
+                    continue
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                cached = self._dirs.get(directory)
+                if cached is None or cached[0] != mtime:
+                    try:
+                        files, subdirs = self._list(directory)
+                    except OSError:
+                        continue
+                    cached = (mtime, files, subdirs)
+                    self._dirs[directory] = cached
+                    changed = True
+                seen.add(directory)
+                pending.extend(cached[2])
+            for directory in set(self._dirs) - seen:
+                del self._dirs[directory]
+                changed = True
+            if now - self._stat_time >= STAT_INTERVAL:
+                self._stat_time = now
+                self._stat_files()
+            if changed or self._stale or not self.generation:
+                self._rebuild()
+                return True
+            return False
+
+    def _stat_files(self) -> None:
+        """Mark known files whose mtime or size changed for re-counting."""
+        for path, (signature, _) in self._counts.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed: the parent directory's listing catches it
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != signature:
+                self._stale.add(path)
+
+    def _count(self, path: str) -> Tuple[Tuple[int, int], int]:
+        if self.entries == "segment":
+            return count_segments(path)
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size), 1
+
+    def _rebuild(self) -> None:
+        files = sorted(path for _, listed, _ in self._dirs.values() for path in listed)
+        counts: Dict[str, Tuple[Tuple[int, int], int]] = {}
+        starts = array("Q", [0])
+        kept = []
+        for path in files:
+            known = self._counts.get(path)
+            if known is None or path in self._stale:
+                try:
+                    known = self._count(path)
+                except OSError:
+                    continue
+            counts[path] = known
+            kept.append(path)
+            starts.append(starts[-1] + known[1])
+        self._counts = counts
+        self._starts = starts
+        self._files = kept
+        self._stale.clear()
+        self._segment_index = None
+        self.generation += 1
+
+    def locate(self, i: int) -> Tuple[str, int]:
+        """``(file, segment within file)`` of entry ``i``."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("directory entry out of range")
+        if self.entries == "file":
+            return self._files[i], 0
+        position = bisect_right(self._starts, i) - 1
+        return self._files[position], i - self._starts[position]
+
+    def __getitem__(self, i: int) -> str:
+        path, local = self.locate(i)
+        try:
+            if self.entries == "file":
+                with open(path, "r", encoding="utf-8", errors="replace") as fh:
+                    return normalize_segment(fh.read())
+            library = get_segment_file(path)
+        except OSError:
+            with self._lock:
+                self._stale.add(path)
+            return ""
+        if library.signature != self._counts[path][0]:
+            # Edited since the last refresh: re-count on the next one
+            with self._lock:
+                self._stale.add(path)
+        return library[local] if local < len(library) else ""
+
+    def segment_index(self) -> SegmentIndex:
+        """Labels and weights for every entry; file stems also work as labels."""
+        with self._lock:
+            if self._segment_index is None:
+                built = build_segment_index(self)
+                if self.entries == "file":
+                    for position, path in enumerate(self._files, start=1):
+                        stem = os.path.splitext(os.path.basename(path))[0].casefold()
+                        built.labels.setdefault(stem, position)
+                self._segment_index = built
+            return self._segment_index
+
+    @property
+    def signature(self) -> str:
+        return f"{self.path}:{self.entries}:{self.generation}"
+
+
+_OPEN_DIRECTORIES: "OrderedDict[Tuple[str, str], SegmentDirectory]" = OrderedDict()
+_OPEN_LOCK = threading.Lock()
+
+
+def get_segment_directory(path: str, entries: str = "segment") -> SegmentDirectory:
+    """Return the shared ``SegmentDirectory`` for ``path``, refreshed lazily."""
+    if not (path or "").strip():
+        # os.path.abspath("") would silently scan the working directory
+        raise NotADirectoryError("No directory path given")
+    path = os.path.abspath(os.path.expandvars(os.path.expanduser(path)))
+    key = (path, entries)
+    with _OPEN_LOCK:
+        library = _OPEN_DIRECTORIES.get(key)
+        if library is None:
+            library = SegmentDirectory(path, entries)
+            _OPEN_DIRECTORIES[key] = library
+            if len(_OPEN_DIRECTORIES) > OPEN_DIRECTORIES_CACHE_SIZE:
+                _OPEN_DIRECTORIES.popitem(last=False)
+        else:
+            _OPEN_DIRECTORIES.move_to_end(key)
+    library.refresh()
+    return library
+
+
+def clear_segment_directories() -> None:
+    with _OPEN_LOCK:
+        _OPEN_DIRECTORIES.clear()
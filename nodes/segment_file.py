@@ -0,0 +1,214 @@
+"""Memory-mapped ``@``-segment libraries with a persistent offset index."""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .state_store import get_state_dir
+from .text_segments import SegmentIndex, build_segment_index
+
+INDEX_SUBDIR = "text_index"
+OPEN_FILES_CACHE_SIZE = 8
+_OFFSET = struct.Struct("<Q")
+_BATCH = 65536
+
+_BOM = b"\xef\xbb\xbf"
+# UTF-8 encodings of every character except "\n" that ``str.strip`` removes,
+# so the byte-level index agrees with ``parse_segments`` on decoded text
+_SPACE = (
+    rb"(?:[ \t\r\x0b\x0c\x1c-\x1f]|\xc2[\x85\xa0]|\xe1\x9a\x80"
+    rb"|\xe2\x80[\x80-\x8a\xa8\xa9\xaf]|\xe2\x81\x9f|\xe3\x80\x80)"
+)
+# A segment starts at every line whose first non-blank character is "@";
+# a UTF-8 BOM at the very start of the file is skipped like whitespace
+_MARKER_LINE = re.compile(rb"(?:^|\A" + _BOM + rb")" + _SPACE + rb"*@", re.MULTILINE)
+_BLANK = re.compile(rb"(?:" + _SPACE + rb"|\n)*")
+
+
+def normalize_segment(raw: str) -> str:
+    """Strip every line and drop blank ones, as inline ``text`` parsing does."""
+    return "\n".join(line.strip() for line in raw.split("\n") if line.strip())
+
+
+def _index_path(path: str, mtime_ns: int, size: int) -> str:
+    """``text_index/<sha1 of path>/<mtime_ns>-<size>.idx``.
+
+    One directory per library file, so superseded indexes of that file can be
+    found (and pruned) without listing the indexes of every other file.
+    """
+    key = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    return os.path.join(get_state_dir(), INDEX_SUBDIR, key, f"{mtime_ns}-{size}.idx")
+
+
+def _prune_indexes(index_path: str) -> None:
+    """Remove the other (stale) indexes stored for the same library file."""
+    directory, current = os.path.split(index_path)
+    for name in os.listdir(directory):
+        if name != current and name.endswith(".idx"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                # Still mapped by an open SegmentFile on Windows; retried next rebuild
+                pass
+
+
+def _write_offsets(fh, batch: array) -> None:
+    if sys.byteorder != "little":
+        batch.byteswap()
+    batch.tofile(fh)
+
+
+def _build_index(data, size: int, index_path: str) -> None:
+    """Write segment start offsets as little-endian uint64s, atomically.
+
+    Indexes left over from earlier versions of the same file are removed.
+    """
+    directory = os.path.dirname(index_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix="segments.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            batch = array("Q")
+            first = _MARKER_LINE.search(data) if size else None
+            lead_start = len(_BOM) if data[:len(_BOM)] == _BOM else 0
+            lead_end = first.start() if first else size
+            if lead_start < lead_end and not _BLANK.fullmatch(data, lead_start, lead_end):
+                # Text before the first marker forms its own segment
+                batch.append(0)
+            for match in _MARKER_LINE.finditer(data):
+                batch.append(match.start())
+                if len(batch) >= _BATCH:
+                    _write_offsets(fh, batch)
+                    batch = array("Q")
+            _write_offsets(fh, batch)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _prune_indexes(index_path)
+
+
+def count_segments(path: str) -> Tuple[Tuple[int, int], int]:
+    """``((mtime_ns, size), segment count)`` for ``path`` without keeping it open.
+
+    Builds and stores the offset index if it is missing, so a later
+    ``SegmentFile`` for the same file reuses it.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if stat.st_size == 0:
+        return signature, 0
+    index_path = _index_path(path, *signature)
+    if not os.path.exists(index_path):
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            _build_index(data, stat.st_size, index_path)
+    return signature, os.path.getsize(index_path) // _OFFSET.size
+
+
+class SegmentFile:
+    """Read-only sequence of the ``@`` segments in a text file.
+
+    The file and its offset index are both memory-mapped, so opening a
+    library of millions of segments costs O(1) memory and ``library[i]``
+    reads only the bytes of segment ``i``. The index is stored under the
+    state directory, keyed by path, mtime and size, and reused across
+    restarts until the file changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        stat = os.stat(self.path)
+        self.signature: Tuple[int, int] = (stat.st_mtime_ns, stat.st_size)
+        self.size = stat.st_size
+        self._fh = None
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[mmap.mmap] = None
+        self._index_fh = None
+        self._count = 0
+        self._segment_index: Optional[SegmentIndex] = None
+        if self.size == 0:
+            return
+        self._fh = open(self.path, "rb")
+        self._data = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        index_path = _index_path(self.path, *self.signature)
+        if not os.path.exists(index_path):
+            _build_index(self._data, self.size, index_path)
+        index_size = os.path.getsize(index_path)
+        self._count = index_size // _OFFSET.size
+        if self._count:
+            self._index_fh = open(index_path, "rb")
+            self._index = mmap.mmap(self._index_fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offset(self, i: int) -> int:
+        if i >= self._count:
+            return self.size
+        return _OFFSET.unpack_from(self._index, i * _OFFSET.size)[0]  # type: ignore[arg-type]
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("segment index out of range")
+        raw = self._data[self._offset(i):self._offset(i + 1)]  # type: ignore[index]
+        # utf-8-sig drops the BOM that can only open the first segment
+        return normalize_segment(raw.decode("utf-8-sig", errors="replace"))
+
+    def segment_index(self) -> SegmentIndex:
+        """Labels and cumulative weights, built on first use and kept until the file changes."""
+        if self._segment_index is None:
+            self._segment_index = build_segment_index(self)
+        return self._segment_index
+
+    def close(self) -> None:
+        for handle in (self._index, self._index_fh, self._data, self._fh):
+            if handle is not None:
+                handle.close()
+        self._index = self._index_fh = self._data = self._fh = None
+
+
+_OPEN_FILES: "OrderedDict[str, SegmentFile]" = OrderedDict()
+_OPEN_LOCK = threading.Lock()
+
+
+def get_segment_file(path: str) -> SegmentFile:
+    """Return an open ``SegmentFile`` for ``path``, reopened when the file changes."""
+    path = os.path.abspath(os.path.expandvars(os.path.expanduser(path)))
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _OPEN_LOCK:
+        library = _OPEN_FILES.get(path)
+        if library is not None and library.signature == signature:
+            _OPEN_FILES.move_to_end(path)
+            return library
+        if library is not None:
+            library.close()
+        library = SegmentFile(path)
+        _OPEN_FILES[path] = library
+        if len(_OPEN_FILES) > OPEN_FILES_CACHE_SIZE:
+            _, evicted = _OPEN_FILES.popitem(last=False)
+            evicted.close()
+        return library
+
+
+def close_segment_files() -> None:
+    with _OPEN_LOCK:
+        for library in _OPEN_FILES.values():
+            library.close()
+        _OPEN_FILES.clear()
@@ -0,0 +1,120 @@
+"""Seeded shuffle-bag sampling: every item is handed out once before any repeats."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from .stable_random import StableRandom, derive_seed
+
+
+class ShuffleBag:
+    """Walk a seeded permutation of ``range(size)`` in consecutive slices.
+
+    Each pass over the permutation is an *epoch*. When an epoch is exhausted the
+    next one uses a fresh permutation derived from ``(seed, epoch)``, so the
+    whole bag can be rebuilt from ``seed``/``epoch``/``cursor`` after a restart.
+    Permutations come from ``StableRandom`` so persisted cursors stay valid
+    across Python upgrades. Drawing costs O(1) per item; the O(n) shuffle is
+    paid once per epoch.
+
+    ``ALGORITHM`` is stored with the state; bump it whenever the permutation
+    for a given ``(seed, epoch)`` changes, so that persisted cursors written by
+    an older generator are discarded instead of replayed against a new one.
+    """
+
+    ALGORITHM = "splitmix64-v1"
+
+    def __init__(
+        self,
+        size: int,
+        seed: int,
+        epoch: int = 0,
+        cursor: int = 0,
+        swaps: Optional[List[Tuple[int, int]]] = None,
+    ) -> None:
+        self.size = max(0, int(size))
+        self.seed = int(seed)
+        self.epoch = max(0, int(epoch))
+        self.cursor = min(max(0, int(cursor)), self.size)
+        # Swaps applied to the current epoch's permutation to avoid handing out
+        # the same item twice in a draw that straddles an epoch boundary.
+        self._swaps: List[Tuple[int, int]] = [tuple(s) for s in (swaps or [])]  # type: ignore[misc]
+        self._order: Optional[List[int]] = None
+        self._order_epoch: Optional[int] = None
+
+    def _ensure_order(self) -> List[int]:
+        if self._order is None or self._order_epoch != self.epoch:
+            order = list(range(self.size))
+            StableRandom(derive_seed(self.seed, self.epoch)).shuffle(order)
+            for i, j in self._swaps:
+                order[i], order[j] = order[j], order[i]
+            self._order = order
+            self._order_epoch = self.epoch
+        return self._order
+
+    def _advance_epoch(self) -> None:
+        self.epoch += 1
+        self.cursor = 0
+        self._swaps = []
+
+    def count_rng(self) -> StableRandom:
+        """Generator for slice lengths, reproducible for the current position."""
+        return StableRandom(derive_seed(self.seed, self.epoch, self.cursor, "count"))
+
+    def draw(self, k: int, unique: bool = True) -> List[int]:
+        """Return the next ``k`` indices, starting a new epoch when needed.
+
+        With ``unique`` the result never repeats an index (``k`` is clamped to
+        ``size``), even when the slice crosses into the next epoch.
+        """
+        if self.size == 0 or k <= 0:
+            return []
+        if unique:
+            k = min(k, self.size)
+        result: List[int] = []
+        taken = set()
+        while len(result) < k:
+            if self.cursor >= self.size:
+                self._advance_epoch()
+            order = self._ensure_order()
+            idx = order[self.cursor]
+            if unique and idx in taken:
+                j = self.cursor + 1
+                while order[j] in taken:
+                    j += 1
+                order[self.cursor], order[j] = order[j], order[self.cursor]
+                self._swaps.append((self.cursor, j))
+                idx = order[self.cursor]
+            result.append(idx)
+            taken.add(idx)
+            self.cursor += 1
+        return result
+
+    def state(self) -> Dict[str, object]:
+        return {
+            "algorithm": self.ALGORITHM,
+            "size": self.size,
+            "seed": self.seed,
+            "epoch": self.epoch,
+            "cursor": self.cursor,
+            "swaps": [list(s) for s in self._swaps],
+        }
+
+    @classmethod
+    def matches_state(cls, state: object, size: int) -> bool:
+        """Whether ``state`` was written for ``size`` items by the current algorithm."""
+        return (
+            isinstance(state, dict)
+            and state.get("algorithm") == cls.ALGORITHM
+            and state.get("size") == size
+        )
+
+    @classmethod
+    def from_state(cls, state: Dict[str, object]) -> "ShuffleBag":
+        return cls(
+            size=int(state.get("size", 0)),
+            seed=int(state.get("seed", 0)),
+            epoch=int(state.get("epoch", 0)),
+            cursor=int(state.get("cursor", 0)),
+            swaps=[tuple(s) for s in state.get("swaps", []) or []],  # type: ignore[misc]
+        )
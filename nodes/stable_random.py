@@ -0,0 +1,349 @@
+"""Version-stable random numbers for reproducible sampling.
+
+``random.sample``/``randint``/``choice`` are free to change their algorithms
+between Python releases, so a stored seed is only reproducible on the
+interpreter that produced it. Everything here is specified in this file:
+
+* **Generator** – SplitMix64 (Steele, Lea & Flood, 2014). Output ``i``
+  (0-based) for seed ``s`` is ``mix64(s + (i + 1) * 0x9E3779B97F4A7C15 mod 2**64)``
+  with the ``mix64`` finaliser below, so the generator is counter-based: any
+  position can be computed directly from ``(seed, counter)``.
+* **Bounded integers** – Lemire's multiply-shift with rejection (unbiased).
+* **Floats** – top 53 bits of one output scaled by ``2**-53``.
+* **k-of-n without replacement** – Floyd's algorithm (O(k) time and memory,
+  independent of ``n``), followed by a Fisher–Yates shuffle of the ``k``
+  picks so their order is uniformly random too.
+
+Multi-draw calls (``sample``, ``choices``, ``shuffle``) compute their
+outputs in one batch: the 64-bit states are packed into 128-bit lanes of a
+single Python integer, so each SplitMix64 step is one big-integer operation
+over the whole batch instead of one interpreter round-trip per output, and
+Lemire's products for a run of bounds are formed the same way. Batches yield
+exactly the values the one-at-a-time path would, in the same order.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, MutableSequence, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(z: int) -> int:
+    """SplitMix64 output finaliser."""
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def derive_seed(*parts: object) -> int:
+    """Hash arbitrary parts into a 64-bit seed (stable across interpreters)."""
+    joined = "\x1f".join(str(p) for p in parts)
+    return int.from_bytes(hashlib.blake2b(joined.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+_TWO_POW_MINUS_53 = 1.0 / (1 << 53)
+# Largest batch computed as one packed integer; bigger requests are chunked
+_MAX_BLOCK = 4096
+# Below this many outputs the fixed cost of packing outweighs the savings
+_MIN_BLOCK = 8
+
+
+@lru_cache(maxsize=None)
+def _lane_constants(lanes: int):
+    """Constants for ``lanes`` 128-bit lanes: low-64-bit mask, broadcast
+    multiplier, per-lane counter offsets and one mask per bit of the lane index."""
+    mask = int.from_bytes((b"\xff" * 8 + bytes(8)) * lanes, "little")
+    ones = int.from_bytes((b"\x01" + bytes(15)) * lanes, "little")
+    offsets = (_pack(range(lanes)) * GOLDEN_GAMMA) & mask
+    index_bits = tuple(
+        _pack([MASK64 if (i >> bit) & 1 else 0 for i in range(lanes)])
+        for bit in range(max(1, (lanes - 1).bit_length()))
+    )
+    return mask, ones, offsets, index_bits
+
+
+def _pack(values) -> int:
+    """Pack 64-bit ``values`` into consecutive 128-bit lanes of one integer."""
+    words = array("Q", bytes(16 * len(values)))
+    words[::2] = array("Q", values)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return int.from_bytes(words.tobytes(), "little")
+
+
+def _unpack(packed: int, lanes: int) -> array:
+    """64-bit words of ``packed``: lane ``i`` low half at ``2i``, high half at ``2i + 1``."""
+    words = array("Q", packed.to_bytes(16 * lanes, "little"))
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words
+
+
+def _lane_count(size: int) -> int:
+    lanes = 8
+    while lanes < size:
+        lanes <<= 1
+    return lanes
+
+
+def _packed_outputs(seed: int, counter: int, lanes: int) -> int:
+    """Outputs ``counter + 1`` .. ``counter + lanes``, one per 128-bit lane.
+
+    Each lane holds a 64-bit state in 128 bits, so multiplying by a 64-bit
+    constant never carries into the neighbouring lane and the mask undoes
+    whatever a right shift moves across lanes.
+    """
+    mask, ones, offsets, _ = _lane_constants(lanes)
+    start = (seed + (counter + 1) * GOLDEN_GAMMA) & MASK64
+    z = (offsets + start * ones) & mask
+    z = (((z ^ (z >> 30)) & mask) * 0xBF58476D1CE4E5B9) & mask
+    z = (((z ^ (z >> 27)) & mask) * 0x94D049BB133111EB) & mask
+    return (z ^ (z >> 31)) & mask
+
+
+def splitmix_block(seed: int, counter: int, count: int) -> List[int]:
+    """Outputs ``counter + 1`` .. ``counter + count`` of the generator for ``seed``.
+
+    Same values as ``count`` calls to ``StableRandom(seed, counter).next64()``.
+    """
+    if count < _MIN_BLOCK:
+        return [mix64((seed + c * GOLDEN_GAMMA) & MASK64) for c in range(counter + 1, counter + count + 1)]
+    result: List[int] = []
+    while count > 0:
+        size = min(count, _MAX_BLOCK)
+        lanes = _lane_count(size)
+        result.extend(_unpack(_packed_outputs(seed, counter, lanes), lanes)[:2 * size:2])
+        counter += size
+        count -= size
+    return result
+
+
+class StableRandom:
+    """Counter-based generator exposing the subset of the ``random`` API the nodes use.
+
+    ``sample``, ``choices`` and ``shuffle`` draw all their outputs in one
+    batch (see ``splitmix_block``), 2-3x faster than one draw at a time.
+    Creating a generator costs well under a microsecond against ~10 µs for
+    ``random.seed``, so replaying a stored seed (reseed plus one prompt's
+    worth of picks) is on par with or faster than the ``random`` module up to
+    about ten picks, and batched ``choices`` beats a loop of stdlib
+    ``choice()`` calls at any size. ``sample`` with hundreds of picks is
+    still about half the speed of ``random.sample``: Floyd's selection and
+    the order shuffle take two bounded draws per pick, and the per-lane
+    reduction for varying bounds is big-integer arithmetic in Python.
+    """
+
+    __slots__ = ("seed", "counter")
+
+    def __init__(self, seed: int, counter: int = 0) -> None:
+        self.seed = int(seed) & MASK64
+        self.counter = int(counter)
+
+    def next64(self) -> int:
+        self.counter += 1
+        return mix64((self.seed + self.counter * GOLDEN_GAMMA) & MASK64)
+
+    def random(self) -> float:
+        # next64() inlined
+        self.counter += 1
+        z = (self.seed + self.counter * GOLDEN_GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return ((z ^ (z >> 31)) >> 11) * _TWO_POW_MINUS_53
+
+    def randbelow(self, n: int) -> int:
+        """Uniform integer in ``[0, n)``."""
+        if n <= 0:
+            raise ValueError("randbelow() requires n > 0")
+        if n > MASK64:
+            # Rare for prompt sampling; combine outputs and reject
+            bits = n.bit_length()
+            while True:
+                value = 0
+                for _ in range((bits + 63) // 64):
+                    value = (value << 64) | self.next64()
+                value >>= (-bits) % 64
+                if value < n:
+                    return value
+        # next64() inlined: this is the hot path for every draw
+        self.counter += 1
+        z = (self.seed + self.counter * GOLDEN_GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        product = (z ^ (z >> 31)) * n
+        low = product & MASK64
+        if low < n:
+            threshold = ((1 << 64) - n) % n
+            while low < threshold:
+                product = self.next64() * n
+                low = product & MASK64
+        return product >> 64
+
+    def randint(self, a: int, b: int) -> int:
+        n = b - a + 1
+        if n <= 0:
+            raise ValueError(f"empty range for randint({a}, {b})")
+        if n > MASK64:
+            return a + self.randbelow(n)
+        # randbelow() inlined (same draws, without the extra call)
+        self.counter += 1
+        z = (self.seed + self.counter * GOLDEN_GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        product = (z ^ (z >> 31)) * n
+        if (product & MASK64) < n:
+            threshold = ((1 << 64) - n) % n
+            while (product & MASK64) < threshold:
+                product = self.next64() * n
+        return a + (product >> 64)
+
+    def choice(self, seq: Sequence[T]) -> T:
+        n = len(seq)
+        if not n:
+            raise IndexError("cannot choose from an empty sequence")
+        if n > MASK64:
+            return seq[self.randbelow(n)]
+        # randbelow() inlined (same draws, without the extra call)
+        self.counter += 1
+        z = (self.seed + self.counter * GOLDEN_GAMMA) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        product = (z ^ (z >> 31)) * n
+        if (product & MASK64) < n:
+            threshold = ((1 << 64) - n) % n
+            while (product & MASK64) < threshold:
+                product = self.next64() * n
+        return seq[product >> 64]
+
+    def _randbelow_scalar(self, first: int, step: int, count: int) -> List[int]:
+        """``randbelow_range`` one output at a time (small batches and rejections)."""
+        # SplitMix64 and Lemire's reduction inlined; the state (seed + counter *
+        # GAMMA) is advanced by addition
+        state = (self.seed + self.counter * GOLDEN_GAMMA) & MASK64
+        draws = 0
+        result: List[int] = []
+        append = result.append
+        bound = first
+        for _ in range(count):
+            while True:
+                draws += 1
+                state = (state + GOLDEN_GAMMA) & MASK64
+                z = ((state ^ (state >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+                z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+                product = (z ^ (z >> 31)) * bound
+                low = product & MASK64
+                if low >= bound or low >= ((1 << 64) - bound) % bound:
+                    break
+            append(product >> 64)
+            bound += step
+        self.counter += draws
+        return result
+
+    def randbelow_range(self, first: int, step: int, count: int) -> List[int]:
+        """``randbelow(first + step * i)`` for ``i`` in ``range(count)``, in one batch.
+
+        ``step`` is -1, 0 or 1 and every bound must be in ``[1, 2**64)``;
+        these cover ``choices``, ``shuffle`` and Floyd's algorithm. Lemire's
+        product ``z * bound`` is formed for all lanes at once: ``z * first``
+        is one multiplication and ``z * i`` is summed from the bits of the
+        lane index. Rejection needs ``low < bound``, which has probability
+        ``bound / 2**64``; if any lane could need it, the batch is redone
+        draw by draw so the result always matches ``randbelow``.
+        """
+        if count <= 0:
+            return []
+        last = first + step * (count - 1)
+        highest = max(first, last)
+        if min(first, last) < 1 or highest > MASK64:
+            raise ValueError("randbelow_range() bounds must be in [1, 2**64)")
+        if count < _MIN_BLOCK:
+            return self._randbelow_scalar(first, step, count)
+        result: List[int] = []
+        done = 0
+        while done < count:
+            size = min(count - done, _MAX_BLOCK)
+            lanes = _lane_count(size)
+            z = _packed_outputs(self.seed, self.counter + done, lanes)
+            if size < lanes:
+                z &= (1 << (128 * size)) - 1
+            product = z * (first + step * done)
+            if step:
+                index_bits = _lane_constants(lanes)[3]
+                scaled = 0
+                for bit in range((size - 1).bit_length()):
+                    scaled += (z & index_bits[bit]) << bit
+                product = product + scaled if step > 0 else product - scaled
+            words = _unpack(product, size)
+            if min(words[::2]) < highest:
+                return self._randbelow_scalar(first, step, count)
+            result.extend(words[1::2])
+            done += size
+        self.counter += count
+        return result
+
+    def choices(
+        self,
+        population: Sequence[T],
+        weights: Optional[Sequence[float]] = None,
+        *,
+        cum_weights: Optional[Sequence[float]] = None,
+        k: int = 1,
+    ) -> List[T]:
+        """Weighted draws with replacement (``random.choices`` semantics)."""
+        n = len(population)
+        if cum_weights is None:
+            if weights is None:
+                if not n or n > MASK64:
+                    return [population[self.randbelow(n)] for _ in range(k)]
+                return [population[i] for i in self.randbelow_range(n, 0, k)]
+            cum_weights = list(accumulate(weights))
+        total = cum_weights[-1] * _TWO_POW_MINUS_53
+        hi = n - 1
+        outputs = splitmix_block(self.seed, self.counter, max(0, k))
+        self.counter += len(outputs)
+        return [population[bisect_right(cum_weights, (z >> 11) * total, 0, hi)] for z in outputs]
+
+    def shuffle(self, items: MutableSequence) -> None:
+        n = len(items)
+        if n > MASK64:
+            for i in range(n - 1, 0, -1):
+                j = self.randbelow(i + 1)
+                items[i], items[j] = items[j], items[i]
+            return
+        for i, j in zip(range(n - 1, 0, -1), self.randbelow_range(n, -1, n - 1)):
+            items[i], items[j] = items[j], items[i]
+
+    def sample_indices(self, n: int, k: int) -> List[int]:
+        """``k`` distinct indices from ``range(n)`` via Floyd's algorithm."""
+        if not 0 <= k <= n:
+            raise ValueError("sample larger than population or is negative")
+        if n > MASK64:
+            picked_big: dict = {}
+            for j in range(n - k, n):
+                t = self.randbelow(j + 1)
+                picked_big[j if t in picked_big else t] = None
+            result = list(picked_big)
+            self.shuffle(result)
+            return result
+        # Floyd's bounds do not depend on earlier picks, so every draw for the
+        # selection and the shuffle of the k picks comes from a single batch
+        picked: dict = {}
+        for j, t in zip(range(n - k, n), self.randbelow_range(n - k + 1, 1, k)):
+            picked[j if t in picked else t] = None
+        result = list(picked)
+        for i, j in zip(range(k - 1, 0, -1), self.randbelow_range(k, -1, k - 1)):
+            result[i], result[j] = result[j], result[i]
+        return result
+
+    def sample(self, population: Sequence[T], k: int) -> List[T]:
+        return [population[i] for i in self.sample_indices(len(population), k)]
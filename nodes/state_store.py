@@ -0,0 +1,262 @@
+"""Small JSON-backed state files for cursors and counters that must survive restarts."""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:  # ComfyUI runtime
+    import folder_paths  # type: ignore
+except Exception:  # pragma: no cover - during tests folder_paths unavailable
+    folder_paths = None  # type: ignore
+
+STATE_DIR_ENV = "ICHIS_STATE_DIR"
+STATE_SUBDIR = "ichis_state"
+
+# Everything with pending writes to flush at exit (JsonStateStore, BinaryStateFile)
+_OPEN_STORES: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def get_state_dir() -> str:
+    """Return the directory used for persisted node state.
+
+    Resolution order: the ``ICHIS_STATE_DIR`` environment variable, the
+    ComfyUI user directory, then a folder next to this package.
+    """
+    override = os.environ.get(STATE_DIR_ENV, "").strip()
+    if override:
+        return os.path.abspath(os.path.expandvars(os.path.expanduser(override)))
+    if folder_paths is not None:
+        try:
+            return os.path.join(folder_paths.get_user_directory(), STATE_SUBDIR)
+        except Exception:
+            pass
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(package_root, STATE_SUBDIR)
+
+
+def _atomic_write(path: str, payload: bytes, name: str) -> bool:
+    """Replace ``path`` with ``payload`` via a temp file + rename."""
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(name)}.", suffix=".tmp", dir=os.path.dirname(path)
+        )
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(payload)
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        return False
+    return True
+
+
+class JsonStateStore:
+    """Thread-safe key/value store persisted as a single JSON file.
+
+    Values must be JSON serialisable. Writes are atomic (temp file + rename)
+    and can be throttled with ``flush_interval`` so hot counters do not hit
+    the disk on every update; pending writes are flushed at interpreter exit.
+    ``name`` may contain ``/`` to group related files in a sub-directory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Optional[str] = None,
+        flush_interval: float = 0.0,
+    ) -> None:
+        self.name = name
+        self._directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, object]] = None
+        self._loaded_path: Optional[str] = None
+        self._dirty = False
+        self._last_flush = 0.0
+        _OPEN_STORES.add(self)
+
+    @property
+    def path(self) -> str:
+        directory = self._directory or get_state_dir()
+        return os.path.join(directory, f"{self.name}.json")
+
+    def _ensure_loaded(self) -> Dict[str, object]:
+        path = self.path
+        if self._data is not None and self._loaded_path == path:
+            return self._data
+        data: Dict[str, object] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                loaded = json.load(fh)
+            if isinstance(loaded, dict):
+                data = loaded
+        except (OSError, ValueError):
+            data = {}
+        self._data = data
+        self._loaded_path = path
+        self._dirty = False
+        return data
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._ensure_loaded().get(key, default)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ensure_loaded())
+
+    def items(self) -> List[Tuple[str, object]]:
+        """Snapshot of every ``(key, value)`` pair."""
+        with self._lock:
+            return list(self._ensure_loaded().items())
+
+    def trim(self, max_entries: int, field: str = "used", persist: bool = True) -> int:
+        """Drop entries with the smallest ``field`` until at most ``max_entries`` remain.
+
+        Meant for dict values that record when they were last used; entries
+        without the field go first. Returns how many entries were dropped.
+        """
+        with self._lock:
+            excess = max(0, len(self) - max(0, int(max_entries)))
+            if excess:
+                ranked = sorted(
+                    self.items(),
+                    key=lambda item: item[1].get(field, 0) if isinstance(item[1], dict) else 0,
+                )
+                data = self._ensure_loaded()
+                for key, _ in ranked[:excess]:
+                    data.pop(key, None)
+                self._dirty = True
+            if persist and self._dirty:
+                self._maybe_flush()
+            return excess
+
+    def set(self, key: str, value, persist: bool = True) -> None:
+        with self._lock:
+            self._ensure_loaded()[key] = value
+            self._dirty = True
+            if persist:
+                self._maybe_flush()
+
+    def update(self, key: str, func: Callable[[object], object], default=None, persist: bool = True):
+        """Atomically replace ``key`` with ``func(current)`` and return the new value."""
+        with self._lock:
+            data = self._ensure_loaded()
+            value = func(data.get(key, default))
+            data[key] = value
+            self._dirty = True
+            if persist:
+                self._maybe_flush()
+            return value
+
+    def delete(self, key: str, persist: bool = True) -> None:
+        with self._lock:
+            data = self._ensure_loaded()
+            if key in data:
+                del data[key]
+                self._dirty = True
+                if persist:
+                    self._maybe_flush()
+
+    def clear(self, persist: bool = True) -> None:
+        with self._lock:
+            self._data = {}
+            self._loaded_path = self.path
+            self._dirty = True
+            if persist:
+                self.flush()
+
+    def invalidate(self) -> None:
+        """Drop the in-memory copy so the next access re-reads the file."""
+        with self._lock:
+            self._data = None
+            self._loaded_path = None
+            self._dirty = False
+
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Write pending changes to disk. Returns False if the write failed."""
+        with self._lock:
+            if not self._dirty or self._data is None:
+                return True
+            try:
+                payload = json.dumps(self._data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+            except (TypeError, ValueError):
+                return False
+            if not _atomic_write(self.path, payload, self.name):
+                return False
+            self._dirty = False
+            self._last_flush = time.monotonic()
+            return True
+
+
+class BinaryStateFile:
+    """A single binary blob persisted atomically, for state too big for JSON.
+
+    ``set_lazy`` records how to produce the blob; nothing is encoded until
+    ``flush()`` is called explicitly or at interpreter exit, so callers decide
+    how often a large value is rewritten.
+    """
+
+    def __init__(self, name: str, directory: Optional[str] = None, suffix: str = ".bin") -> None:
+        self.name = name
+        self._directory = directory
+        self._suffix = suffix
+        self._lock = threading.RLock()
+        self._producer: Optional[Callable[[], bytes]] = None
+        _OPEN_STORES.add(self)
+
+    @property
+    def path(self) -> str:
+        directory = self._directory or get_state_dir()
+        return os.path.join(directory, f"{self.name}{self._suffix}")
+
+    def read(self) -> Optional[bytes]:
+        try:
+            with open(self.path, "rb") as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def set_lazy(self, producer: Callable[[], bytes]) -> None:
+        with self._lock:
+            self._producer = producer
+
+    def delete(self) -> None:
+        with self._lock:
+            self._producer = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def flush(self) -> bool:
+        """Write the pending blob, if any. Returns False if the write failed."""
+        with self._lock:
+            if self._producer is None:
+                return True
+            if not _atomic_write(self.path, self._producer(), self.name):
+                return False
+            self._producer = None
+            return True
+
+
+@atexit.register
+def flush_all_stores() -> None:
+    for store in list(_OPEN_STORES):
+        store.flush()
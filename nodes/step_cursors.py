@@ -0,0 +1,116 @@
+"""Per-node step cursors that survive restarts.
+
+A cursor is keyed by the node's ComfyUI ``unique_id`` *and* a digest of the
+source it steps through (text content, file path, ratio list, ...), so one
+node alternating between sources resumes each of them where it left off
+instead of starting over. Node ids are only unique within a graph: two
+workflows that reuse an id keep separate cursors as long as their sources
+differ, but share one cursor when they step through the same source.
+
+The store keeps at most ``MAX_CURSORS`` entries; the least recently used ones
+are evicted first.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from .state_store import JsonStateStore
+
+CURSOR_STORE_NAME = "step_cursors"
+CURSOR_FLUSH_INTERVAL = 1.0
+MAX_CURSORS = 1024
+
+
+class StepCursorStore:
+    """Lock-protected cursor positions persisted through ``JsonStateStore``.
+
+    ``advance`` is a single read-modify-write under the store lock, so
+    concurrent executions of the same node each get a distinct position.
+    Writes are flushed at most every ``flush_interval`` seconds and at exit.
+    Every entry records when it was last used so the store can be trimmed
+    back to ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        name: str = CURSOR_STORE_NAME,
+        flush_interval: float = CURSOR_FLUSH_INTERVAL,
+        max_entries: int = MAX_CURSORS,
+    ) -> None:
+        self._store = JsonStateStore(name, flush_interval=flush_interval)
+        self.max_entries = max(1, int(max_entries))
+        self._clock_lock = threading.Lock()
+        self._last_used = 0.0
+
+    @staticmethod
+    def _entry_key(key: str, signature: str) -> str:
+        digest = hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+        return f"{key}:{digest}"
+
+    def _now(self) -> float:
+        # Strictly increasing, so entries touched back to back keep their order
+        with self._clock_lock:
+            self._last_used = max(time.time(), self._last_used + 1e-6)
+            return self._last_used
+
+    @staticmethod
+    def _position(entry: object, signature: str) -> int:
+        if isinstance(entry, dict) and entry.get("signature") == signature:
+            try:
+                return max(0, int(entry.get("position", 0)))
+            except (TypeError, ValueError):
+                return 0
+        return 0
+
+    def peek(self, key: str, signature: str) -> int:
+        """Current position of ``key`` for ``signature``, or 0 if it has none."""
+        return self._position(self._store.get(self._entry_key(key, signature)), signature)
+
+    def advance(self, key: str, signature: str, size: Optional[int] = None, step: int = 1,
+                reset: bool = False) -> int:
+        """Return the position to use now and move the cursor ``step`` ahead.
+
+        With ``size`` the cursor wraps around (positions stay in ``[0, size)``);
+        without it the position grows without bound.
+        """
+        taken = [0]
+        used = self._now()
+
+        def bump(entry: object) -> dict:
+            position = 0 if reset else self._position(entry, signature)
+            if size:
+                position %= size
+            taken[0] = position
+            following = position + step
+            if size:
+                following %= size
+            return {"key": key, "signature": signature, "position": following, "used": used}
+
+        self._store.update(self._entry_key(key, signature), bump)
+        if len(self._store) > self.max_entries:
+            self._store.trim(self.max_entries)
+        return taken[0]
+
+    def reset(self, key: str) -> None:
+        """Forget every cursor of ``key``, whatever source it was stepping through."""
+        for entry_key, entry in self._store.items():
+            if isinstance(entry, dict) and entry.get("key") == key:
+                self._store.delete(entry_key)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def flush(self) -> bool:
+        return self._store.flush()
+
+    def invalidate(self) -> None:
+        """Flush and drop the in-memory copy; the next access re-reads the file."""
+        self._store.flush()
+        self._store.invalidate()
+
+
+STEP_CURSORS = StepCursorStore()
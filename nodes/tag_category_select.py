@@ -1,10 +1,10 @@
 import hashlib
-import time
-import uuid
 from typing import Dict, Iterable, List, Sequence
 
 from .tag_data_utils import (
     TagMetadata,
+    clear_category_caches,
+    get_category_bitsets,
     metadata_from_payload,
     normalize_categories_selection,
     parse_categories_string,
@@ -12,7 +12,12 @@ from .tag_data_utils import (
 
 
 class ICHIS_Tag_Category_Select:
-    """Select categories from loaded tag metadata."""
+    """Select categories from loaded tag metadata.
+
+    The selection payload is content-addressed: identical selections produce
+    identical payloads (keyed by ``selection_signature``), so ComfyUI can cache
+    everything downstream.
+    """
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -56,6 +61,10 @@ class ICHIS_Tag_Category_Select:
         parts = [meta_signature, categories, str(int(allow_empty))]
         return "|".join(parts)
 
+    @classmethod
+    def clear_cache(cls):
+        clear_category_caches()
+
     def _ensure_metadata(self, metadata_obj) -> TagMetadata:
         if isinstance(metadata_obj, TagMetadata):
             return metadata_obj
@@ -69,6 +78,20 @@ class ICHIS_Tag_Category_Select:
         hasher.update("||".join(selected).encode("utf-8"))
         return hasher.hexdigest()
 
+    def _category_union(self, metadata: TagMetadata, selected: Sequence[str]) -> List[str]:
+        # Only loader-produced metadata has a content signature we can trust;
+        # its unions are memoised by the shared CategoryBitsets
+        if metadata.cache_signature:
+            return list(get_category_bitsets(metadata).union(selected))
+        seen = set()
+        deduped_tags: List[str] = []
+        for category in selected:
+            for tag in metadata.tags_by_category.get(category, []):
+                if tag not in seen:
+                    seen.add(tag)
+                    deduped_tags.append(tag)
+        return deduped_tags
+
     def select_categories(
         self,
         tag_metadata,
@@ -88,23 +111,14 @@ class ICHIS_Tag_Category_Select:
             # Respect empty selections - don't auto-default to first category
             # This allows users to intentionally clear category selections
             selected = []
-        category_tags: List[str] = []
-        for category in selected:
-            category_tags.extend(metadata.tags_by_category.get(category, []))
-        # dedupe while preserving order
-        seen = set()
-        deduped_tags: List[str] = []
-        for tag in category_tags:
-            if tag not in seen:
-                seen.add(tag)
-                deduped_tags.append(tag)
+        signature = self._compute_signature(metadata, selected)
+        # dedupe while preserving order; payload and outputs share one copy
+        deduped_tags = self._category_union(metadata, selected)
         selection_payload: Dict[str, object] = {
-            "selected_categories": list(selected),
-            "category_tags": list(deduped_tags),
+            "selected_categories": selected,
+            "category_tags": deduped_tags,
             "metadata_signature": metadata.cache_signature,
-            "selection_signature": self._compute_signature(metadata, selected),
-            "timestamp": time.time(),
-            "id": str(uuid.uuid4()),
+            "selection_signature": signature,
         }
         if debug:
             selection_payload["debug"] = {
@@ -113,6 +127,6 @@ class ICHIS_Tag_Category_Select:
             }
         return (
             selection_payload,
-            list(selected),
+            selected,
             deduped_tags,
         )
@@ -0,0 +1,171 @@
+import hashlib
+import time
+import uuid
+from typing import List, Optional, Sequence
+
+from .step_cursors import STEP_CURSORS
+from .tag_data_utils import (
+    TagMetadata,
+    metadata_from_payload,
+    normalize_categories_selection,
+)
+
+
+def combination_count(radices: Sequence[int]) -> int:
+    """Number of combinations for a mixed-radix space (0 if any radix is empty)."""
+    total = 1
+    for radix in radices:
+        total *= radix
+    return total if radices else 0
+
+
+def combination_digits(index: int, radices: Sequence[int]) -> List[int]:
+    """Decode ``index`` into one digit per radix in O(len(radices)).
+
+    The last radix varies fastest, so consecutive indices walk the product
+    in the same order as ``itertools.product``.
+    """
+    digits = [0] * len(radices)
+    for pos in range(len(radices) - 1, -1, -1):
+        index, digits[pos] = divmod(index, radices[pos])
+    return digits
+
+
+class ICHIS_Tag_Combinations:
+    """
+    Enumerate the Cartesian product of the selected categories lazily, one tag
+    from each category per combination.
+
+    Combinations are addressed by index (mixed-radix decoding), so any slice of
+    a product with billions of entries can be produced without materialising it.
+    ``shard_index``/``shard_count`` stride the index space so several workers can
+    walk disjoint parts of the same product. In ``step`` mode each node keeps
+    its cursor in ``STEP_CURSORS``, keyed by node id and selection/shard.
+    """
+
+    # Step cursor for direct calls without a unique_id; graph nodes keep
+    # their own persisted cursor in STEP_CURSORS
+    step_position = 0
+    step_signature: Optional[str] = None
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "tag_metadata": ("ICHIS_TAG_METADATA", {}),
+                "mode": (["index", "step"], {"default": "index"}),
+            },
+            "optional": {
+                "tag_selection": ("ICHIS_TAG_SELECTION", {}),
+                "category_list": ("LIST", {}),
+                "start_index": (
+                    "INT",
+                    {"default": 0, "min": 0, "max": 0xFFFFFFFFFFFFFFFF},
+                ),
+                "count": ("INT", {"default": 1, "min": 1, "max": 4096}),
+                "shard_index": ("INT", {"default": 0, "min": 0, "max": 4095}),
+                "shard_count": ("INT", {"default": 1, "min": 1, "max": 4096}),
+                "delimiter": ("STRING", {"default": ", "}),
+                "reset_step": ("BOOLEAN", {"default": False}),
+                "debug": ("BOOLEAN", {"default": False}),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"},
+        }
+
+    RETURN_TYPES = ("STRING", "LIST", "INT", "INT")
+    RETURN_NAMES = ("tags", "combinations", "index_used", "total")
+    FUNCTION = "enumerate_combinations"
+    CATEGORY = "ICHIS"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        if kwargs.get("reset_step", False) or kwargs.get("mode", "index") == "step":
+            return f"{time.time()}_{uuid.uuid4()}"
+        return None
+
+    def _ensure_metadata(self, metadata_obj) -> TagMetadata:
+        if isinstance(metadata_obj, TagMetadata):
+            return metadata_obj
+        if isinstance(metadata_obj, dict):
+            return metadata_from_payload(metadata_obj)
+        raise TypeError("tag_metadata must be TagMetadata or payload dict")
+
+    def _select_categories(self, metadata: TagMetadata, tag_selection, category_list) -> List[str]:
+        if category_list:
+            return normalize_categories_selection(category_list, metadata)
+        if isinstance(tag_selection, dict):
+            selected = tag_selection.get("selected_categories") or []
+            return normalize_categories_selection(selected, metadata)
+        return list(metadata.categories)
+
+    def _cursor_signature(
+        self, metadata: TagMetadata, categories: Sequence[str], shard_index: int, shard_count: int
+    ) -> str:
+        hasher = hashlib.sha1()
+        hasher.update(str(metadata.cache_signature or metadata.resolved_path).encode("utf-8"))
+        hasher.update("||".join(categories).encode("utf-8"))
+        hasher.update(f"{shard_index}/{shard_count}".encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _advance_step(self, unique_id, signature: str, size: int, step: int, reset: bool) -> int:
+        if unique_id:
+            return STEP_CURSORS.advance(f"tag_combinations:{unique_id}", signature, size, step, reset)
+        position = 0 if reset or self.step_signature != signature else self.step_position % size
+        self.step_signature, self.step_position = signature, (position + step) % size
+        return position
+
+    def enumerate_combinations(
+        self,
+        tag_metadata,
+        mode: str = "index",
+        tag_selection=None,
+        category_list=None,
+        start_index: int = 0,
+        count: int = 1,
+        shard_index: int = 0,
+        shard_count: int = 1,
+        delimiter: str = ", ",
+        reset_step: bool = False,
+        debug: bool = False,
+        unique_id=None,
+    ) -> tuple:
+        metadata = self._ensure_metadata(tag_metadata)
+        categories = [
+            category
+            for category in self._select_categories(metadata, tag_selection, category_list)
+            if metadata.tags_by_category.get(category)
+        ]
+        pools = [metadata.tags_by_category[category] for category in categories]
+        radices = [len(pool) for pool in pools]
+        total = combination_count(radices)
+        shard_count = max(1, shard_count)
+        shard_index = shard_index % shard_count
+        # Number of combinations owned by this shard
+        shard_total = max(0, (total - shard_index + shard_count - 1) // shard_count)
+
+        if debug:
+            print(f"[Tag_Combinations] categories={categories} radices={radices}")
+            print(f"[Tag_Combinations] total={total} shard={shard_index}/{shard_count} ({shard_total})")
+
+        if shard_total == 0:
+            return ("", [], 0, total)
+
+        if mode == "step":
+            signature = self._cursor_signature(metadata, categories, shard_index, shard_count)
+            local_start = self._advance_step(unique_id, signature, shard_total, count, reset_step)
+        else:
+            local_start = start_index % shard_total
+
+        combinations: List[str] = []
+        first_index = shard_index + local_start * shard_count
+        for offset in range(min(count, shard_total)):
+            local = (local_start + offset) % shard_total
+            index = shard_index + local * shard_count
+            digits = combination_digits(index, radices)
+            combinations.append(
+                delimiter.join(pool[digit] for pool, digit in zip(pools, digits))
+            )
+
+        if debug:
+            print(f"[Tag_Combinations] first_index={first_index} emitted={len(combinations)}")
+        return ("\n".join(combinations), combinations, first_index, total)
@@ -0,0 +1,134 @@
+"""Coverage-balanced sampling that favours tags which have been used the least."""
+
+from __future__ import annotations
+
+import math
+import random
+from typing import Dict, List, Optional, Sequence
+
+# Usage deficits beyond this are treated the same, which keeps weights far
+# away from float underflow no matter how unbalanced the history is.
+MAX_DEFICIT_WEIGHT_EXPONENT = 60.0
+
+
+class FenwickTree:
+    """Binary indexed tree over float weights with O(log n) update and search."""
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        self.size = len(weights)
+        tree = [0.0] * (self.size + 1)
+        for i, weight in enumerate(weights, start=1):
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._weights = list(weights)
+        self._top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def weight(self, index: int) -> float:
+        return self._weights[index]
+
+    def total(self) -> float:
+        result = 0.0
+        i = self.size
+        while i > 0:
+            result += self._tree[i]
+            i -= i & -i
+        return result
+
+    def set(self, index: int, weight: float) -> None:
+        delta = weight - self._weights[index]
+        self._weights[index] = weight
+        i = index + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def find(self, target: float) -> int:
+        """Return the smallest index whose prefix sum exceeds ``target``."""
+        pos = 0
+        step = self._top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        # Guard against float drift pushing us past the last positive weight
+        pos = min(pos, self.size - 1)
+        while pos > 0 and self._weights[pos] <= 0.0:
+            pos -= 1
+        return pos
+
+
+class CoverageTracker:
+    """Per-tag usage counters with draws biased toward under-used tags.
+
+    A tag's weight is ``exp(-strength * (count - floor))`` where ``floor`` is
+    the lowest usage count in the pool. The floor only rises once every tag has
+    been used at least once more, so the O(n) re-weighting it triggers is
+    amortised over at least ``n`` draws; individual draws and updates are
+    O(log n).
+    """
+
+    def __init__(self, size: int, counts: Optional[Sequence[int]] = None, strength: float = 1.0) -> None:
+        self.size = max(0, int(size))
+        if counts is not None and len(counts) == self.size:
+            self.counts = [max(0, int(c)) for c in counts]
+        else:
+            self.counts = [0] * self.size
+        self.strength = max(0.0, float(strength))
+        self._rebuild()
+
+    def _weight_for(self, count: int) -> float:
+        exponent = min(self.strength * (count - self.floor), MAX_DEFICIT_WEIGHT_EXPONENT)
+        return math.exp(-exponent)
+
+    def _rebuild(self) -> None:
+        self.floor = min(self.counts) if self.counts else 0
+        self._at_floor = sum(1 for c in self.counts if c == self.floor)
+        self._tree = FenwickTree([self._weight_for(c) for c in self.counts])
+
+    def set_strength(self, strength: float) -> None:
+        strength = max(0.0, float(strength))
+        if strength != self.strength:
+            self.strength = strength
+            self._rebuild()
+
+    def record(self, index: int) -> None:
+        """Increment the usage counter of ``index``."""
+        count = self.counts[index]
+        self.counts[index] = count + 1
+        if count == self.floor:
+            self._at_floor -= 1
+            if self._at_floor == 0:
+                self._rebuild()
+                return
+        self._tree.set(index, self._weight_for(count + 1))
+
+    def draw(self, k: int, rng: random.Random, unique: bool = True) -> List[int]:
+        """Draw ``k`` indices weighted toward low usage and record them."""
+        if self.size == 0 or k <= 0:
+            return []
+        if unique:
+            k = min(k, self.size)
+        chosen: List[int] = []
+        suppressed: Dict[int, float] = {}
+        for _ in range(k):
+            total = self._tree.total()
+            if total <= 0.0:
+                break
+            index = self._tree.find(rng.random() * total)
+            chosen.append(index)
+            if unique:
+                suppressed[index] = self._tree.weight(index)
+                self._tree.set(index, 0.0)
+        for index, weight in suppressed.items():
+            self._tree.set(index, weight)
+        for index in chosen:
+            self.record(index)
+        return chosen
+
+    def state(self) -> Dict[str, object]:
+        return {"size": self.size, "counts": list(self.counts)}
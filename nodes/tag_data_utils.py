@@ -3,14 +3,23 @@
 from __future__ import annotations
 
 import csv
+import fnmatch
 import hashlib
 import json
 import os
+import re
 import traceback
+from bisect import bisect_left
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 UNCATEGORIZED_LABEL = "uncategorized"
+GLOB_CHARS = "*?["
+EXCLUDE_PREFIX = "!"
+CATEGORY_INDEX_CACHE_SIZE = 32
+UNION_CACHE_SIZE = 64
 
 
 def split_tags_field(value: str) -> List[str]:
@@ -272,27 +281,220 @@ def metadata_from_payload(payload: Dict[str, object]) -> TagMetadata:
     return metadata
 
 
+@lru_cache(maxsize=256)
+def _compile_glob(pattern: str) -> "re.Pattern[str]":
+    return re.compile(fnmatch.translate(pattern))
+
+
+class CategoryIndex:
+    """Sorted index of category names for prefix and glob lookups.
+
+    Names are kept sorted by their canonical form (lower-cased when the
+    metadata ignores case), so a selector such as ``clothes/*`` resolves with
+    two bisects plus the size of the match instead of a scan over every
+    category. Globs with a wildcard in the middle are narrowed to the range
+    sharing their literal prefix before the compiled pattern is applied.
+    """
+
+    def __init__(self, metadata: TagMetadata) -> None:
+        self.ignore_case = metadata.ignore_case
+        entries = sorted(
+            (self.canonical(name), name) for name in metadata.categories
+        )
+        self._keys = [key for key, _ in entries]
+        self._names = [name for _, name in entries]
+        self._position = {name: i for i, name in enumerate(metadata.categories)}
+
+    def canonical(self, value: str) -> str:
+        return value.lower() if self.ignore_case else value
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def match(self, pattern: str) -> List[str]:
+        """Return categories matching a glob or ``prefix/`` selector, in metadata order."""
+        key = self.canonical(pattern)
+        if key.endswith("/") and not any(ch in key for ch in GLOB_CHARS):
+            key += "*"
+        cut = min((key.find(ch) for ch in GLOB_CHARS if ch in key), default=len(key))
+        literal = key[:cut]
+        lo, hi = self._prefix_range(literal)
+        if key == literal + "*":
+            matched = self._names[lo:hi]
+        elif cut == len(key):
+            matched = [self._names[i] for i in range(lo, hi) if self._keys[i] == key]
+        else:
+            regex = _compile_glob(key)
+            matched = [self._names[i] for i in range(lo, hi) if regex.match(self._keys[i])]
+        return sorted(matched, key=self._position.__getitem__)
+
+
+class CategoryBitsets:
+    """Per-category tag-id bitmaps used to build category unions.
+
+    Every distinct tag gets an id (its position in the metadata's tag
+    universe) and each category becomes a Python int with those bits set.
+    One AND per category tells whether it overlaps the categories before it,
+    so disjoint categories are appended as whole lists and only overlapping
+    ones are filtered tag by tag.
+    """
+
+    def __init__(self, metadata: TagMetadata) -> None:
+        universe: List[str] = list(metadata.all_tags)
+        ids: Dict[str, int] = {tag: i for i, tag in enumerate(universe)}
+        for tags in metadata.tags_by_category.values():
+            for tag in tags:
+                if tag not in ids:
+                    ids[tag] = len(universe)
+                    universe.append(tag)
+        self.tags = universe
+        self.ids = ids
+        self.masks: Dict[str, int] = {}
+        width = (len(universe) + 7) // 8
+        for category, tags in metadata.tags_by_category.items():
+            bits = bytearray(width)
+            for tag in tags:
+                i = ids[tag]
+                bits[i >> 3] |= 1 << (i & 7)
+            self.masks[category] = int.from_bytes(bytes(bits), "little")
+        self._tags_by_category = metadata.tags_by_category
+        self._unions: "OrderedDict[Tuple[str, ...], Tuple[str, ...]]" = OrderedDict()
+
+    def union(self, categories: Sequence[str]) -> Tuple[str, ...]:
+        """Deduplicated tags of ``categories`` in selection order.
+
+        Same result as concatenating the category lists and dropping repeats.
+        Results are memoised per category list (LRU of ``UNION_CACHE_SIZE``)
+        and shared between callers, hence the immutable tuple.
+        """
+        key = tuple(categories)
+        cached = self._unions.get(key)
+        if cached is not None:
+            self._unions.move_to_end(key)
+            return cached
+        result = self._build_union(key)
+        self._unions[key] = result
+        if len(self._unions) > UNION_CACHE_SIZE:
+            self._unions.popitem(last=False)
+        return result
+
+    def _build_union(self, categories: Tuple[str, ...]) -> Tuple[str, ...]:
+        # Categories that share no tag with the ones before them are appended
+        # wholesale; a ``seen`` set is only built once an overlap shows up.
+        result: List[str] = []
+        covered = 0
+        seen: Optional[set] = None
+        for category in categories:
+            mask = self.masks.get(category, 0)
+            if not mask:
+                continue
+            fresh = mask & ~covered
+            if fresh == mask:
+                result.extend(self._tags_by_category[category])
+            elif fresh:
+                if seen is None:
+                    seen = set(result)
+                result.extend(t for t in self._tags_by_category[category] if t not in seen)
+            else:
+                continue
+            covered |= mask
+            if seen is not None:
+                seen.update(self._tags_by_category[category])
+        return tuple(result)
+
+
+_CATEGORY_INDEXES: "OrderedDict[str, CategoryIndex]" = OrderedDict()
+_CATEGORY_BITSETS: "OrderedDict[str, CategoryBitsets]" = OrderedDict()
+
+
+def clear_category_caches() -> None:
+    """Forget every cached ``CategoryIndex`` and ``CategoryBitsets``."""
+    _CATEGORY_INDEXES.clear()
+    _CATEGORY_BITSETS.clear()
+
+
+def _per_signature(cache: "OrderedDict", metadata: TagMetadata, factory):
+    signature = metadata.cache_signature
+    if not signature:
+        return factory(metadata)
+    value = cache.get(signature)
+    if value is None:
+        value = factory(metadata)
+        cache[signature] = value
+        if len(cache) > CATEGORY_INDEX_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(signature)
+    return value
+
+
+def get_category_index(metadata: TagMetadata) -> CategoryIndex:
+    """Return the ``CategoryIndex`` for ``metadata``, built once per cache signature."""
+    return _per_signature(_CATEGORY_INDEXES, metadata, CategoryIndex)
+
+
+def get_category_bitsets(metadata: TagMetadata) -> CategoryBitsets:
+    """Return the ``CategoryBitsets`` for ``metadata``, built once per cache signature."""
+    return _per_signature(_CATEGORY_BITSETS, metadata, CategoryBitsets)
+
+
+def _is_selector(candidate: str) -> bool:
+    return (
+        candidate.startswith(EXCLUDE_PREFIX)
+        or candidate.endswith("/")
+        or any(ch in candidate for ch in GLOB_CHARS)
+    )
+
+
 def normalize_categories_selection(
     categories: Iterable[str],
     metadata: TagMetadata,
 ) -> List[str]:
-    """Normalize a list of category strings against available metadata."""
+    """Normalize a list of category strings against available metadata.
+
+    Besides exact names, entries may be selectors: globs (``clothes/*``,
+    ``*dress*``), prefixes (``clothes/``) and exclusions (``!clothes/hats``,
+    ``!*/hats``). Exclusions apply after all inclusions; a list made only of
+    exclusions starts from every category. Exact category names always win,
+    so names that happen to contain glob characters still resolve literally.
+    """
     normalized: List[str] = []
+    excluded: List[str] = []
     alias_map = metadata.category_alias_map or {}
     ignore_case = metadata.ignore_case
     seen = set()
+    has_inclusions = False
+    index: Optional[CategoryIndex] = None
     for raw in categories:
         candidate = (raw or "").strip()
         if not candidate:
             continue
         canonical = candidate.lower() if ignore_case else candidate
         if canonical in alias_map:
-            resolved = alias_map[canonical]
+            resolved = [alias_map[canonical]]
+        elif candidate in metadata.tags_by_category:
+            resolved = [candidate]
+        elif _is_selector(candidate):
+            if index is None:
+                index = get_category_index(metadata)
+            if candidate.startswith(EXCLUDE_PREFIX):
+                excluded.extend(index.match(candidate[len(EXCLUDE_PREFIX):].strip()))
+                continue
+            resolved = index.match(candidate)
         else:
-            resolved = candidate
-        if resolved not in seen and resolved in metadata.tags_by_category:
-            seen.add(resolved)
-            normalized.append(resolved)
+            resolved = [candidate]
+        has_inclusions = True
+        for name in resolved:
+            if name not in seen and name in metadata.tags_by_category:
+                seen.add(name)
+                normalized.append(name)
+    if excluded:
+        if not has_inclusions:
+            normalized = [name for name in metadata.categories if name in metadata.tags_by_category]
+        drop = set(excluded)
+        normalized = [name for name in normalized if name not in drop]
     return normalized
 
 
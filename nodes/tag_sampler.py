@@ -1,21 +1,60 @@
+import hashlib
 import random as rand_module
 import time
 import uuid
-from typing import Dict, List, Sequence
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
 
+from .combination_filter import CombinationFilter
+from .count_distribution import COUNT_DISTRIBUTIONS, CountDistribution, get_count_distribution
+from .shuffle_bag import ShuffleBag
+from .stable_random import StableRandom, derive_seed
+from .state_store import BinaryStateFile, JsonStateStore
+from .tag_coverage import CoverageTracker
 from .tag_data_utils import (
     TagMetadata,
+    get_category_bitsets,
     metadata_from_payload,
     normalize_categories_selection,
 )
 
+SAMPLING_MODES = ["random", "epoch", "coverage"]
+RNG_ALGORITHMS = ["stdlib", "stable"]
+
 
 class ICHIS_Tag_Sampler:
     """
     Sample tags from metadata produced by ``ICHIS_Tag_File_Loader`` and
     ``ICHIS_Tag_Category_Select``.
+
+    ``sampling_mode="epoch"`` walks a seeded permutation of the candidate pool
+    so every tag is used once before any repeats; cursors are persisted to a
+    small state file so long runs survive restarts. ``sampling_mode="coverage"``
+    keeps per-tag usage counters and biases every draw toward the least-used
+    tags, which evens out long-tail tags across large datasets.
+    ``no_repeat_combinations`` remembers every emitted (sorted) combination in
+    a memory-bounded filter and redraws on collision. ``rng_algorithm="stable"``
+    uses the self-contained generator in ``stable_random`` so stored seeds
+    replay identically on any Python version. ``count_distribution`` shapes how
+    many tags each prompt gets, and ``batch_size`` produces several prompts in
+    one execution (all counts drawn in a single call per pool); the outputs are
+    then per prompt: newline-joined prompts, the prompt count and the prompt list.
+    Every batch slot yields one entry; a draw of zero tags is an empty string.
     """
 
+    _EPOCH_STORE = JsonStateStore("tag_sampler_epochs")
+    _EPOCH_BAGS: "OrderedDict[str, ShuffleBag]" = OrderedDict()
+    # Epoch cursors are keyed by selection and seed; keep the most recently used
+    _EPOCH_LIMIT = 256
+    _COVERAGE_STORE = JsonStateStore("tag_sampler_coverage")
+    _COVERAGE_TRACKERS: Dict[str, CoverageTracker] = {}
+    _SEEN_FILES: Dict[str, BinaryStateFile] = {}
+    _SEEN_FILTERS: Dict[str, CombinationFilter] = {}
+    # Seen filters can be megabytes; rewrite them every N new combinations
+    # (and at exit) rather than on every run
+    _SEEN_PENDING: Dict[str, int] = {}
+    _SEEN_SAVE_EVERY = 1000
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
@@ -34,6 +73,36 @@ class ICHIS_Tag_Sampler:
                 "unique_only": ("BOOLEAN", {"default": True}),
                 "per_category": ("BOOLEAN", {"default": False}),
                 "ignore_case_categories": ("BOOLEAN", {"default": True}),
+                "sampling_mode": (SAMPLING_MODES, {"default": "random"}),
+                "rng_algorithm": (RNG_ALGORITHMS, {"default": "stdlib"}),
+                "coverage_strength": (
+                    "FLOAT",
+                    {"default": 1.0, "min": 0.0, "max": 10.0, "step": 0.1},
+                ),
+                "count_distribution": (COUNT_DISTRIBUTIONS, {"default": "uniform"}),
+                "count_mean": (
+                    "FLOAT",
+                    {"default": 3.0, "min": 0.0, "max": 4096.0, "step": 0.1},
+                ),
+                "count_stddev": (
+                    "FLOAT",
+                    {"default": 1.0, "min": 0.0, "max": 4096.0, "step": 0.1},
+                ),
+                "count_histogram": (
+                    "STRING",
+                    {"default": "", "multiline": True, "placeholder": "count:weight pairs, e.g. 2:5, 3:10, 4:3"},
+                ),
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 4096}),
+                "no_repeat_combinations": ("BOOLEAN", {"default": False}),
+                "max_redraws": ("INT", {"default": 32, "min": 0, "max": 4096}),
+                "dedupe_error_rate": (
+                    "FLOAT",
+                    {"default": 0.001, "min": 0.000001, "max": 0.5, "step": 0.0001},
+                ),
+                "dedupe_exact_limit": ("INT", {"default": 10000, "min": 0, "max": 10000000}),
+                "dedupe_max_mb": ("INT", {"default": 64, "min": 1, "max": 4096}),
+                "persist_state": ("BOOLEAN", {"default": True}),
+                "reset_state": ("BOOLEAN", {"default": False}),
                 "debug": ("BOOLEAN", {"default": False}),
             },
         }
@@ -51,6 +120,7 @@ class ICHIS_Tag_Sampler:
         ignore_case = kwargs.get("ignore_case_categories", True)
         category_list = kwargs.get("category_list")
         per_category = kwargs.get("per_category", False)
+        sampling_mode = kwargs.get("sampling_mode", "random")
 
         meta_sig = ""
         if isinstance(metadata, dict):
@@ -64,10 +134,26 @@ class ICHIS_Tag_Sampler:
         if category_list:
             category_sig = "||".join(map(str, category_list))
         parts = [meta_sig, selection_sig, category_sig, str(per_category)]
-        if seed == 0:
+        stateful = sampling_mode != "random" or kwargs.get("no_repeat_combinations", False)
+        if seed == 0 or stateful or kwargs.get("reset_state", False):
+            # Stateful modes advance a cursor, so they must run every time
             parts.append(f"rand_{time.time()}_{uuid.uuid4()}")
         return "|".join(parts)
 
+    @classmethod
+    def clear_state(cls):
+        """Forget in-memory sampler state; persisted cursors are re-read on demand."""
+        for store in (cls._EPOCH_STORE, cls._COVERAGE_STORE):
+            store.flush()
+            store.invalidate()
+        for seen_file in cls._SEEN_FILES.values():
+            seen_file.flush()
+        cls._EPOCH_BAGS.clear()
+        cls._COVERAGE_TRACKERS.clear()
+        cls._SEEN_FILES.clear()
+        cls._SEEN_FILTERS.clear()
+        cls._SEEN_PENDING.clear()
+
     def _select_categories(
         self,
         metadata,
@@ -92,9 +178,11 @@ class ICHIS_Tag_Sampler:
         self,
         metadata,
         categories: Sequence[str],
-    ) -> List[str]:
+    ) -> Sequence[str]:
         if not categories:
-            return []
+            return ()
+        if isinstance(metadata, TagMetadata) and metadata.cache_signature:
+            return get_category_bitsets(metadata).union(categories)
         seen = set()
         result: List[str] = []
         for category in categories:
@@ -108,6 +196,298 @@ class ICHIS_Tag_Sampler:
                     result.append(tag)
         return result
 
+    def _state_key(
+        self,
+        metadata: TagMetadata,
+        categories: Sequence[str],
+        pool_name: str,
+        salt: str = "",
+    ) -> str:
+        hasher = hashlib.sha1()
+        hasher.update(str(metadata.cache_signature or metadata.resolved_path).encode("utf-8"))
+        hasher.update("||".join(categories).encode("utf-8"))
+        hasher.update(pool_name.encode("utf-8"))
+        hasher.update(salt.encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _get_epoch_bag(self, key: str, size: int, seed: int, persist: bool) -> ShuffleBag:
+        cls = self.__class__
+        bag = cls._EPOCH_BAGS.get(key)
+        if bag is None and persist:
+            state = cls._EPOCH_STORE.get(key)
+            if ShuffleBag.matches_state(state, size):
+                bag = ShuffleBag.from_state(state)
+        if bag is None or bag.size != size:
+            bag_seed = seed if seed != 0 else rand_module.SystemRandom().getrandbits(63)
+            bag = ShuffleBag(size, bag_seed)
+        cls._EPOCH_BAGS[key] = bag
+        cls._EPOCH_BAGS.move_to_end(key)
+        if len(cls._EPOCH_BAGS) > cls._EPOCH_LIMIT:
+            cls._EPOCH_BAGS.popitem(last=False)
+        return bag
+
+    def _pool_bounds(self, pool: Sequence[str], min_count: int, max_count: int, unique_only: bool) -> tuple:
+        if unique_only:
+            return min(min_count, len(pool)), min(max_count, len(pool))
+        return min_count, max_count
+
+    def _coverage_rng(self, seed: int, rng_algorithm: str, pool_name: str, tracker: CoverageTracker, salt: str = ""):
+        if seed == 0:
+            return rand_module.Random()
+        # Reproducible for a given seed and usage history
+        if rng_algorithm == "stable":
+            return StableRandom(derive_seed(seed, pool_name, sum(tracker.counts), salt))
+        return rand_module.Random(f"{seed}:{pool_name}:{sum(tracker.counts)}{salt}")
+
+    def _reset_pool_state(
+        self,
+        metadata: TagMetadata,
+        categories: Sequence[str],
+        pools: Sequence[tuple],
+        seed: int,
+        persist_state: bool,
+    ) -> None:
+        cls = self.__class__
+        for pool_name, _ in pools:
+            epoch_key = self._state_key(metadata, categories, pool_name, str(seed))
+            coverage_key = self._state_key(metadata, categories, pool_name)
+            cls._EPOCH_BAGS.pop(epoch_key, None)
+            cls._COVERAGE_TRACKERS.pop(coverage_key, None)
+            if persist_state:
+                cls._EPOCH_STORE.delete(epoch_key)
+                cls._COVERAGE_STORE.delete(coverage_key)
+
+    def _draw_batch_counts(
+        self,
+        sampling_mode: str,
+        rng,
+        metadata: TagMetadata,
+        categories: Sequence[str],
+        pools: Sequence[tuple],
+        min_count: int,
+        max_count: int,
+        seed: int,
+        unique_only: bool,
+        rng_algorithm: str,
+        coverage_strength: float,
+        count_dist: CountDistribution,
+        persist_state: bool,
+        n: int,
+    ) -> List[List[int]]:
+        """Draw every prompt's per-pool tag count up front, one call per pool."""
+        per_pool: List[List[int]] = []
+        for pool_name, pool in pools:
+            lower, upper = self._pool_bounds(pool, min_count, max_count, unique_only)
+            if not pool:
+                per_pool.append([0] * n)
+                continue
+            if sampling_mode == "epoch":
+                key = self._state_key(metadata, categories, pool_name, str(seed))
+                pool_rng = self._get_epoch_bag(key, len(pool), seed, persist_state).count_rng()
+            elif sampling_mode == "coverage":
+                key = self._state_key(metadata, categories, pool_name)
+                tracker = self._get_coverage_tracker(key, len(pool), coverage_strength, persist_state)
+                pool_rng = self._coverage_rng(seed, rng_algorithm, pool_name, tracker, ":counts")
+            else:
+                pool_rng = rng
+            per_pool.append(count_dist.draw(pool_rng, lower, upper, n))
+        return [list(prompt_counts) for prompt_counts in zip(*per_pool)] if per_pool else [[] for _ in range(n)]
+
+    def _sample_epoch(
+        self,
+        metadata: TagMetadata,
+        categories: Sequence[str],
+        pools: Sequence[tuple],
+        min_count: int,
+        max_count: int,
+        seed: int,
+        unique_only: bool,
+        count_dist: CountDistribution,
+        counts: Optional[Sequence[int]],
+        persist_state: bool,
+        debug: bool,
+    ) -> List[str]:
+        cls = self.__class__
+        chosen: List[str] = []
+        for pool_index, (pool_name, pool) in enumerate(pools):
+            if not pool:
+                continue
+            key = self._state_key(metadata, categories, pool_name, str(seed))
+            bag = self._get_epoch_bag(key, len(pool), seed, persist_state)
+            if counts is not None:
+                k = counts[pool_index]
+            else:
+                lower, upper = self._pool_bounds(pool, min_count, max_count, unique_only)
+                k = count_dist.draw(bag.count_rng(), lower, upper)[0]
+            indices = bag.draw(k, unique=unique_only)
+            chosen.extend(pool[i] for i in indices)
+            if persist_state:
+                state = bag.state()
+                state["used"] = time.time()
+                cls._EPOCH_STORE.set(key, state, persist=False)
+                cls._EPOCH_STORE.trim(cls._EPOCH_LIMIT)
+            if debug:
+                print(
+                    f"[Tag_Sampler] Epoch pool '{pool_name}': epoch={bag.epoch}, "
+                    f"cursor={bag.cursor}/{bag.size}, drew {len(indices)}"
+                )
+        return chosen
+
+    def _sample_random(
+        self,
+        rng,
+        pools: Sequence[tuple],
+        min_count: int,
+        max_count: int,
+        unique_only: bool,
+        count_dist: CountDistribution,
+        counts: Optional[Sequence[int]],
+        debug: bool,
+    ) -> List[str]:
+        chosen: List[str] = []
+        for pool_index, (pool_name, pool) in enumerate(pools):
+            if not pool:
+                if debug:
+                    if pool_name:
+                        print(f"[Tag_Sampler] No tags in category '{pool_name}', skipping.")
+                    else:
+                        print("[Tag_Sampler] No tags available after selection.")
+                continue
+
+            if unique_only:
+                # sample() never mutates, so the shared (cached) pool is used as is
+                available = pool
+            else:
+                repetitions = max(1, max_count // max(1, len(pool)) + 1)
+                available = pool * repetitions
+
+            lower, upper = self._pool_bounds(pool, min_count, max_count, unique_only)
+            if counts is not None:
+                k = counts[pool_index]
+            else:
+                k = count_dist.draw(rng, lower, upper)[0]
+
+            if debug:
+                label = f"Category '{pool_name}'" if pool_name else "Candidate tags"
+                print(
+                    f"[Tag_Sampler] {label} (unique={unique_only}): "
+                    f"{len(available)} available, k in [{lower}, {upper}] => {k}"
+                )
+
+            if k > 0:
+                if unique_only:
+                    chosen.extend(rng.sample(available, k))
+                elif isinstance(rng, StableRandom):
+                    # Same draws as k choice() calls, generated in one batch
+                    chosen.extend(rng.choices(available, k=k))
+                else:
+                    chosen.extend(rng.choice(available) for _ in range(k))
+        return chosen
+
+    def _get_seen_filter(
+        self,
+        key: str,
+        error_rate: float,
+        exact_limit: int,
+        max_mb: int,
+        persist: bool,
+        reset: bool,
+    ) -> CombinationFilter:
+        cls = self.__class__
+        seen_file = cls._SEEN_FILES.get(key)
+        if seen_file is None:
+            seen_file = BinaryStateFile(f"tag_sampler_seen/{key}")
+            cls._SEEN_FILES[key] = seen_file
+        if reset:
+            cls._SEEN_FILTERS.pop(key, None)
+            cls._SEEN_PENDING.pop(key, None)
+            if persist:
+                seen_file.delete()
+        seen = cls._SEEN_FILTERS.get(key)
+        if seen is None and persist:
+            raw = seen_file.read()
+            if raw:
+                try:
+                    seen = CombinationFilter.from_bytes(raw)
+                except (ValueError, TypeError, AttributeError):
+                    seen = None
+        if seen is None:
+            seen = CombinationFilter(error_rate, exact_limit, max_mb * 1024 * 1024)
+        # Settings apply from the next add (exact_limit) or the next slice
+        seen.error_rate = error_rate
+        seen.exact_limit = max(0, int(exact_limit))
+        seen.max_bytes = max(1024, max_mb * 1024 * 1024)
+        cls._SEEN_FILTERS[key] = seen
+        return seen
+
+    def _save_seen_filter(self, key: str, added: int) -> None:
+        cls = self.__class__
+        seen = cls._SEEN_FILTERS.get(key)
+        seen_file = cls._SEEN_FILES.get(key)
+        if seen is None or seen_file is None:
+            return
+        # Encoded only when the file is flushed: every _SEEN_SAVE_EVERY adds, and at exit
+        seen_file.set_lazy(seen.to_bytes)
+        pending = cls._SEEN_PENDING.get(key, 0) + added
+        if pending >= cls._SEEN_SAVE_EVERY:
+            seen_file.flush()
+            pending = 0
+        cls._SEEN_PENDING[key] = pending
+
+    def _get_coverage_tracker(self, key: str, size: int, strength: float, persist: bool) -> CoverageTracker:
+        cls = self.__class__
+        tracker = cls._COVERAGE_TRACKERS.get(key)
+        if tracker is None or tracker.size != size:
+            counts = None
+            if persist:
+                state = cls._COVERAGE_STORE.get(key)
+                if isinstance(state, dict) and state.get("size") == size:
+                    counts = state.get("counts")
+            tracker = CoverageTracker(size, counts, strength)
+            cls._COVERAGE_TRACKERS[key] = tracker
+        tracker.set_strength(strength)
+        return tracker
+
+    def _sample_coverage(
+        self,
+        metadata: TagMetadata,
+        categories: Sequence[str],
+        pools: Sequence[tuple],
+        min_count: int,
+        max_count: int,
+        seed: int,
+        unique_only: bool,
+        rng_algorithm: str,
+        coverage_strength: float,
+        count_dist: CountDistribution,
+        counts: Optional[Sequence[int]],
+        persist_state: bool,
+        debug: bool,
+    ) -> List[str]:
+        cls = self.__class__
+        chosen: List[str] = []
+        for pool_index, (pool_name, pool) in enumerate(pools):
+            if not pool:
+                continue
+            key = self._state_key(metadata, categories, pool_name)
+            tracker = self._get_coverage_tracker(key, len(pool), coverage_strength, persist_state)
+            rng = self._coverage_rng(seed, rng_algorithm, pool_name, tracker)
+            if counts is not None:
+                k = counts[pool_index]
+            else:
+                lower, upper = self._pool_bounds(pool, min_count, max_count, unique_only)
+                k = count_dist.draw(rng, lower, upper)[0]
+            indices = tracker.draw(k, rng, unique=unique_only)
+            chosen.extend(pool[i] for i in indices)
+            if persist_state:
+                cls._COVERAGE_STORE.set(key, tracker.state())
+            if debug:
+                print(
+                    f"[Tag_Sampler] Coverage pool '{pool_name}': floor={tracker.floor}, "
+                    f"max={max(tracker.counts)}, drew {len(indices)}"
+                )
+        return chosen
+
     def sample_tags(
         self,
         tag_metadata,
@@ -119,6 +499,21 @@ class ICHIS_Tag_Sampler:
         unique_only: bool = True,
         per_category: bool = False,
         ignore_case_categories: bool = True,
+        sampling_mode: str = "random",
+        rng_algorithm: str = "stdlib",
+        coverage_strength: float = 1.0,
+        count_distribution: str = "uniform",
+        count_mean: float = 3.0,
+        count_stddev: float = 1.0,
+        count_histogram: str = "",
+        batch_size: int = 1,
+        no_repeat_combinations: bool = False,
+        max_redraws: int = 32,
+        dedupe_error_rate: float = 0.001,
+        dedupe_exact_limit: int = 10000,
+        dedupe_max_mb: int = 64,
+        persist_state: bool = True,
+        reset_state: bool = False,
         debug: bool = False,
     ) -> tuple:
         if tag_metadata is None:
@@ -135,6 +530,7 @@ class ICHIS_Tag_Sampler:
             print(f"[Tag_Sampler] Source path: {metadata.resolved_path}")
             print(f"[Tag_Sampler] min_count={min_count}, max_count={max_count}")
             print(f"[Tag_Sampler] per_category={per_category}")
+            print(f"[Tag_Sampler] sampling_mode={sampling_mode}")
             print(f"[Tag_Sampler] category_list={category_list}")
 
         if min_count < 0:
@@ -157,78 +553,129 @@ class ICHIS_Tag_Sampler:
         if debug:
             print(f"[Tag_Sampler] Using categories: {selected_categories}")
 
-        if seed != 0:
-            rand_module.seed(seed)
-
         if per_category:
-            # Sample min_count to max_count tags from each category
-            all_chosen = []
-            for category in selected_categories:
-                if isinstance(metadata, dict):
-                    category_tags = metadata.get("tags_by_category", {}).get(category, [])
-                else:
-                    category_tags = metadata.tags_by_category.get(category, [])
-                if not category_tags:
-                    if debug:
-                        print(f"[Tag_Sampler] No tags in category '{category}', skipping.")
-                    continue
-                
-                if unique_only:
-                    available = list(category_tags)
-                else:
-                    repetitions = max(1, max_count // max(1, len(category_tags)) + 1)
-                    available = category_tags * repetitions
-
-                upper = min(max_count, len(available)) if unique_only else max_count
-                lower = min(min_count, len(available)) if unique_only else min_count
-                k = rand_module.randint(lower, upper) if upper >= lower else 0
-
-                if debug:
-                    print(f"[Tag_Sampler] Category '{category}': {len(category_tags)} tags, sampling {k}")
-
-                if k > 0:
-                    if unique_only:
-                        category_chosen = rand_module.sample(available, k)
-                    else:
-                        category_chosen = [rand_module.choice(available) for _ in range(k)]
-                    all_chosen.extend(category_chosen)
+            pools = [
+                (category, metadata.tags_by_category.get(category, ()))
+                for category in selected_categories
+            ]
+        else:
+            pools = [("", self._gather_candidate_tags(metadata, selected_categories))]
 
-            chosen = all_chosen
+        if rng_algorithm == "stable":
+            stable_seed = seed if seed != 0 else rand_module.SystemRandom().getrandbits(64)
+            rng = StableRandom(stable_seed)
         else:
-            # Original behavior: sample from all categories combined
-            tags = self._gather_candidate_tags(metadata, selected_categories)
-            if not tags:
-                if debug:
-                    print("[Tag_Sampler] No tags available after selection.")
-                return ("", 0, [])
+            rng = rand_module
+            if sampling_mode == "random" and seed != 0:
+                rand_module.seed(seed)
 
-            if unique_only:
-                available = list(tags)
-            else:
-                repetitions = max(1, max_count // max(1, len(tags)) + 1)
-                available = tags * repetitions
+        count_dist = get_count_distribution(
+            count_distribution, count_mean, count_stddev, count_histogram
+        )
+        if reset_state:
+            self._reset_pool_state(metadata, selected_categories, pools, seed, persist_state)
 
-            upper = min(max_count, len(available)) if unique_only else max_count
-            lower = min(min_count, len(available)) if unique_only else min_count
-            k = rand_module.randint(lower, upper) if upper >= lower else 0
+        def draw(counts: Optional[Sequence[int]] = None) -> List[str]:
+            if sampling_mode == "epoch":
+                return self._sample_epoch(
+                    metadata,
+                    selected_categories,
+                    pools,
+                    min_count,
+                    max_count,
+                    seed,
+                    unique_only,
+                    count_dist,
+                    counts,
+                    persist_state,
+                    debug,
+                )
+            if sampling_mode == "coverage":
+                return self._sample_coverage(
+                    metadata,
+                    selected_categories,
+                    pools,
+                    min_count,
+                    max_count,
+                    seed,
+                    unique_only,
+                    rng_algorithm,
+                    coverage_strength,
+                    count_dist,
+                    counts,
+                    persist_state,
+                    debug,
+                )
+            return self._sample_random(
+                rng, pools, min_count, max_count, unique_only, count_dist, counts, debug
+            )
 
-            if debug:
-                print(
-                    f"[Tag_Sampler] Candidate tags (unique={unique_only}): "
-                    f"{len(available)} available -> {available}"
+        batch_size = max(1, int(batch_size))
+        if batch_size > 1:
+            batch_counts: List[Optional[List[int]]] = list(
+                self._draw_batch_counts(
+                    sampling_mode,
+                    rng,
+                    metadata,
+                    selected_categories,
+                    pools,
+                    min_count,
+                    max_count,
+                    seed,
+                    unique_only,
+                    rng_algorithm,
+                    coverage_strength,
+                    count_dist,
+                    persist_state,
+                    batch_size,
                 )
-                print(f"[Tag_Sampler] Sampling k between [{lower}, {upper}] => {k}")
+            )
+            if debug:
+                print(f"[Tag_Sampler] Batch counts: {batch_counts}")
+        else:
+            batch_counts = [None]
+
+        seen = None
+        seen_key = ""
+        if no_repeat_combinations:
+            seen_key = self._state_key(metadata, selected_categories, f"seen:{int(per_category)}")
+            seen = self._get_seen_filter(
+                seen_key,
+                dedupe_error_rate,
+                dedupe_exact_limit,
+                dedupe_max_mb,
+                persist_state,
+                reset_state,
+            )
 
-            if k <= 0:
+        batch: List[List[str]] = []
+        for counts in batch_counts:
+            chosen = draw(counts)
+            if seen is not None and chosen:
+                redraws = 0
+                while chosen in seen and redraws < max_redraws:
+                    redraws += 1
+                    # Redraws pick a fresh count so a full count bucket can be escaped
+                    chosen = draw()
                 if debug:
-                    print("[Tag_Sampler] k <= 0, returning empty result.")
-                return ("", 0, [])
+                    exhausted = " (gave up, emitting repeat)" if chosen in seen else ""
+                    print(
+                        f"[Tag_Sampler] Dedupe: {len(seen)} seen, {redraws} redraws{exhausted}, "
+                        f"{'exact' if seen.is_exact else 'bloom'} {seen.nbytes} bytes"
+                    )
+                seen.add(chosen)
+            batch.append(chosen)
+        if seen is not None and persist_state:
+            self._save_seen_filter(seen_key, len(batch))
 
-            if unique_only:
-                chosen = rand_module.sample(available, k)
-            else:
-                chosen = [rand_module.choice(available) for _ in range(k)]
+        if batch_size > 1:
+            # One entry per batch slot, so prompt i always lines up with image i
+            prompts = [", ".join(chosen) for chosen in batch]
+            if debug:
+                print(f"[Tag_Sampler] Batch prompts ({len(prompts)}): {prompts}")
+            return ("\n".join(prompts), len(prompts), prompts)
 
+        chosen = batch[0]
         if not chosen:
             if debug:
                 print("[Tag_Sampler] No tags chosen, returning empty result.")
@@ -0,0 +1,193 @@
+"""Parsing helpers for ICHIS Text Selector: ``@`` segments and index filters.
+
+Both parsers are pure functions of their input strings and are memoised, so
+repeated executions over the same prompt library only pay for an index
+lookup.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+from .interval_set import IntervalSet
+
+SEGMENT_CACHE_SIZE = 32
+FILTER_CACHE_SIZE = 256
+
+# Accept +[...], -[...], [...], or raw list like 1,2-4 (no brackets)
+_FILTER_PATTERN = re.compile(
+    r"([+\-]\[\d+(-\d+)?(,\d+(-\d+)?)*\])|"
+    r"(\[\d+(-\d+)?(,\d+(-\d+)?)*\])|"
+    r"(\d+(-\d+)?(,\d+(-\d+)?)*$)"
+)
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def parse_segments(text: str) -> Tuple[str, ...]:
+    """Split ``text`` into segments, each starting at a line beginning with ``@``.
+
+    Blank lines are dropped and lines are stripped; lines before the first
+    marker form their own segment.
+    """
+    segments = []
+    current_segment = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("@") and current_segment:
+            segments.append("\n".join(current_segment))
+            current_segment = []
+        current_segment.append(line)
+    if current_segment:
+        segments.append("\n".join(current_segment))
+    return tuple(segments)
+
+
+def strip_marker(segment: str) -> str:
+    """Remove a leading ``@N`` marker and the whitespace after it."""
+    if segment.startswith("@"):
+        # Same whitespace split as parse_marker, so "@label\ntext" works too
+        parts = segment.split(None, 1)
+        return parts[1] if len(parts) > 1 else segment[1:]
+    return segment
+
+
+def parse_marker(segment: str) -> Tuple[str, float]:
+    """Label and weight of a segment's leading marker.
+
+    ``@sunset:3 ...`` gives ``("sunset", 3.0)``, ``@2 ...`` gives ``("2", 1.0)``
+    and a segment without a marker gives ``("", 1.0)``. A suffix that is not a
+    non-negative number is kept as part of the label.
+    """
+    if not segment.startswith("@"):
+        return "", 1.0
+    token = segment[1:].split(None, 1)[0] if segment[1:].strip() else ""
+    label, sep, weight = token.rpartition(":")
+    if sep:
+        try:
+            value = float(weight)
+        except ValueError:
+            value = -1.0
+        if value >= 0.0 and value != float("inf"):
+            return label, value
+    return token, 1.0
+
+
+class SegmentIndex(NamedTuple):
+    """Label lookup and cumulative weights for a parsed segment list.
+
+    ``labels`` maps a case-folded label to its 1-based index (the first
+    segment with a label wins). ``prefix[k]`` is the total weight of
+    segments ``1..k``, so weighted picks are a bisect.
+    """
+
+    labels: Dict[str, int]
+    prefix: Tuple[float, ...]
+
+    def find(self, label: str) -> Optional[int]:
+        return self.labels.get(label.strip().casefold())
+
+    def weight_of(self, available: IntervalSet) -> float:
+        prefix = self.prefix
+        return sum(prefix[end] - prefix[start - 1] for start, end in available.intervals)
+
+    def pick(self, fraction: float, available: IntervalSet) -> Optional[int]:
+        """1-based index at ``fraction`` (in ``[0, 1)``) of the weight in ``available``.
+
+        Costs O(#intervals + log n); returns None if every available segment
+        has zero weight.
+        """
+        prefix = self.prefix
+        target = fraction * self.weight_of(available)
+        for start, end in available.intervals:
+            span = prefix[end] - prefix[start - 1]
+            if span <= 0.0:
+                continue
+            if target < span:
+                # First k in [start, end] whose prefix passes the target
+                return bisect_right(prefix, prefix[start - 1] + target, start, end)
+            target -= span
+        # Rounding can leave the target at the very end: take the last weighted index
+        for start, end in reversed(available.intervals):
+            if prefix[end] > prefix[start - 1]:
+                return bisect_left(prefix, prefix[end], start, end)
+        return None
+
+
+def build_segment_index(segments: Sequence[str]) -> SegmentIndex:
+    labels: Dict[str, int] = {}
+    prefix = [0.0]
+    for position, segment in enumerate(segments, start=1):
+        label, weight = parse_marker(segment)
+        if label:
+            labels.setdefault(label.casefold(), position)
+        prefix.append(prefix[-1] + weight)
+    return SegmentIndex(labels, tuple(prefix))
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def index_segments(text: str) -> SegmentIndex:
+    """``SegmentIndex`` for ``parse_segments(text)``, memoised alongside it."""
+    return build_segment_index(parse_segments(text))
+
+
+class IndexFilter(NamedTuple):
+    """Compiled ``filter_indices``: include or exclude a set of 1-based indices."""
+
+    inclusive: bool
+    indices: IntervalSet
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def parse_filter(filter_indices: str) -> IndexFilter:
+    """Parse ``+[1,3-5]`` / ``-[2,4-6]`` / ``[1,2]`` / ``1,2-4``.
+
+    Ranges are kept as merged intervals, so ``-[1-100000000]`` costs the same
+    as ``-[1]``. Invalid strings disable filtering (include everything).
+    """
+    raw_filter = filter_indices.strip()
+    if raw_filter and not _FILTER_PATTERN.fullmatch(raw_filter.replace(" ", "")):
+        raw_filter = ""
+    if not raw_filter:
+        return IndexFilter(True, IntervalSet())
+    inclusive = not raw_filter.startswith("-")
+    if raw_filter[0] in "+-":
+        raw_filter = raw_filter[1:].strip()
+    ranges = []
+    clean_str = raw_filter.strip("[]{}()").replace(" ", "")
+    for part in clean_str.split(",") if clean_str else []:
+        try:
+            if "-" in part:
+                range_parts = part.split("-")
+                if len(range_parts) == 2:
+                    start = int(range_parts[0])
+                    end = int(range_parts[1])
+                    if start > 0 and end > 0:
+                        ranges.append((start, end))
+            else:
+                idx = int(part)
+                if idx > 0:
+                    ranges.append((idx, idx))
+        except ValueError:
+            continue
+    return IndexFilter(inclusive, IntervalSet(ranges))
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def resolve_available_indices(count: int, filter_indices: str) -> IntervalSet:
+    """Sorted 1-based indices of ``count`` segments that pass the filter.
+
+    Computed with interval arithmetic; falls back to every index when the
+    filter leaves nothing.
+    """
+    compiled = parse_filter(filter_indices)
+    everything = IntervalSet.span(1, count)
+    if compiled.inclusive:
+        available = everything.intersection(compiled.indices) if compiled.indices else everything
+    else:
+        available = everything.difference(compiled.indices)
+    return available if available else everything
@@ -1,32 +1,53 @@
-import re
+import hashlib
+import os
 import random as rand_module
 import uuid
 import time
 
+from .index_permutation import FeistelPermutation
+from .segment_directory import ENTRY_MODES, get_segment_directory
+from .segment_file import get_segment_file
+from .stable_random import derive_seed
+from .step_cursors import STEP_CURSORS
+from .text_segments import index_segments, parse_segments, resolve_available_indices, strip_marker
+
 class ICHIS_Text_Selector:
     """
     A node that allows selecting text segments from a multi-line input using various selection modes.
     """
     
-    current_step_index = 0  # Class variable to track step position
+    # Step cursor for direct calls without a unique_id; graph nodes keep
+    # their own persisted cursor in STEP_CURSORS
+    current_step_index = 0
+    shuffle_position = 0
+    shuffle_signature = None
     
     @classmethod
     def INPUT_TYPES(cls):
         return {
             "required": {
                 "text": ("STRING", {"multiline": True}),
-                "mode": (["normal", "step", "random"], {"default": "normal"}),
+                "mode": (["normal", "step", "random", "weighted", "shuffle"], {"default": "normal"}),
             },
             "optional": {
-                "index": ("INT", {"default": 1, "min": 1, "max": 1000}),
+                "index": ("INT", {"default": 1, "min": 1, "max": 0xFFFFFFFF}),
+                "label": ("STRING", {"default": "", "placeholder": "Select by @label (normal mode); overrides index"}),
                 "seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff}),
                 "filter_indices": ("STRING", {"default": "", "placeholder": "Format: +[1,3-5] to include or -[2,4-6] to exclude"}),
                 "reset_step": ("BOOLEAN", {"default": False}),
-            }
+                "source": (["text", "file", "directory"], {"default": "text"}),
+                "file_path": ("STRING", {"default": "", "placeholder": "Prompt library file with @ segments, or a folder of .txt files (source: directory)"}),
+                "directory_entries": (ENTRY_MODES, {"default": "segment"}),
+                "count": ("INT", {"default": 1, "min": 1, "max": 1024}),
+                "replacement": ("BOOLEAN", {"default": True}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID",
+            },
         }
     
-    RETURN_TYPES = ("STRING", "INT")
-    RETURN_NAMES = ("selected_text", "index_used")
+    RETURN_TYPES = ("STRING", "INT", "LIST", "LIST")
+    RETURN_NAMES = ("selected_text", "index_used", "selected_list", "indices")
     FUNCTION = "select_text"
     CATEGORY = "ICHIS"
     
@@ -42,151 +63,165 @@ class ICHIS_Text_Selector:
             # No need for complex time check here, dynamic mode on means run
             return f"{current_time}_{uuid.uuid4()}"
              
+        # File libraries can change on disk without any input changing
+        if kwargs.get("source", "text") in ("file", "directory") and not kwargs.get("file_path", "").strip():
+            return None
+        if kwargs.get("source", "text") == "file":
+            try:
+                stat = os.stat(os.path.expandvars(os.path.expanduser(kwargs.get("file_path", ""))))
+                return f"{kwargs.get('file_path')}:{stat.st_mtime_ns}:{stat.st_size}"
+            except OSError:
+                return None
+        # Directories are re-listed only where a directory mtime changed
+        if kwargs.get("source", "text") == "directory":
+            try:
+                library = get_segment_directory(kwargs.get("file_path", ""), kwargs.get("directory_entries", "segment"))
+                return library.signature
+            except OSError:
+                return None
         return None
+
+    def _load_segments(self, text, source, file_path, directory_entries="segment"):
+        if source == "file":
+            # Memory-mapped library: only the selected segment is ever read
+            try:
+                return get_segment_file(file_path)
+            except OSError as exc:
+                print(f"[Text_Selector] Could not open '{file_path}': {exc}")
+                return ()
+        if source == "directory":
+            # Every .txt file (or every @ segment in them) under the folder
+            try:
+                return get_segment_directory(file_path, directory_entries)
+            except OSError as exc:
+                print(f"[Text_Selector] Could not open '{file_path}': {exc}")
+                return ()
+        # Split text into segments using @ or @N pattern (cached per text)
+        return parse_segments(text)
+
+    @staticmethod
+    def _segment_index(segments, text):
+        # Labels and cumulative weights are cached with the parsed segments
+        if isinstance(segments, tuple):
+            return index_segments(text)
+        return segments.segment_index()
+
+    @staticmethod
+    def _source_signature(text, source, file_path, directory_entries="segment"):
+        if source == "file":
+            return "file:" + os.path.abspath(os.path.expandvars(os.path.expanduser(file_path)))
+        if source == "directory":
+            path = os.path.abspath(os.path.expandvars(os.path.expanduser(file_path)))
+            return f"directory:{directory_entries}:{path}"
+        return "text:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _advance_step(self, unique_id, signature, size, step, reset):
+        if unique_id:
+            return STEP_CURSORS.advance(f"text_selector:{unique_id}", signature, size, step, reset)
+        position = 0 if reset else self.current_step_index % size
+        self.current_step_index = (position + step) % size
+        return position
+
+    def _advance_shuffle(self, unique_id, signature, step, reset):
+        # Unbounded position: position // size is the pass, position % size the offset
+        if unique_id:
+            return STEP_CURSORS.advance(f"text_selector:{unique_id}:shuffle", signature, None, step, reset)
+        position = 0 if reset or self.shuffle_signature != signature else self.shuffle_position
+        self.shuffle_signature, self.shuffle_position = signature, position + step
+        return position
+
+    def _reset_cursors(self, unique_id):
+        if unique_id:
+            STEP_CURSORS.reset(f"text_selector:{unique_id}")
+            STEP_CURSORS.reset(f"text_selector:{unique_id}:shuffle")
+        else:
+            self.current_step_index = 0
+            self.shuffle_position = 0
     
-    def select_text(self, text, mode="normal", index=1, seed=0, filter_indices="", reset_step=False):
-        # Split text into segments using @ or @N pattern
-        segments = []
-        current_segment = []
-        
-        for line in text.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-                
-            if line.startswith('@'):
-                # If we have a previous segment, add it
-                if current_segment:
-                    segments.append('\n'.join(current_segment))
-                    current_segment = []
-                current_segment.append(line)
-            else:
-                current_segment.append(line)
-                
-        # Add the last segment if there is one
-        if current_segment:
-            segments.append('\n'.join(current_segment))
+    def select_text(self, text, mode="normal", index=1, seed=0, filter_indices="", reset_step=False,
+                    source="text", file_path="", count=1, replacement=True, label="", directory_entries="segment", unique_id=None):
+        segments = self._load_segments(text, source, file_path, directory_entries)
             
         # Handle empty input
         if not segments:
-            return ("", 0)
+            return ("", 0, [], [])
             
-        # Validate filter_indices format; ignore invalid inputs
-        raw_filter = filter_indices.strip()
-        if raw_filter:
-            cleaned = raw_filter.replace(' ', '')
-            # Accept +[...], -[...], [...], or raw list like 1,2-4 (no brackets)
-            pattern = r"([+\-]\[\d+(-\d+)?(,\d+(-\d+)?)*\])|" \
-                      r"(\[\d+(-\d+)?(,\d+(-\d+)?)*\])|" \
-                      r"(\d+(-\d+)?(,\d+(-\d+)?)*$)"
-            if not re.fullmatch(pattern, cleaned):
-                raw_filter = ''  # invalid format, disable filtering
-        filter_indices = raw_filter
-        
-        # Determine if we're using inclusion or exclusion mode
-        is_inclusion_mode = True
-        parsed_indices = set()
-        
-        if filter_indices.strip():
-            # Check if it starts with + or -
-            if filter_indices.strip().startswith('-'):
-                is_inclusion_mode = False
-                clean_filter = filter_indices.strip()[1:].strip()  # Remove the - and trim
-            elif filter_indices.strip().startswith('+'):
-                is_inclusion_mode = True
-                clean_filter = filter_indices.strip()[1:].strip()  # Remove the + and trim
-            else:
-                # No prefix, assume inclusion
-                clean_filter = filter_indices.strip()
-            
-            try:
-                # Remove brackets and whitespace, then split by commas
-                clean_str = clean_filter.strip('[]{}()').replace(' ', '')
-                if clean_str:
-                    # Split by commas and process each part
-                    for part in clean_str.split(','):
-                        try:
-                            # Check if it's a range notation (e.g., "1-5")
-                            if '-' in part:
-                                range_parts = part.split('-')
-                                if len(range_parts) == 2:
-                                    start = int(range_parts[0])
-                                    end = int(range_parts[1])
-                                    if start > 0 and end > 0:
-                                        # Add all indices in the range
-                                        for i in range(start, end + 1):
-                                            parsed_indices.add(i)
-                            else:
-                                # Regular single index
-                                idx = int(part)
-                                if idx > 0:  # Only include positive indices
-                                    parsed_indices.add(idx)
-                        except ValueError:
-                            continue  # Skip invalid numbers or ranges
-            except:
-                pass  # Ignore any parsing errors
-        
-        # Create available indices based on inclusion/exclusion mode
-        if is_inclusion_mode:
-            # Include only specified indices
-            if parsed_indices:
-                available_indices = [i for i in parsed_indices if 1 <= i <= len(segments)]
-            else:
-                # If no indices specified in inclusion mode, use all
-                available_indices = list(range(1, len(segments) + 1))
-        else:
-            # Exclude the specified indices
-            available_indices = [i for i in range(1, len(segments) + 1) if i not in parsed_indices]
-        
-        # If no indices are available after filtering, use all indices
-        if not available_indices:
-            available_indices = list(range(1, len(segments) + 1))
-        
-        # Sort available indices for consistent ordering
-        available_indices.sort()
+        # Indices passing filter_indices as a sorted interval set (cached per segment
+        # count and filter); invalid filters are ignored and an empty result falls
+        # back to all indices. Step/random picks are O(log #ranges) selects.
+        available_indices = resolve_available_indices(len(segments), filter_indices or "")
+        total = len(available_indices)
+        count = max(1, int(count))
         
         # Store the selected index for output
         selected_index = index
         
-        # --- Handle Reset ---        
-        if reset_step:
-            self.__class__.current_step_index = 0 # Reset to 0
+        # --- Handle Reset (step and shuffle modes reset while advancing) ---        
+        if reset_step and mode not in ("step", "shuffle"):
+            self._reset_cursors(unique_id)
             
-        # --- Determine selected index based on mode ---        
+        # --- Determine selected indices based on mode ---        
         if mode == "random":
             # Set seed if provided
             if seed != 0:
                 rand_module.seed(seed)
                 
-            # Select from available indices
-            selected_index = rand_module.choice(available_indices)
+            # Select from available indices; a single pick is always a plain choice
+            if replacement or count == 1:
+                selected_indices = [rand_module.choice(available_indices) for _ in range(count)]
+            else:
+                positions = rand_module.sample(range(total), min(count, total))
+                selected_indices = [available_indices[p] for p in positions]
+        elif mode == "weighted":
+            if seed != 0:
+                rand_module.seed(seed)
+                
+            # Independent draws proportional to @label:weight markers (bisect over
+            # cumulative weights); if every available weight is 0, draw uniformly
+            segment_index = self._segment_index(segments, text)
+            selected_indices = []
+            for _ in range(count):
+                picked = segment_index.pick(rand_module.random(), available_indices)
+                selected_indices.append(picked if picked is not None else rand_module.choice(available_indices))
         elif mode == "step":
-            # Use the current step index
-            step_to_use = self.__class__.current_step_index % len(available_indices)
-            selected_index = available_indices[step_to_use]
-            
-            # Update step index for next time
-            self.__class__.current_step_index = (step_to_use + 1) % len(available_indices)
-            
-        # else mode == "normal", use the provided index
-        
-        # If normal mode and the selected index is not in available_indices,
-        # choose the closest available index
-        if mode == "normal" and selected_index not in available_indices:
-            if available_indices:
-                # Find the closest available index
-                selected_index = min(available_indices, key=lambda x: abs(x - selected_index))
+            # Take this node's cursor and move it count ahead in one atomic update,
+            # wrapping around the available indices
+            signature = self._source_signature(text, source, file_path, directory_entries)
+            step_to_use = self._advance_step(unique_id, signature, total, count, reset_step)
+            selected_indices = [available_indices[(step_to_use + k) % total] for k in range(count)]
+        elif mode == "shuffle":
+            # Walk a seeded permutation of the available positions without ever
+            # materialising it; each full pass reshuffles with a new derived seed.
+            # The cursor restarts when the source, filter or seed changes.
+            signature = "|".join((self._source_signature(text, source, file_path, directory_entries),
+                                  filter_indices or "", str(seed)))
+            position = self._advance_shuffle(unique_id, signature, count, reset_step)
+            selected_indices = []
+            permutation, permutation_pass = None, None
+            for current in range(position, position + count):
+                shuffle_pass, offset = divmod(current, total)
+                if shuffle_pass != permutation_pass:
+                    permutation = FeistelPermutation(total, derive_seed(seed, shuffle_pass))
+                    permutation_pass = shuffle_pass
+                selected_indices.append(available_indices[permutation[offset]])
+        else:
+            # mode == "normal": start at the labelled segment or the provided index,
+            # or the closest available one if it is filtered out (ties go to the lower one)
+            if label and label.strip():
+                found = self._segment_index(segments, text).find(label)
+                if found is None:
+                    print(f"[Text_Selector] Unknown label '{label.strip()}', using index {index}")
+                else:
+                    selected_index = found
+            if selected_index not in available_indices:
+                selected_index = available_indices.nearest(selected_index)
+            start = available_indices.index(selected_index)
+            selected_indices = [available_indices[(start + k) % total] for k in range(count)]
         
-        # Ensure index is within bounds
-        if selected_index < 1:
-            selected_index = 1
-        elif selected_index > len(segments):
-            selected_index = len(segments)
+        # Ensure indices are within bounds
+        selected_indices = [min(max(i, 1), len(segments)) for i in selected_indices]
             
-        # Get the selected text and remove the @N marker
-        selected_text = segments[selected_index - 1]
-        if selected_text.startswith('@'):
-            # Remove the @N marker and any following whitespace
-            selected_text = selected_text.split(' ', 1)[1] if ' ' in selected_text else selected_text[1:]
+        # Get the selected texts and remove the @N markers
+        selected_list = [strip_marker(segments[i - 1]) for i in selected_indices]
             
-        return (selected_text, selected_index) 
\ No newline at end of file
+        return ("\n".join(selected_list), selected_indices[0], selected_list, selected_indices)
@@ -120,5 +120,26 @@ class TestAspectRatioPlus(unittest.TestCase):
         )
         self.assertIsNotNone(result1)
 
+    def test_sdxl_default_sizes_and_latent(self):
+        width, height, latent, name, _ = self.node.get_aspect_ratio("5:8 portrait 832x1216", batch_size=2)
+        self.assertEqual((width, height, name), (832, 1216, "5:8 portrait 832x1216"))
+        self.assertEqual(tuple(latent["samples"].shape), (2, 4, 152, 104))
+
+    def test_model_presets_and_custom_spec(self):
+        width, height, latent, name, _ = self.node.get_aspect_ratio("16:9 landscape 1344x768", model_preset="Flux")
+        self.assertEqual((width % 16, height % 16), (0, 0))
+        self.assertEqual(name, f"16:9 landscape {width}x{height}")
+        self.assertEqual(latent["samples"].shape[1], 16)
+        width, height, _, name, _ = self.node.get_aspect_ratio(
+            "1:1 square 1024x1024", model_preset="SD1.5"
+        )
+        self.assertEqual((width, height), (512, 512))
+        names = {
+            self.node.get_aspect_ratio("1:1 square 1024x1024", mode="step", model_preset="custom",
+                                       base_resolution=768, multiple_of="8", custom_ratios="1:1, 2:1, 1:2")[3]
+            for _ in range(3)
+        }
+        self.assertEqual(names, {"1:1 square 768x768", "2:1 landscape 1088x544", "1:2 portrait 544x1088"})
+
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+import unittest
+
+from nodes.combination_filter import BloomFilter, CombinationFilter, combination_digest
+from nodes.state_store import BinaryStateFile
+
+
+class TestCombinationFilter(unittest.TestCase):
+    def test_digest_ignores_order(self):
+        self.assertEqual(combination_digest(["b", "a"]), combination_digest(["a", "b"]))
+        self.assertNotEqual(combination_digest(["a", "b"]), combination_digest(["ab"]))
+
+    def test_exact_mode_until_limit(self):
+        filt = CombinationFilter(exact_limit=10)
+        for i in range(10):
+            filt.add([f"t{i}", "x"])
+        self.assertTrue(filt.is_exact)
+        self.assertIn(["x", "t3"], filt)
+        self.assertNotIn(["x", "t42"], filt)
+        filt.add(["overflow"])
+        self.assertFalse(filt.is_exact)
+        for i in range(10):
+            self.assertIn([f"t{i}", "x"], filt)
+        self.assertIn(["overflow"], filt)
+
+    def test_bloom_false_positive_rate(self):
+        bloom = BloomFilter(5000, 0.01)
+        for i in range(5000):
+            bloom.add(combination_digest([str(i)]))
+        false_hits = sum(combination_digest([f"miss{i}"]) in bloom for i in range(5000))
+        self.assertLess(false_hits / 5000, 0.03)
+
+    def test_memory_is_bounded(self):
+        filt = CombinationFilter(error_rate=0.01, exact_limit=0, max_bytes=8 * 1024)
+        for i in range(50000):
+            filt.add([str(i)])
+        self.assertLessEqual(filt.nbytes, 8 * 1024)
+        self.assertIn(["49999"], filt)
+
+    def test_single_slice_never_exceeds_max_bytes(self):
+        filt = CombinationFilter(error_rate=1e-6, exact_limit=200000, max_bytes=64 * 1024)
+        for i in range(30000):
+            filt.add([str(i)])
+            self.assertLessEqual(filt.nbytes, 64 * 1024)
+        self.assertFalse(filt.is_exact)
+        self.assertIn(["29999"], filt)
+
+    def test_exact_set_is_bounded_by_real_memory(self):
+        filt = CombinationFilter(exact_limit=1000000, max_bytes=64 * 1024)
+        for i in range(500):
+            filt.add([str(i)])
+        self.assertTrue(filt.is_exact)
+        self.assertGreater(filt.nbytes, 500 * 16)
+        for i in range(500, 5000):
+            filt.add([str(i)])
+        self.assertFalse(filt.is_exact)
+        self.assertLessEqual(filt.nbytes, 64 * 1024)
+
+    def test_lazy_state_is_serialised_on_flush(self):
+        directory = tempfile.mkdtemp()
+        try:
+            seen_file = BinaryStateFile("seen", directory=directory)
+            filt = CombinationFilter()
+            calls = []
+
+            def encode():
+                calls.append(1)
+                return filt.to_bytes()
+
+            for i in range(20):
+                filt.add([str(i)])
+                seen_file.set_lazy(encode)
+            self.assertEqual(len(calls), 0)
+            self.assertTrue(seen_file.flush())
+            self.assertEqual(len(calls), 1)
+            restored = CombinationFilter.from_bytes(seen_file.read())
+            self.assertIn(["19"], restored)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_round_trip(self):
+        for exact_limit in (100, 0):
+            filt = CombinationFilter(exact_limit=exact_limit)
+            for i in range(3000):
+                filt.add(["a", str(i)])
+            restored = CombinationFilter.from_bytes(filt.to_bytes())
+            self.assertIn(["2999", "a"], restored)
+            self.assertEqual(restored.is_exact, filt.is_exact)
+            self.assertEqual(len(restored), len(filt))
+            self.assertEqual(restored.nbytes, filt.nbytes)
+
+    def test_bloom_state_is_stored_as_raw_bits(self):
+        filt = CombinationFilter(exact_limit=0)
+        filt.add(["a"])
+        self.assertLess(len(filt.to_bytes()), filt.nbytes + 512)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import random
+import unittest
+
+from nodes.concept_matcher import (
+    AUTOMATON_MIN_CONCEPTS,
+    AhoCorasick,
+    ConceptMatcher,
+    MatcherCache,
+    parse_concepts,
+    tokenize,
+)
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_overlapping_patterns(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertTrue(automaton.search("ushers"))
+        self.assertTrue(automaton.search("ahishers"))
+        self.assertFalse(automaton.search("shoe"))
+        # "bc" is only reported through the suffix link of the "abc" state
+        self.assertTrue(AhoCorasick(["abcd", "bc"]).search("abce"))
+
+    def test_matches_substring_semantics(self):
+        rng = random.Random(7)
+        alphabet = "abcé "
+        for _ in range(200):
+            patterns = [
+                "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                for _ in range(rng.randint(1, 12))
+            ]
+            automaton = AhoCorasick(patterns)
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            self.assertEqual(automaton.search(text), any(p in text for p in patterns))
+
+
+class TestConceptMatcher(unittest.TestCase):
+    def test_parse_concepts(self):
+        self.assertEqual(parse_concepts(" Eyes, LOOK\n\nlips , "), ["eyes", "look", "lips"])
+
+    def test_large_concept_list_uses_automaton(self):
+        concepts = [f"concept{i}" for i in range(AUTOMATON_MIN_CONCEPTS * 4)] + ["eyes"]
+        matcher = ConceptMatcher(concepts)
+        self.assertIsNotNone(matcher._automaton)
+        segments = ["Big Blue EYES", "red lips", "xconcept17y", "concept"]
+        self.assertEqual(matcher.filter(segments), ["Big Blue EYES", "xconcept17y"])
+        small = ConceptMatcher(["eyes"])
+        self.assertIsNone(small._automaton)
+        self.assertEqual(small.filter(segments), ["Big Blue EYES"])
+
+    def test_word_mode_multi_word_concepts(self):
+        matcher = ConceptMatcher(["blue eyes", "eyes closed", "smile"], mode="word")
+        self.assertTrue(matcher.matches("big Blue  Eyes"))
+        self.assertFalse(matcher.matches("blue eyeshadow"))
+        self.assertFalse(matcher.matches("smiles"))
+        self.assertEqual(tokenize("Blonde-haired_girl 2"), ["blonde", "haired", "girl", "2"])
+
+
+class TestMatcherCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = MatcherCache(maxsize=2)
+        first = cache.get("eyes\nlips")
+        self.assertIs(cache.get("eyes\nlips"), first)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1})
+        cache.get("nose")
+        cache.get("hair")
+        self.assertIsNot(cache.get("eyes\nlips"), first)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 4, "size": 2})
+
+    def test_options_are_part_of_the_key(self):
+        self.assertNotEqual(MatcherCache.key("eyes", mode="a"), MatcherCache.key("eyes", mode="b"))
+        self.assertEqual(MatcherCache.key("eyes", a=1, b=2), MatcherCache.key("eyes", b=2, a=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
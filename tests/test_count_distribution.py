@@ -0,0 +1,52 @@
+import random
+import unittest
+
+from nodes.count_distribution import (
+    CountDistribution,
+    count_table,
+    get_count_distribution,
+    parse_histogram,
+)
+from nodes.stable_random import StableRandom
+
+
+class TestCountDistribution(unittest.TestCase):
+    def test_parse_histogram(self):
+        self.assertEqual(parse_histogram("2:5, 3:10\n4:1"), ((2, 5.0), (3, 10.0), (4, 1.0)))
+        self.assertEqual(parse_histogram("0, 4, 9"), ((1, 4.0), (2, 9.0)))
+        self.assertEqual(parse_histogram("x:1, 2:-1, 3:2"), ((3, 2.0),))
+
+    def test_tables_are_cached(self):
+        count_table.cache_clear()
+        dist = CountDistribution("poisson", mean=3.0)
+        first = dist.table(1, 8)
+        self.assertIs(dist.table(1, 8), first)
+        self.assertEqual(count_table.cache_info().hits, 1)
+        self.assertIs(get_count_distribution("normal", 2.0, 1.0, ""), get_count_distribution("normal", 2.0, 1.0, ""))
+
+    def test_uniform_keeps_randint_sequence(self):
+        random.seed(5)
+        expected = random.randint(2, 6)
+        random.seed(5)
+        self.assertEqual(CountDistribution().draw(random, 2, 6), [expected])
+
+    def test_truncated_distributions_stay_in_range(self):
+        rng = StableRandom(1)
+        for name in ("poisson", "normal"):
+            counts = CountDistribution(name, mean=10.0, stddev=2.0).draw(rng, 2, 5, 500)
+            self.assertTrue(all(2 <= k <= 5 for k in counts))
+            # Mass is piled against the upper bound for a mean of 10
+            self.assertGreater(counts.count(5), counts.count(2))
+
+    def test_histogram_only_draws_weighted_counts(self):
+        dist = CountDistribution("histogram", histogram="2:1, 4:3, 9:100")
+        counts = dist.draw(StableRandom(2), 1, 5, 400)
+        self.assertEqual(set(counts), {2, 4})
+        self.assertGreater(counts.count(4), counts.count(2))
+
+    def test_empty_histogram_falls_back_to_uniform(self):
+        self.assertIsNone(CountDistribution("histogram", histogram="").table(1, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -104,5 +104,58 @@ class TestExtractTags(unittest.TestCase):
         result = self.node.extract_text(text, concepts, ", ")
         self.assertEqual(result[0], "beautiful eyes, big blue eyes, crossing eyes and looking up, red lips, tall")
 
+    def test_batch_texts(self):
+        texts = [
+            "woman, beautiful eyes, red lips",
+            "tall, running down beach",
+            "Big Blue Eyes, bored look",
+        ]
+        joined, results = self.node.extract_text("", "eyes\nlook", ", ", texts=texts)
+        self.assertEqual(results, ["beautiful eyes", "", "Big Blue Eyes, bored look"])
+        self.assertEqual(joined, "beautiful eyes\n\nBig Blue Eyes, bored look")
+
+    def test_batch_preserves_order(self):
+        texts = [f"tag{i}, eyes{i}, lips" for i in range(50)]
+        results = self.node.extract_text("", "eyes", ", ", texts=texts)[1]
+        self.assertEqual(results, [f"eyes{i}" for i in range(50)])
+
+    def test_single_text_list_output(self):
+        result = self.node.extract_text("red lips, tall", "lips", ", ")
+        self.assertEqual(result, ("red lips", ["red lips"]))
+
+    def test_word_mode_respects_word_boundaries(self):
+        text = "tired woman, red dress, chair, long hair, blonde-haired girl"
+        substring = self.node.extract_text(text, "red\nhair", ", ")[0]
+        self.assertEqual(substring, "tired woman, red dress, chair, long hair, blonde-haired girl")
+        words = self.node.extract_text(text, "red\nhair\nblonde haired", ", ", match_mode="word")[0]
+        self.assertEqual(words, "red dress, long hair, blonde-haired girl")
+
+    def test_tag_mode_matches_whole_segments(self):
+        text = "Red Dress, red dress with lace, long_hair, long hair ribbon"
+        result = self.node.extract_text(text, "red dress\nlong hair", ", ", match_mode="tag")[0]
+        self.assertEqual(result, "Red Dress, long_hair")
+
+    def test_prompt_syntax_keeps_groups_whole(self):
+        text = "woman, (red dress, lace:1.2), [blue|green] eyes, \\(smile\\), tall"
+        result = self.node.extract_text(text, "lace\neyes\n1.2", ", ", prompt_syntax=True)[0]
+        self.assertEqual(result, "(red dress, lace:1.2), [blue|green] eyes")
+        legacy = self.node.extract_text(text, "lace\neyes", ", ")[0]
+        self.assertEqual(legacy, "lace:1.2), [blue|green] eyes")
+
+    def test_prompt_syntax_keeps_emoticon_tags(self):
+        text = "1girl, smile :(, red hat, blue shirt"
+        for prompt_syntax in (False, True):
+            result = self.node.extract_text(text, "blue", ", ", prompt_syntax=prompt_syntax)[0]
+            self.assertEqual(result, "blue shirt")
+        result = self.node.extract_text("1girl, >_<, :<, blue shirt", ">_<\n:<\nblue", ", ", prompt_syntax=True)[0]
+        self.assertEqual(result, ">_<, :<, blue shirt")
+
+    def test_fuzzy_mode_tolerates_misspellings(self):
+        text = "blonde-haired girl, blnd hair, bed, red dress, smiling"
+        result = self.node.extract_text(text, "blond\nred\nsmilling", ", ", match_mode="fuzzy")[0]
+        self.assertEqual(result, "blonde-haired girl, blnd hair, red dress, smiling")
+        strict = self.node.extract_text(text, "blond", ", ", match_mode="fuzzy", max_distance=0)[0]
+        self.assertEqual(strict, "")
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+from nodes import extract_tags_files
+from nodes.extract_tags_files import ICHIS_Extract_Tags_Files
+
+
+def _unimportable_worker(*args):
+    raise ImportError("No module named 'ComfyUI-Ichis-Pack'")
+
+
+def _broken_process_pool(*args, **kwargs):
+    kwargs["initializer"] = _unimportable_worker
+    return ProcessPoolExecutor(*args, **kwargs)
+
+
+class _FakeProgressBar:
+    def __init__(self, total):
+        self.total = total
+        self.values = []
+
+    def update_absolute(self, value, total=None):
+        self.values.append(value)
+
+
+class TestExtractTagsFiles(unittest.TestCase):
+    def setUp(self):
+        self.node = ICHIS_Extract_Tags_Files()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, relative, content):
+        path = os.path.join(self.tmpdir, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        return path
+
+    def test_directory_to_jsonl(self):
+        self._write("captions/a.txt", "woman, blue eyes, red lips\n")
+        self._write("captions/sub/b.txt", "tall, running")
+        self._write("captions/notes.md", "eyes")
+        out = os.path.join(self.tmpdir, "out", "result.jsonl")
+        path, processed, report = self.node.extract_files(
+            os.path.join(self.tmpdir, "captions"), out, "eyes\nlips", ", ", run_now=True
+        )
+        self.assertEqual(path, out)
+        self.assertEqual(processed, 2)
+        self.assertIn("2 captions (1 with matches)", report)
+        with open(out, encoding="utf-8") as fh:
+            rows = [json.loads(line) for line in fh]
+        self.assertEqual(rows, [
+            {"file": "a.txt", "text": "blue eyes, red lips"},
+            {"file": os.path.join("sub", "b.txt"), "text": ""},
+        ])
+
+    def test_jsonl_to_sidecars_keeps_record_order(self):
+        lines = [json.dumps({"id": i, "caption": f"tag{i}, eyes{i}"}) for i in range(5)]
+        source = self._write("data.jsonl", "\n".join(lines) + "\nnot json\n")
+        out_dir = os.path.join(self.tmpdir, "sidecars")
+        _, processed, _ = self.node.extract_files(
+            source, out_dir, "eyes", ", ", text_field="caption", chunk_size=2, run_now=True
+        )
+        self.assertEqual(processed, 5)
+        with open(os.path.join(out_dir, "4.txt"), encoding="utf-8") as fh:
+            self.assertEqual(fh.read(), "eyes3")
+
+    def _run_pooled(self, **kwargs):
+        lines = [json.dumps({"text": f"red dress {i}, tired, hair{i % 3}"}) for i in range(40)]
+        source = self._write("data.jsonl", "\n".join(lines))
+        out = os.path.join(self.tmpdir, "out.jsonl")
+        self.node.extract_files(
+            source, out, "red\nhair1", ", ", match_mode="word", chunk_size=3, run_now=True, **kwargs
+        )
+        with open(out, encoding="utf-8") as fh:
+            return fh.read()
+
+    def test_worker_pools_match_serial(self):
+        serial = self._run_pooled(workers=0)
+        self.assertIn('"red dress 1, hair1"', serial)
+        self.assertEqual(self._run_pooled(workers=2), serial)
+        self.assertEqual(self._run_pooled(workers=2, executor="process"), serial)
+
+    def test_unusable_process_pool_falls_back_to_threads(self):
+        serial = self._run_pooled(workers=0)
+        with mock.patch.object(extract_tags_files, "ProcessPoolExecutor", _broken_process_pool):
+            self.assertEqual(self._run_pooled(workers=2, executor="process"), serial)
+
+    def test_reports_progress_to_comfy(self):
+        bars = []
+
+        def progress_bar(total):
+            bars.append(_FakeProgressBar(total))
+            return bars[-1]
+
+        fake_comfy = SimpleNamespace(utils=SimpleNamespace(ProgressBar=progress_bar))
+        with mock.patch.object(extract_tags_files, "comfy", fake_comfy):
+            self._run_pooled(workers=0)
+        (bar,) = bars
+        # JSONL progress is measured in bytes, so the file is read only once
+        self.assertEqual(bar.total, os.path.getsize(os.path.join(self.tmpdir, "data.jsonl")))
+        self.assertEqual(bar.values, sorted(bar.values))
+        self.assertEqual(bar.values[-1], bar.total)
+
+    def test_directory_progress_total_is_opt_in(self):
+        for name in ("a", "b", "c"):
+            self._write(f"captions/{name}.txt", "blue eyes")
+        root = os.path.join(self.tmpdir, "captions")
+        out = os.path.join(self.tmpdir, "out.jsonl")
+        bars = []
+
+        def progress_bar(total):
+            bars.append(_FakeProgressBar(total))
+            return bars[-1]
+
+        fake_comfy = SimpleNamespace(utils=SimpleNamespace(ProgressBar=progress_bar))
+        with mock.patch.object(extract_tags_files, "comfy", fake_comfy):
+            with mock.patch.object(self.node, "_iter_txt_paths", wraps=self.node._iter_txt_paths) as walk:
+                self.node.extract_files(root, out, "eyes", ", ", run_now=True)
+                self.assertEqual(walk.call_count, 1)
+                self.assertEqual(bars, [])
+                self.node.extract_files(root, out, "eyes", ", ", count_files=True, run_now=True)
+        (bar,) = bars
+        self.assertEqual((bar.total, bar.values[-1]), (3, 3))
+
+    def test_matcher_is_compiled_once_on_the_calling_thread(self):
+        with mock.patch.object(
+            extract_tags_files, "get_concept_matcher", wraps=extract_tags_files.get_concept_matcher
+        ) as build:
+            self._run_pooled(workers=4)
+        self.assertEqual(build.call_count, 1)
+
+    def test_empty_paths_are_rejected(self):
+        self._write("captions/a.txt", "eyes")
+        cwd = os.getcwd()
+        os.chdir(self.tmpdir)
+        try:
+            out = os.path.join(self.tmpdir, "out.jsonl")
+            self.assertEqual(
+                self.node.extract_files("", out, "eyes", ", ", run_now=True), (out, 0, "input_path is required")
+            )
+            self.assertEqual(
+                self.node.extract_files("  ", out, "eyes", ", ", run_now=True)[2], "input_path is required"
+            )
+            self.assertEqual(
+                self.node.extract_files("captions", "", "eyes", ", ", run_now=True), ("", 0, "output_path is required")
+            )
+        finally:
+            os.chdir(cwd)
+        self.assertFalse(os.path.exists(out))
+
+    def test_sidecar_output_inside_input_is_not_reread(self):
+        self._write("captions/a.txt", "blue eyes, red lips")
+        root = os.path.join(self.tmpdir, "captions")
+        _, processed, _ = self.node.extract_files(root, os.path.join(root, "clean"), "eyes", ", ", run_now=True)
+        self.assertEqual(processed, 1)
+        with open(os.path.join(root, "clean", "a.txt"), encoding="utf-8") as fh:
+            self.assertEqual(fh.read(), "blue eyes")
+
+    def test_requires_run_now(self):
+        self._write("captions/a.txt", "eyes")
+        out = os.path.join(self.tmpdir, "out.jsonl")
+        _, processed, _ = self.node.extract_files(os.path.join(self.tmpdir, "captions"), out, "eyes", ", ")
+        self.assertEqual(processed, 0)
+        self.assertFalse(os.path.exists(out))
+
+
+if __name__ == "__main__":
+    unittest.main()
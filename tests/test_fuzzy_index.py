@@ -0,0 +1,30 @@
+import random
+import unittest
+
+from nodes.fuzzy_index import DeletionIndex, deletion_variants, levenshtein
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def test_levenshtein(self):
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("blond", "blonde"), 1)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("kitten", "sitting", limit=1), 2)
+
+    def test_deletion_variants(self):
+        self.assertEqual(deletion_variants("abc", 1), {"abc", "bc", "ac", "ab"})
+
+    def test_index_matches_brute_force(self):
+        rng = random.Random(11)
+        alphabet = "abcd"
+        for distance in (1, 2):
+            words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(40)]
+            index = DeletionIndex(words, distance)
+            for _ in range(100):
+                query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+                expected = any(levenshtein(query, w) <= distance for w in words)
+                self.assertEqual(index.contains_near(query), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from nodes.index_permutation import FeistelPermutation
+
+
+class TestFeistelPermutation(unittest.TestCase):
+    def test_is_a_permutation_for_any_size(self):
+        for size in (0, 1, 2, 3, 5, 16, 17, 100, 1025):
+            permutation = FeistelPermutation(size, 42)
+            self.assertEqual(sorted(permutation), list(range(size)))
+            self.assertEqual(len(permutation), size)
+
+    def test_seeded_and_reproducible(self):
+        self.assertEqual(list(FeistelPermutation(50, 7)), list(FeistelPermutation(50, 7)))
+        self.assertNotEqual(list(FeistelPermutation(50, 7)), list(FeistelPermutation(50, 8)))
+        self.assertNotEqual(list(FeistelPermutation(50, 7)), list(range(50)))
+
+    def test_huge_sizes_are_lazy(self):
+        permutation = FeistelPermutation(10 ** 12, 1)
+        values = [permutation[i] for i in range(200)]
+        self.assertEqual(len(set(values)), 200)
+        self.assertTrue(all(0 <= value < 10 ** 12 for value in values))
+        self.assertEqual(permutation[-1], permutation[10 ** 12 - 1])
+        with self.assertRaises(IndexError):
+            permutation[10 ** 12]
+
+
+if __name__ == "__main__":
+    unittest.main()
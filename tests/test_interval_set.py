@@ -0,0 +1,49 @@
+import random
+import unittest
+
+from nodes.interval_set import IntervalSet
+
+
+class TestIntervalSet(unittest.TestCase):
+    def test_merges_and_selects(self):
+        s = IntervalSet([(5, 7), (1, 2), (3, 3), (10, 12), (11, 15)])
+        self.assertEqual(s.intervals, [(1, 3), (5, 7), (10, 15)])
+        self.assertEqual(list(s), [1, 2, 3, 5, 6, 7, 10, 11, 12, 13, 14, 15])
+        self.assertEqual(len(s), 12)
+        self.assertEqual(s[3], 5)
+        self.assertEqual(s[-1], 15)
+        self.assertEqual(s.index(10), 6)
+        self.assertIn(6, s)
+        self.assertNotIn(8, s)
+        with self.assertRaises(IndexError):
+            s[12]
+
+    def test_set_operations_match_python_sets(self):
+        rng = random.Random(5)
+
+        def random_set():
+            ranges = []
+            for _ in range(rng.randint(0, 6)):
+                start = rng.randint(1, 40)
+                ranges.append((start, start + rng.randint(0, 6)))
+            return ranges
+
+        for _ in range(200):
+            a_ranges, b_ranges = random_set(), random_set()
+            a, b = IntervalSet(a_ranges), IntervalSet(b_ranges)
+            a_py = {i for s, e in a_ranges for i in range(s, e + 1)}
+            b_py = {i for s, e in b_ranges for i in range(s, e + 1)}
+            self.assertEqual(list(a.intersection(b)), sorted(a_py & b_py))
+            self.assertEqual(list(a.difference(b)), sorted(a_py - b_py))
+            if a_py:
+                target = rng.randint(-5, 50)
+                expected = min(sorted(a_py), key=lambda x: abs(x - target))
+                self.assertEqual(a.nearest(target), expected)
+
+    def test_huge_ranges_stay_small(self):
+        s = IntervalSet.span(1, 10 ** 12).difference(IntervalSet([(2, 10 ** 12 - 1)]))
+        self.assertEqual(list(s), [1, 10 ** 12])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from nodes.prompt_tokenizer import PromptSegment, tokenize_prompt
+
+
+class TestPromptTokenizer(unittest.TestCase):
+    def test_groups_and_weights(self):
+        segments = tokenize_prompt("woman, (red dress, lace:1.2), [a|b], ((masterpiece:1.3)), {x, y}")
+        self.assertEqual([s.text for s in segments], [
+            "woman", "(red dress, lace:1.2)", "[a|b]", "((masterpiece:1.3))", "{x, y}",
+        ])
+        self.assertEqual([s.plain for s in segments], ["woman", "red dress, lace", "a|b", "masterpiece", "x, y"])
+        self.assertEqual(segments[2], PromptSegment("[a|b]", "a|b"))
+
+    def test_escapes_and_unbalanced_brackets(self):
+        segments = tokenize_prompt(r"\(smile\), a\, b, stray) bracket, (unclosed, rest")
+        self.assertEqual([s.plain for s in segments], ["(smile)", "a, b", "stray) bracket", "(unclosed", "rest"])
+
+    def test_unclosed_brackets_are_literal(self):
+        segments = tokenize_prompt("1girl, smile :(, red hat, (blue shirt:1.1), [a, (b]")
+        self.assertEqual([s.text for s in segments], [
+            "1girl", "smile :(", "red hat", "(blue shirt:1.1)", "[a", "(b]",
+        ])
+        self.assertEqual(segments[3].plain, "blue shirt")
+
+    def test_angle_brackets_do_not_group(self):
+        segments = tokenize_prompt("(smile), >_<, :<, <lora:x:1>, b")
+        self.assertEqual([s.text for s in segments], ["(smile)", ">_<", ":<", "<lora:x:1>", "b"])
+
+    def test_plain_prompts_split_like_str_split(self):
+        rng = random.Random(3)
+        alphabet = "ab ,"
+        for _ in range(300):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            expected = [s.strip() for s in text.split(",") if s.strip()]
+            segments = tokenize_prompt(text)
+            self.assertEqual([s.text for s in segments], expected)
+            self.assertEqual([s.plain for s in segments], expected)
+
+    def test_results_are_cached(self):
+        self.assertIs(tokenize_prompt("a, (b, c)"), tokenize_prompt("a, (b, c)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from nodes.resolution_buckets import (
+    DEFAULT_RATIOS,
+    PRESETS,
+    BucketSpec,
+    filter_buckets,
+    get_bucket_table,
+    nearest_bucket,
+    parse_ratios,
+    resolve_spec,
+)
+
+
+class TestResolutionBuckets(unittest.TestCase):
+    def test_sdxl_preset_keeps_classic_buckets(self):
+        table = get_bucket_table(PRESETS["SDXL"])
+        self.assertEqual(table.by_ratio["5:8"].name, "5:8 portrait 832x1216")
+        self.assertEqual(table.by_ratio["21:9"].name, "21:9 landscape 1536x640")
+        self.assertEqual(len(table.buckets), 8)
+
+    def test_generated_tables_respect_budget_and_multiple(self):
+        for name, spec in PRESETS.items():
+            for bucket in get_bucket_table(spec).buckets:
+                self.assertEqual(bucket.width % spec.multiple, 0, name)
+                self.assertEqual(bucket.height % spec.multiple, 0, name)
+                area = bucket.width * bucket.height
+                self.assertLess(abs(area - spec.base ** 2) / spec.base ** 2, 0.15, name)
+        self.assertEqual(get_bucket_table(PRESETS["SD1.5"]).by_ratio["1:1"].width, 512)
+        self.assertEqual(PRESETS["Flux"].latent_channels, 16)
+
+    def test_tables_are_cached_and_immutable(self):
+        spec = resolve_spec("custom", 768, "8", "1:1, 4x3, bad")
+        self.assertEqual(spec, BucketSpec(768, 8, ((1, 1), (4, 3)), 4))
+        table = get_bucket_table(spec)
+        self.assertIs(table, get_bucket_table(resolve_spec("custom", 768, 8, "1:1, 4x3, bad")))
+        with self.assertRaises(TypeError):
+            table.by_ratio["2:1"] = None
+        self.assertEqual(table.by_ratio["4:3"].name, "4:3 landscape 888x664")
+        self.assertEqual(parse_ratios(""), DEFAULT_RATIOS)
+
+    def test_filter_and_nearest(self):
+        spec = PRESETS["SD3"]
+        names = filter_buckets(spec, frozenset({"3:4"}), "portrait only")
+        self.assertEqual(names, tuple(sorted(names)))
+        self.assertIn("1:1 square 1024x1024", names)
+        self.assertFalse(any("landscape" in name or name.startswith("3:4") for name in names))
+        table = get_bucket_table(resolve_spec("custom", 1024, 64, "1:1, 16:9"))
+        self.assertEqual(nearest_bucket(table, "21:9").ratio, "16:9")
+        self.assertEqual(nearest_bucket(table, "1:1").ratio, "1:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+
+from nodes.stable_random import StableRandom, derive_seed, mix64, splitmix_block
+from nodes.tag_file_loader import ICHIS_Tag_File_Loader
+from nodes.tag_sampler import ICHIS_Tag_Sampler
+
+
+class TestStableRandomGoldenVectors(unittest.TestCase):
+    """Golden vectors: these values must never change between releases."""
+
+    def test_splitmix64_reference_sequence(self):
+        # Reference outputs of SplitMix64 for seed 1234567
+        rng = StableRandom(1234567)
+        self.assertEqual(
+            [rng.next64() for _ in range(5)],
+            [
+                6457827717110365317,
+                3203168211198807973,
+                9817491932198370423,
+                4593380528125082431,
+                16408922859458223821,
+            ],
+        )
+        self.assertEqual(StableRandom(0).next64(), 0xE220A8397B1DCDAF)
+
+    def test_counter_based_positions(self):
+        rng = StableRandom(1234567)
+        rng.next64()
+        rng.next64()
+        direct = StableRandom(1234567, counter=2)
+        self.assertEqual(rng.next64(), direct.next64())
+        self.assertEqual(mix64(0), 0)
+
+    def test_bounded_and_float_outputs(self):
+        rng = StableRandom(42)
+        self.assertEqual([rng.randbelow(10) for _ in range(10)], [7, 1, 2, 3, 0, 8, 2, 8, 3, 6])
+        self.assertEqual(StableRandom(42).random(), 0.7415648787718233)
+        rng = StableRandom(99)
+        self.assertEqual([rng.randint(1, 6) for _ in range(3)], [2, 1, 6])
+
+    def test_shuffle_and_floyd_sample(self):
+        items = list(range(8))
+        StableRandom(3).shuffle(items)
+        self.assertEqual(items, [2, 5, 1, 6, 7, 3, 4, 0])
+        self.assertEqual(StableRandom(7).sample(list("abcdefghij"), 4), ["f", "i", "c", "a"])
+        self.assertEqual(
+            StableRandom(7).sample_indices(10**9, 5),
+            [582930292, 900760678, 389829746, 452441895, 16788294],
+        )
+        self.assertEqual(
+            StableRandom(7).sample_indices(2**70, 2),
+            [1068298220224092630303, 460229734457111967169],
+        )
+        self.assertEqual(derive_seed("a", 1), 13924241962069754241)
+
+    def test_sample_is_distinct_and_complete(self):
+        rng = StableRandom(11)
+        for n in (1, 2, 5, 50):
+            for k in range(n + 1):
+                picked = rng.sample_indices(n, k)
+                self.assertEqual(len(set(picked)), k)
+                self.assertTrue(all(0 <= i < n for i in picked))
+        self.assertEqual(sorted(rng.sample_indices(20, 20)), list(range(20)))
+        with self.assertRaises(ValueError):
+            rng.sample_indices(3, 4)
+
+
+class TestStableRandomBatches(unittest.TestCase):
+    """Batched draws must reproduce the single-draw sequence exactly."""
+
+    def _single(self, seed, first, step, count):
+        rng = StableRandom(seed, counter=3)
+        return [rng.randbelow(first + step * i) for i in range(count)], rng.counter
+
+    def test_randbelow_range_matches_randbelow(self):
+        for count in (1, 7, 8, 100, 5000):
+            for first, step in ((count + 1, -1), (1000, 0), (10**9, 1)):
+                rng = StableRandom(21, counter=3)
+                expected, counter = self._single(21, first, step, count)
+                self.assertEqual(rng.randbelow_range(first, step, count), expected)
+                self.assertEqual(rng.counter, counter)
+
+    def test_rejected_draws_fall_back_to_exact_sequence(self):
+        # Bounds just above 2**63 reject about half of all outputs
+        first = (1 << 63) + 1
+        rng = StableRandom(5, counter=3)
+        expected, counter = self._single(5, first, 1, 64)
+        self.assertEqual(rng.randbelow_range(first, 1, 64), expected)
+        self.assertEqual(rng.counter, counter)
+        self.assertGreater(counter - 3, 64)
+        with self.assertRaises(ValueError):
+            rng.randbelow_range(2, -1, 3)
+
+    def test_block_outputs_and_batched_calls(self):
+        single = StableRandom(8)
+        self.assertEqual(splitmix_block(8, 0, 300), [single.next64() for _ in range(300)])
+        pool = list(range(50))
+        single = StableRandom(8)
+        self.assertEqual(StableRandom(8).choices(pool, k=40), [single.choice(pool) for _ in range(40)])
+        single = StableRandom(8)
+        weights = [i + 1 for i in pool]
+        total = sum(weights)
+        batched = StableRandom(8).choices(pool, weights, k=40)
+        cumulative = [sum(weights[:i + 1]) for i in pool]
+        self.assertEqual(
+            batched,
+            [
+                next(i for i, c in enumerate(cumulative) if x < c)
+                for x in (single.random() * total for _ in range(40))
+            ],
+        )
+
+
+class TestTagSamplerStableAlgorithm(unittest.TestCase):
+    def setUp(self):
+        ICHIS_Tag_File_Loader.clear_cache()
+        fd, self.path = tempfile.mkstemp(suffix=".csv", text=True)
+        os.close(fd)
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.write("category,tag\n" + "".join(f"misc,t{i}\n" for i in range(10)))
+        self.metadata, *_ = ICHIS_Tag_File_Loader().load_tags(file_path=self.path)
+        self.node = ICHIS_Tag_Sampler()
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_golden_prompts(self):
+        self.assertEqual(
+            self.node.sample_tags(self.metadata, 2, 4, seed=123456789, rng_algorithm="stable"),
+            ("t4, t1", 2, ["t4", "t1"]),
+        )
+        self.assertEqual(
+            self.node.sample_tags(
+                self.metadata, 1, 2, seed=987654321, rng_algorithm="stable", unique_only=False
+            ),
+            ("t8, t8", 2, ["t8", "t8"]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
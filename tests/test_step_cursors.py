@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from nodes.aspect_ratio_plus import ICHIS_Aspect_Ratio_Plus
+from nodes.state_store import STATE_DIR_ENV
+from nodes.step_cursors import STEP_CURSORS, StepCursorStore
+from nodes.tag_combinations import ICHIS_Tag_Combinations
+from nodes.tag_file_loader import ICHIS_Tag_File_Loader
+from nodes.text_selector import ICHIS_Text_Selector
+
+
+class _StateDirMixin:
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._previous_state_dir = os.environ.get(STATE_DIR_ENV)
+        os.environ[STATE_DIR_ENV] = self.tmpdir
+        STEP_CURSORS.invalidate()
+
+    def tearDown(self):
+        STEP_CURSORS.invalidate()
+        if self._previous_state_dir is None:
+            os.environ.pop(STATE_DIR_ENV, None)
+        else:
+            os.environ[STATE_DIR_ENV] = self._previous_state_dir
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+class TestStepCursorStore(_StateDirMixin, unittest.TestCase):
+    def test_advance_wraps_and_resets_on_new_signature(self):
+        store = StepCursorStore("cursors_test", flush_interval=0.0)
+        self.assertEqual([store.advance("a", "sig", 3) for _ in range(4)], [0, 1, 2, 0])
+        self.assertEqual(store.peek("a", "sig"), 1)
+        self.assertEqual(store.advance("a", "other", 3), 0)
+        self.assertEqual(store.advance("a", "other", 3, step=2), 1)
+        self.assertEqual(store.advance("a", "other", 3, reset=True), 0)
+        self.assertEqual(store.advance("b", "sig"), 0)
+        self.assertEqual(store.advance("b", "sig"), 1)
+
+    def test_sources_keep_separate_cursors(self):
+        store = StepCursorStore("cursors_test", flush_interval=0.0)
+        picks = [store.advance("node", sig, 5) for sig in ("a", "b", "a", "b", "a")]
+        self.assertEqual(picks, [0, 0, 1, 1, 2])
+        store.reset("node")
+        self.assertEqual((store.peek("node", "a"), store.peek("node", "b")), (0, 0))
+
+    def test_least_recently_used_cursors_are_evicted(self):
+        store = StepCursorStore("cursors_test", flush_interval=60.0, max_entries=3)
+        for key in ("a", "b", "c"):
+            store.advance(key, "sig")
+        store.advance("a", "sig")  # "b" is now the least recently used
+        store.advance("d", "sig")
+        self.assertEqual(len(store), 3)
+        self.assertEqual([store.peek(key, "sig") for key in "abcd"], [2, 0, 1, 1])
+
+    def test_cursors_survive_reload(self):
+        store = StepCursorStore("cursors_test", flush_interval=60.0)
+        store.advance("node", "sig", 10)
+        store.advance("node", "sig", 10)
+        store.invalidate()  # flush, then simulate a restart
+        self.assertEqual(StepCursorStore("cursors_test").peek("node", "sig"), 2)
+
+    def test_concurrent_advances_are_distinct(self):
+        store = StepCursorStore("cursors_test", flush_interval=60.0)
+        taken = []
+
+        def worker():
+            for _ in range(200):
+                taken.append(store.advance("node", "sig"))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(taken), list(range(800)))
+
+
+class TestNodeCursors(_StateDirMixin, unittest.TestCase):
+    TEXT = "@1 First\n@2 Second\n@3 Third"
+
+    def test_text_selector_nodes_step_independently(self):
+        first, second = ICHIS_Text_Selector(), ICHIS_Text_Selector()
+        picks = []
+        for node, unique_id in ((first, "1"), (second, "2"), (first, "1"), (first, "1"), (second, "2")):
+            picks.append(node.select_text(self.TEXT, mode="step", unique_id=unique_id)[1])
+        self.assertEqual(picks, [1, 1, 2, 3, 2])
+
+    def test_text_selector_alternating_sources_do_not_reset_each_other(self):
+        # Node ids repeat across workflows; each source keeps its own position
+        other = "@1 Red\n@2 Green\n@3 Blue"
+        node = ICHIS_Text_Selector()
+        picks = [node.select_text(text, mode="step", unique_id="5")[0]
+                 for text in (self.TEXT, other, self.TEXT, other, self.TEXT)]
+        self.assertEqual(picks, ["First", "Red", "Second", "Green", "Third"])
+
+    def test_text_selector_cursor_persists_and_follows_source(self):
+        node = ICHIS_Text_Selector()
+        node.select_text(self.TEXT, mode="step", unique_id="7")
+        STEP_CURSORS.invalidate()
+        self.assertEqual(ICHIS_Text_Selector().select_text(self.TEXT, mode="step", unique_id="7")[1], 2)
+        changed = self.TEXT + "\n@4 Fourth"
+        self.assertEqual(node.select_text(changed, mode="step", unique_id="7")[1], 1)
+        node.select_text(changed, mode="normal", reset_step=True, unique_id="7")
+        self.assertEqual(node.select_text(changed, mode="step", unique_id="7")[1], 1)
+
+    def test_shuffle_position_persists_with_node_cursor(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 21))
+        expected = ICHIS_Text_Selector().select_text(text, mode="shuffle", seed=4, count=20)[3]
+        node = ICHIS_Text_Selector()
+        picks = node.select_text(text, mode="shuffle", seed=4, count=8, unique_id="3")[3]
+        STEP_CURSORS.invalidate()
+        picks += ICHIS_Text_Selector().select_text(text, mode="shuffle", seed=4, count=12, unique_id="3")[3]
+        self.assertEqual(picks, expected)
+        self.assertEqual(node.select_text(text, mode="step", unique_id="3")[1], 1)
+
+    def test_tag_combinations_cursor_persists_per_node(self):
+        loader = ICHIS_Tag_File_Loader()
+        path = os.path.join(self.tmpdir, "tags.csv")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write("category,tags\nhair,blonde; brown; red\nclothes,dress; shirt\n")
+        metadata, *_ = loader.load_tags(file_path=path)
+
+        def step(unique_id, **kwargs):
+            node = ICHIS_Tag_Combinations()
+            return node.enumerate_combinations(metadata, mode="step", count=2, unique_id=unique_id, **kwargs)[2]
+
+        self.assertEqual([step("1"), step("2"), step("1")], [0, 0, 2])
+        STEP_CURSORS.invalidate()
+        self.assertEqual(step("1"), 4)
+        self.assertEqual(step("1", reset_step=True), 0)
+
+    def test_aspect_ratio_nodes_step_independently(self):
+        first, second = ICHIS_Aspect_Ratio_Plus(), ICHIS_Aspect_Ratio_Plus()
+        a = first.get_aspect_ratio("1:1 square 1024x1024", mode="step", unique_id="1")
+        b = second.get_aspect_ratio("1:1 square 1024x1024", mode="step", unique_id="2")
+        c = first.get_aspect_ratio("1:1 square 1024x1024", mode="step", unique_id="1")
+        self.assertEqual(a[3], b[3])
+        self.assertNotEqual(a[3], c[3])
+        self.assertEqual(c[4], 2)
+        reset = first.get_aspect_ratio("1:1 square 1024x1024", mode="step", reset_step=True, unique_id="1")
+        self.assertEqual((reset[3], reset[4]), (a[3], 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
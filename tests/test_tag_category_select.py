@@ -1,14 +1,23 @@
 import os
 import tempfile
+import time
 import unittest
 
 from nodes.tag_category_select import ICHIS_Tag_Category_Select
+from nodes.tag_data_utils import (
+    TagMetadata,
+    get_category_bitsets,
+    get_category_index,
+    metadata_from_payload,
+    normalize_categories_selection,
+)
 from nodes.tag_file_loader import ICHIS_Tag_File_Loader
 
 
 class TestTagCategorySelect(unittest.TestCase):
     def setUp(self):
         ICHIS_Tag_File_Loader.clear_cache()
+        ICHIS_Tag_Category_Select.clear_cache()
         self.loader = ICHIS_Tag_File_Loader()
         self.selector = ICHIS_Tag_Category_Select()
 
@@ -83,6 +92,144 @@ class TestTagCategorySelect(unittest.TestCase):
         finally:
             os.remove(path)
 
+    def test_payload_is_deterministic(self):
+        csv_content = (
+            "category,tag\n"
+            "faces,smile\n"
+            "hair,blonde hair\n"
+            "clothes,smile\n"
+        )
+        path = self._write_csv(csv_content)
+        try:
+            metadata, *_ = self.loader.load_tags(file_path=path)
+            first = self.selector.select_categories(tag_metadata=metadata, categories="faces\nclothes")
+            second = ICHIS_Tag_Category_Select().select_categories(
+                tag_metadata=metadata, categories="faces\nclothes"
+            )
+            self.assertEqual(first, second)
+            self.assertNotIn("timestamp", first[0])
+            self.assertNotIn("id", first[0])
+            self.assertEqual(first[2], ["smile"])
+            bitsets = get_category_bitsets(metadata_from_payload(metadata))
+            self.assertIn(("faces", "clothes"), bitsets._unions)
+            other, *_ = self.selector.select_categories(tag_metadata=metadata, categories="hair")
+            self.assertNotEqual(other["selection_signature"], first[0]["selection_signature"])
+        finally:
+            os.remove(path)
+
+    def test_pattern_and_exclusion_selectors(self):
+        csv_content = (
+            "category,tag\n"
+            "clothes/upper/shirt,tee\n"
+            "clothes/hats,beanie\n"
+            "clothes/lower,jeans\n"
+            "Hair/Color,blonde\n"
+            "background,beach\n"
+        )
+        path = self._write_csv(csv_content)
+        try:
+            metadata, *_ = self.loader.load_tags(file_path=path)
+            _, selected, tags = self.selector.select_categories(
+                tag_metadata=metadata,
+                categories="clothes/*\n!clothes/hats\nhair/",
+            )
+            self.assertEqual(selected, ["clothes/upper/shirt", "clothes/lower", "Hair/Color"])
+            self.assertEqual(tags, ["tee", "jeans", "blonde"])
+            _, selected, _ = self.selector.select_categories(
+                tag_metadata=metadata,
+                categories="!clothes/*",
+            )
+            self.assertEqual(selected, ["Hair/Color", "background"])
+            _, selected, _ = self.selector.select_categories(
+                tag_metadata=metadata,
+                categories="*/h*",
+            )
+            self.assertEqual(selected, ["clothes/hats"])
+        finally:
+            os.remove(path)
+
+
+class TestCategoryIndex(unittest.TestCase):
+    def _metadata(self, categories, ignore_case=True, signature="sig"):
+        return TagMetadata(
+            resolved_path="",
+            source_path="",
+            source_type="csv",
+            mtime=None,
+            ignore_case=ignore_case,
+            categories=list(categories),
+            tags_by_category={c: [c + "_tag"] for c in categories},
+            category_alias_map={(c.lower() if ignore_case else c): c for c in categories},
+            cache_signature=signature,
+        )
+
+    def test_index_is_built_once_per_signature(self):
+        metadata = self._metadata(["a/b", "a/c"], signature="index-once")
+        self.assertIs(get_category_index(metadata), get_category_index(metadata))
+
+    def test_literal_name_with_glob_characters(self):
+        metadata = self._metadata(["what?", "whatever"])
+        self.assertEqual(normalize_categories_selection(["what?"], metadata), ["what?"])
+        self.assertEqual(normalize_categories_selection(["what*"], metadata), ["what?", "whatever"])
+
+    def test_case_sensitive_metadata(self):
+        metadata = self._metadata(["Hair/x", "hair/y"], ignore_case=False, signature="cs")
+        self.assertEqual(normalize_categories_selection(["hair/*"], metadata), ["hair/y"])
+
+    def test_wildcard_over_thousands_of_categories_is_fast(self):
+        categories = [f"group{g}/item{i}" for g in range(50) for i in range(100)]
+        metadata = self._metadata(categories, signature="big")
+        get_category_index(metadata)  # built once per signature
+        start = time.perf_counter()
+        for _ in range(100):
+            selected = normalize_categories_selection(["group7/*", "!group7/item1*"], metadata)
+        elapsed = (time.perf_counter() - start) / 100
+        self.assertEqual(len(selected), 89)
+        self.assertLess(elapsed, 0.005)
+
+
+class TestCategoryBitsets(unittest.TestCase):
+    def setUp(self):
+        tags_by_category = {
+            "a": ["x", "y", "z"],
+            "b": ["w", "y", "v"],
+            "c": ["u"],
+        }
+        self.metadata = TagMetadata(
+            resolved_path="",
+            source_path="",
+            source_type="csv",
+            mtime=None,
+            ignore_case=True,
+            categories=list(tags_by_category),
+            tags_by_category=tags_by_category,
+            all_tags=["x", "y", "z", "w", "v", "u"],
+            cache_signature="bitsets",
+        )
+
+    def test_union_matches_concatenation_order(self):
+        bitsets = get_category_bitsets(self.metadata)
+        for order in (["a", "b", "c"], ["b", "a"], ["c", "b", "a", "b"], ["missing", "a"]):
+            seen = set()
+            expected = []
+            for category in order:
+                for tag in self.metadata.tags_by_category.get(category, []):
+                    if tag not in seen:
+                        seen.add(tag)
+                        expected.append(tag)
+            self.assertEqual(bitsets.union(order), tuple(expected))
+        # Repeated selections share the memoised tuple instead of copying
+        self.assertIs(bitsets.union(["a", "b"]), bitsets.union(["a", "b"]))
+        self.assertIs(bitsets, get_category_bitsets(self.metadata))
+
+    def test_payload_and_outputs_share_one_union_copy(self):
+        payload, selected, category_tags = ICHIS_Tag_Category_Select().select_categories(
+            tag_metadata=self.metadata, categories="a\nb"
+        )
+        self.assertEqual(category_tags, ["x", "y", "z", "w", "v"])
+        self.assertIs(payload["category_tags"], category_tags)
+        self.assertIsNot(category_tags, get_category_bitsets(self.metadata).union(["a", "b"]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,96 @@
+import itertools
+import os
+import tempfile
+import unittest
+
+from nodes.tag_combinations import (
+    ICHIS_Tag_Combinations,
+    combination_count,
+    combination_digits,
+)
+from nodes.tag_file_loader import ICHIS_Tag_File_Loader
+
+
+class TestTagCombinations(unittest.TestCase):
+    def setUp(self):
+        ICHIS_Tag_File_Loader.clear_cache()
+        self.node = ICHIS_Tag_Combinations()
+        self.loader = ICHIS_Tag_File_Loader()
+        fd, self.path = tempfile.mkstemp(suffix=".csv", text=True)
+        os.close(fd)
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.write(
+                "category,tags\n"
+                "hair,blonde; brown; red\n"
+                "clothes,dress; shirt\n"
+                "background,beach; city\n"
+            )
+        self.metadata, *_ = self.loader.load_tags(file_path=self.path)
+        self.expected = [
+            ", ".join(combo)
+            for combo in itertools.product(
+                ["blonde", "brown", "red"], ["dress", "shirt"], ["beach", "city"]
+            )
+        ]
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_digits_match_itertools_product(self):
+        radices = [3, 1, 4, 2]
+        product = list(itertools.product(*(range(r) for r in radices)))
+        self.assertEqual(combination_count(radices), len(product))
+        for index, combo in enumerate(product):
+            self.assertEqual(combination_digits(index, radices), list(combo))
+
+    def test_huge_index_without_materialising(self):
+        radices = [1000] * 6
+        self.assertEqual(combination_count(radices), 10**18)
+        self.assertEqual(combination_digits(10**18 - 1, radices), [999] * 6)
+
+    def test_index_range(self):
+        tags, combos, index_used, total = self.node.enumerate_combinations(
+            tag_metadata=self.metadata, start_index=2, count=3
+        )
+        self.assertEqual(total, 12)
+        self.assertEqual(index_used, 2)
+        self.assertEqual(combos, self.expected[2:5])
+        self.assertEqual(tags, "\n".join(self.expected[2:5]))
+
+    def test_category_subset(self):
+        _, combos, _, total = self.node.enumerate_combinations(
+            tag_metadata=self.metadata, category_list=["clothes", "hair"], count=6
+        )
+        self.assertEqual(total, 6)
+        self.assertEqual(combos[0], "dress, blonde")
+        self.assertEqual(combos[-1], "shirt, red")
+
+    def test_step_mode_walks_and_wraps(self):
+        seen = []
+        for _ in range(6):
+            _, combos, _, _ = self.node.enumerate_combinations(
+                tag_metadata=self.metadata, mode="step", count=5
+            )
+            seen.extend(combos)
+        self.assertEqual(seen[:12], self.expected)
+        self.assertEqual(seen[12:24], self.expected)
+
+    def test_shards_partition_the_product(self):
+        collected = []
+        for shard in range(3):
+            _, combos, _, _ = self.node.enumerate_combinations(
+                tag_metadata=self.metadata, shard_index=shard, shard_count=3, count=100
+            )
+            self.assertEqual(len(combos), 4)
+            collected.extend(combos)
+        self.assertEqual(sorted(collected), sorted(self.expected))
+
+    def test_empty_selection(self):
+        result = self.node.enumerate_combinations(
+            tag_metadata=self.metadata, category_list=["missing"]
+        )
+        self.assertEqual(result, ("", [], 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from nodes.tag_coverage import CoverageTracker, FenwickTree
+
+
+class TestFenwickTree(unittest.TestCase):
+    def test_find_matches_linear_scan(self):
+        rng = random.Random(3)
+        weights = [rng.random() for _ in range(37)]
+        tree = FenwickTree(weights)
+        tree.set(5, 0.0)
+        weights[5] = 0.0
+        self.assertAlmostEqual(tree.total(), sum(weights))
+        for _ in range(200):
+            target = rng.random() * sum(weights)
+            running = 0.0
+            for expected, weight in enumerate(weights):
+                running += weight
+                if running > target:
+                    break
+            self.assertEqual(tree.find(target), expected)
+
+
+class TestCoverageTracker(unittest.TestCase):
+    def test_prefers_least_used(self):
+        tracker = CoverageTracker(4, counts=[10, 10, 10, 0], strength=5.0)
+        rng = random.Random(1)
+        picks = [tracker.draw(1, rng)[0] for _ in range(10)]
+        self.assertEqual(picks[:5].count(3), 5)
+        self.assertEqual(tracker.floor, 10)
+
+    def test_unique_draw_has_no_duplicates(self):
+        tracker = CoverageTracker(5)
+        drawn = tracker.draw(5, random.Random(2))
+        self.assertEqual(sorted(drawn), [0, 1, 2, 3, 4])
+        self.assertEqual(tracker.counts, [1] * 5)
+        self.assertEqual(tracker.floor, 1)
+
+    def test_state_round_trip(self):
+        tracker = CoverageTracker(3)
+        tracker.draw(2, random.Random(4))
+        restored = CoverageTracker(3, counts=tracker.state()["counts"])
+        self.assertEqual(restored.counts, tracker.counts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 import os
+import shutil
 import tempfile
 import unittest
+from unittest import mock
 
 from nodes.tag_sampler import ICHIS_Tag_Sampler
 from nodes.tag_category_select import ICHIS_Tag_Category_Select
@@ -386,5 +388,178 @@ class TestTagSampler(unittest.TestCase):
             os.remove(path)
 
 
+class TestTagSamplerStatefulModes(unittest.TestCase):
+    def setUp(self):
+        ICHIS_Tag_File_Loader.clear_cache()
+        ICHIS_Tag_Sampler.clear_state()
+        self.state_dir = tempfile.mkdtemp()
+        self._old_state_dir = os.environ.get("ICHIS_STATE_DIR")
+        os.environ["ICHIS_STATE_DIR"] = self.state_dir
+        self.node = ICHIS_Tag_Sampler()
+        self.loader = ICHIS_Tag_File_Loader()
+        fd, self.path = tempfile.mkstemp(suffix=".csv", text=True)
+        os.close(fd)
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("category,tag\n" + "".join(f"misc,t{i}\n" for i in range(10)))
+        self.metadata, *_ = self.loader.load_tags(file_path=self.path)
+
+    def tearDown(self):
+        ICHIS_Tag_Sampler.clear_state()
+        if self._old_state_dir is None:
+            os.environ.pop("ICHIS_STATE_DIR", None)
+        else:
+            os.environ["ICHIS_STATE_DIR"] = self._old_state_dir
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+        os.remove(self.path)
+
+    def _draw(self, **kwargs):
+        params = dict(
+            tag_metadata=self.metadata,
+            min_count=3,
+            max_count=3,
+            seed=5,
+            sampling_mode="epoch",
+        )
+        params.update(kwargs)
+        result = self.node.sample_tags(**params)
+        return result if params.get("batch_size", 1) > 1 else result[2]
+
+    def test_every_tag_used_before_repeats(self):
+        drawn = []
+        for _ in range(3):
+            drawn.extend(self._draw())
+        self.assertEqual(len(drawn), 9)
+        self.assertEqual(len(set(drawn)), 9)
+        # Fourth draw straddles the epoch boundary but stays unique
+        straddle = self._draw()
+        self.assertEqual(len(set(straddle)), 3)
+        self.assertEqual(set(drawn) | set(straddle), {f"t{i}" for i in range(10)})
+
+    def test_cursor_survives_restart(self):
+        first = self._draw()
+        second = self._draw()
+        ICHIS_Tag_Sampler.clear_state()  # simulate a ComfyUI restart
+        self.assertTrue(os.listdir(self.state_dir))
+        resumed = self._draw()
+        ICHIS_Tag_Sampler.clear_state()
+        for f in os.listdir(self.state_dir):
+            os.remove(os.path.join(self.state_dir, f))
+        replay = [self._draw() for _ in range(3)]
+        self.assertEqual(replay, [first, second, resumed])
+
+    def test_state_from_other_algorithm_is_reshuffled(self):
+        first = self._draw()
+        ICHIS_Tag_Sampler.clear_state()
+        store = ICHIS_Tag_Sampler._EPOCH_STORE
+        for key, state in list(store._ensure_loaded().items()):
+            # A cursor persisted by a generator that no longer exists
+            store.set(key, dict(state, algorithm="stdlib-random"))
+        store.flush()
+        ICHIS_Tag_Sampler.clear_state()
+        self.assertEqual(self._draw(), first)
+
+    def test_epoch_state_keeps_most_recent_selections(self):
+        with mock.patch.object(ICHIS_Tag_Sampler, "_EPOCH_LIMIT", 3):
+            for seed in range(1, 8):
+                self._draw(seed=seed)
+            self._draw(seed=7)
+        self.assertLessEqual(len(ICHIS_Tag_Sampler._EPOCH_BAGS), 3)
+        states = dict(ICHIS_Tag_Sampler._EPOCH_STORE.items())
+        self.assertEqual(sorted((state["seed"], state["cursor"]) for state in states.values()),
+                         [(5, 3), (6, 3), (7, 6)])
+
+    def test_reset_state_restarts_epoch(self):
+        first = self._draw()
+        self._draw()
+        self.assertEqual(self._draw(reset_state=True), first)
+
+    def test_persist_disabled_writes_nothing(self):
+        self._draw(persist_state=False)
+        self._draw(sampling_mode="coverage", persist_state=False)
+        self.assertEqual(os.listdir(self.state_dir), [])
+
+    def test_no_repeat_combinations_across_runs(self):
+        seen = set()
+        # C(10, 2) = 45 combinations; drawing 30 should never repeat
+        for _ in range(30):
+            combo = frozenset(self._draw(min_count=2, max_count=2, no_repeat_combinations=True))
+            self.assertNotIn(combo, seen)
+            seen.add(combo)
+        ICHIS_Tag_Sampler.clear_state()  # persisted filter is reloaded from disk
+        combo = frozenset(self._draw(min_count=2, max_count=2, no_repeat_combinations=True))
+        self.assertNotIn(combo, seen)
+
+    def test_seen_filter_is_written_every_n_adds(self):
+        seen_dir = os.path.join(self.state_dir, "tag_sampler_seen")
+        with mock.patch.object(ICHIS_Tag_Sampler, "_SEEN_SAVE_EVERY", 4):
+            for _ in range(3):
+                self._draw(min_count=2, max_count=2, no_repeat_combinations=True)
+            self.assertFalse(os.path.isdir(seen_dir))
+            self._draw(min_count=2, max_count=2, no_repeat_combinations=True)
+            self.assertEqual(len(os.listdir(seen_dir)), 1)
+
+    def test_cached_seen_filter_follows_exact_limit(self):
+        for _ in range(3):
+            self._draw(min_count=2, max_count=2, no_repeat_combinations=True)
+        (seen,) = ICHIS_Tag_Sampler._SEEN_FILTERS.values()
+        self.assertTrue(seen.is_exact)
+        self._draw(min_count=2, max_count=2, no_repeat_combinations=True, dedupe_exact_limit=0)
+        self.assertEqual(seen.exact_limit, 0)
+        self.assertFalse(seen.is_exact)
+
+    def test_batch_mode_returns_one_entry_per_prompt(self):
+        tags, count, prompts = self._draw(
+            sampling_mode="random",
+            batch_size=6,
+            min_count=1,
+            max_count=4,
+            count_distribution="histogram",
+            count_histogram="2:1, 3:1",
+        )
+        self.assertEqual(count, 6)
+        self.assertEqual(tags.split("\n"), prompts)
+        for prompt in prompts:
+            self.assertIn(len(prompt.split(", ")), (2, 3))
+
+    def test_batch_mode_keeps_empty_prompts(self):
+        tags, count, prompts = self._draw(
+            sampling_mode="random",
+            batch_size=12,
+            min_count=0,
+            max_count=2,
+            count_distribution="histogram",
+            count_histogram="0:1, 2:1",
+        )
+        self.assertEqual(count, 12)
+        self.assertEqual(len(prompts), 12)
+        self.assertEqual(tags.split("\n"), prompts)
+        self.assertIn("", prompts)
+        for prompt in prompts:
+            self.assertIn(len(prompt.split(", ")) if prompt else 0, (0, 2))
+
+    def test_batch_epoch_covers_pool(self):
+        _, count, prompts = self._draw(batch_size=5, min_count=2, max_count=2)
+        self.assertEqual(count, 5)
+        drawn = [tag for prompt in prompts for tag in prompt.split(", ")]
+        self.assertEqual(sorted(drawn), sorted(f"t{i}" for i in range(10)))
+
+    def test_coverage_mode_balances_usage(self):
+        counts = {f"t{i}": 0 for i in range(10)}
+        for _ in range(50):
+            for tag in self._draw(sampling_mode="coverage", seed=11, min_count=1, max_count=2):
+                counts[tag] += 1
+        self.assertLessEqual(max(counts.values()) - min(counts.values()), 3)
+
+    def test_coverage_counters_persist_and_reset(self):
+        for _ in range(4):
+            self._draw(sampling_mode="coverage")
+        ICHIS_Tag_Sampler.clear_state()
+        (tracker_state,) = ICHIS_Tag_Sampler._COVERAGE_STORE._ensure_loaded().values()
+        self.assertEqual(sum(tracker_state["counts"]), 12)
+        self._draw(sampling_mode="coverage", reset_state=True)
+        (tracker_state,) = ICHIS_Tag_Sampler._COVERAGE_STORE._ensure_loaded().values()
+        self.assertEqual(sum(tracker_state["counts"]), 3)
+
+
 if __name__ == "__main__":
     unittest.main()
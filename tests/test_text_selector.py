@@ -1,5 +1,24 @@
+import os
+import random
+import shutil
+import tempfile
 import unittest
+from types import SimpleNamespace
+from unittest import mock
+from nodes import segment_directory
+from nodes.segment_directory import clear_segment_directories, get_segment_directory
+from nodes.segment_file import close_segment_files, get_segment_file
+from nodes.state_store import STATE_DIR_ENV
 from nodes.text_selector import ICHIS_Text_Selector
+from nodes.interval_set import IntervalSet
+from nodes.text_segments import (
+    index_segments,
+    parse_filter,
+    parse_marker,
+    parse_segments,
+    resolve_available_indices,
+    strip_marker,
+)
 
 class TestTextSelector(unittest.TestCase):
     def setUp(self):
@@ -11,7 +30,7 @@ class TestTextSelector(unittest.TestCase):
         # Test normal mode selection
         text = "@1 First text\n@2 Second text\n@3 Third text"
         result = self.node.select_text(text, mode="normal", index=2)
-        self.assertEqual(result, ("Second text", 2))
+        self.assertEqual(result[:2], ("Second text", 2))
     
     def test_step_mode(self):
         # Test step mode progression
@@ -19,19 +38,19 @@ class TestTextSelector(unittest.TestCase):
         
         # First step
         result1 = self.node.select_text(text, mode="step")
-        self.assertEqual(result1, ("First text", 1))
+        self.assertEqual(result1[:2], ("First text", 1))
         
         # Second step
         result2 = self.node.select_text(text, mode="step")
-        self.assertEqual(result2, ("Second text", 2))
+        self.assertEqual(result2[:2], ("Second text", 2))
         
         # Third step
         result3 = self.node.select_text(text, mode="step")
-        self.assertEqual(result3, ("Third text", 3))
+        self.assertEqual(result3[:2], ("Third text", 3))
         
         # Fourth step (should wrap around)
         result4 = self.node.select_text(text, mode="step")
-        self.assertEqual(result4, ("First text", 1))
+        self.assertEqual(result4[:2], ("First text", 1))
     
     def test_step_mode_reset(self):
         # Test step mode reset
@@ -42,7 +61,7 @@ class TestTextSelector(unittest.TestCase):
         
         # Reset and verify it goes back to first item
         result = self.node.select_text(text, mode="step", reset_step=True)
-        self.assertEqual(result, ("First text", 1))
+        self.assertEqual(result[:2], ("First text", 1))
     
     def test_random_mode(self):
         # Test random mode with seed
@@ -63,22 +82,22 @@ class TestTextSelector(unittest.TestCase):
         
         # Test index too low
         result_low = self.node.select_text(text, mode="normal", index=0)
-        self.assertEqual(result_low, ("First text", 1))
+        self.assertEqual(result_low[:2], ("First text", 1))
         
         # Test index too high
         result_high = self.node.select_text(text, mode="normal", index=4)
-        self.assertEqual(result_high, ("Third text", 3))
+        self.assertEqual(result_high[:2], ("Third text", 3))
     
     def test_empty_input(self):
         # Test empty input handling
         result = self.node.select_text("", mode="normal")
-        self.assertEqual(result, ("", 0))
+        self.assertEqual(result[:2], ("", 0))
     
     def test_no_markers(self):
         # Test text without @ markers
         text = "First text\nSecond text\nThird text"
         result = self.node.select_text(text, mode="normal", index=1)
-        self.assertEqual(result, (text.strip(), 1))
+        self.assertEqual(result[:2], (text.strip(), 1))
     
     def test_exclude_indices(self):
         # Test exclusion functionality with minus prefix
@@ -91,7 +110,7 @@ class TestTextSelector(unittest.TestCase):
             index=2,
             filter_indices="-[1,3]"
         )
-        self.assertEqual(result, ("Second text", 2))
+        self.assertEqual(result[:2], ("Second text", 2))
         
         # Test step mode with excluded indices
         result_step = self.node.select_text(
@@ -99,7 +118,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="-[1,3]"
         )
-        self.assertEqual(result_step, ("Second text", 2))
+        self.assertEqual(result_step[:2], ("Second text", 2))
         
     def test_include_indices(self):
         # Test inclusion functionality with plus prefix
@@ -112,7 +131,7 @@ class TestTextSelector(unittest.TestCase):
             index=2,
             filter_indices="+[2,4]"
         )
-        self.assertEqual(result, ("Second text", 2))
+        self.assertEqual(result[:2], ("Second text", 2))
         
         # Test step mode with included indices
         self.node.current_step_index = 0
@@ -121,7 +140,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="+[2,4]"
         )
-        self.assertEqual(result_step1, ("Second text", 2))
+        self.assertEqual(result_step1[:2], ("Second text", 2))
         
         # Second step
         result_step2 = self.node.select_text(
@@ -129,7 +148,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="+[2,4]"
         )
-        self.assertEqual(result_step2, ("Fourth text", 4))
+        self.assertEqual(result_step2[:2], ("Fourth text", 4))
         
         # Third step (should wrap around)
         result_step3 = self.node.select_text(
@@ -137,7 +156,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="+[2,4]"
         )
-        self.assertEqual(result_step3, ("Second text", 2))
+        self.assertEqual(result_step3[:2], ("Second text", 2))
         
     def test_implicit_inclusion(self):
         # Test implicit inclusion (no + prefix)
@@ -150,7 +169,7 @@ class TestTextSelector(unittest.TestCase):
             index=3,
             filter_indices="[1,3]"
         )
-        self.assertEqual(result, ("Third text", 3))
+        self.assertEqual(result[:2], ("Third text", 3))
         
     def test_closest_index_selection(self):
         # Test that in normal mode, if selected index isn't available, it chooses closest one
@@ -190,7 +209,7 @@ class TestTextSelector(unittest.TestCase):
         )
         # Should exclude indices 2, 3, 4, so available indices are 1, 5, 6
         # With index=1, should select First text
-        self.assertEqual(result_range, ("First text", 1))
+        self.assertEqual(result_range[:2], ("First text", 1))
         
         # Test mixed notation
         result_mixed = self.node.select_text(
@@ -201,7 +220,7 @@ class TestTextSelector(unittest.TestCase):
         )
         # Should exclude indices 1, 3, 4, 5, so available indices are 2, 6
         # With index=6, should select Sixth text
-        self.assertEqual(result_mixed, ("Sixth text", 6))
+        self.assertEqual(result_mixed[:2], ("Sixth text", 6))
         
         # Test step mode with range exclusion
         # Set up test with exclusions 2-5
@@ -212,7 +231,7 @@ class TestTextSelector(unittest.TestCase):
             filter_indices="-[2-5]"
         )
         # First step should give first item
-        self.assertEqual(result_step1, ("First text", 1))
+        self.assertEqual(result_step1[:2], ("First text", 1))
         
         # Second step should give sixth item
         result_step2 = self.node.select_text(
@@ -220,7 +239,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="-[2-5]"
         )
-        self.assertEqual(result_step2, ("Sixth text", 6))
+        self.assertEqual(result_step2[:2], ("Sixth text", 6))
         
         # Third step should wrap around to first item
         result_step3 = self.node.select_text(
@@ -228,7 +247,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="-[2-5]"
         )
-        self.assertEqual(result_step3, ("First text", 1))
+        self.assertEqual(result_step3[:2], ("First text", 1))
         
     def test_include_indices_range_notation(self):
         # Test include_indices with range notation
@@ -243,7 +262,7 @@ class TestTextSelector(unittest.TestCase):
         )
         # Should include only indices 1, 2, 3
         # With index=2, should select Second text
-        self.assertEqual(result_range, ("Second text", 2))
+        self.assertEqual(result_range[:2], ("Second text", 2))
         
         # Test mixed notation
         result_mixed = self.node.select_text(
@@ -254,7 +273,7 @@ class TestTextSelector(unittest.TestCase):
         )
         # Should include indices 1, 3, 4, 5
         # With index=4, it should select the Fourth text
-        self.assertEqual(result_mixed, ("Fourth text", 4))
+        self.assertEqual(result_mixed[:2], ("Fourth text", 4))
         
         # Test step mode with range inclusion
         # Set up test with inclusions 1,6
@@ -265,7 +284,7 @@ class TestTextSelector(unittest.TestCase):
             filter_indices="+[1,6]"
         )
         # First step should give first item
-        self.assertEqual(result_step1, ("First text", 1))
+        self.assertEqual(result_step1[:2], ("First text", 1))
         
         # Second step should give sixth item
         result_step2 = self.node.select_text(
@@ -273,7 +292,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="+[1,6]"
         )
-        self.assertEqual(result_step2, ("Sixth text", 6))
+        self.assertEqual(result_step2[:2], ("Sixth text", 6))
         
         # Third step should wrap around to first item
         result_step3 = self.node.select_text(
@@ -281,7 +300,7 @@ class TestTextSelector(unittest.TestCase):
             mode="step",
             filter_indices="+[1,6]"
         )
-        self.assertEqual(result_step3, ("First text", 1))
+        self.assertEqual(result_step3[:2], ("First text", 1))
         
     def test_empty_filter(self):
         # Test that empty filter uses all indices
@@ -294,7 +313,7 @@ class TestTextSelector(unittest.TestCase):
             index=2,
             filter_indices=""
         )
-        self.assertEqual(result, ("Second text", 2))
+        self.assertEqual(result[:2], ("Second text", 2))
         
         # Empty inclusion list should use all indices
         result = self.node.select_text(
@@ -303,7 +322,7 @@ class TestTextSelector(unittest.TestCase):
             index=2,
             filter_indices="+[]"
         )
-        self.assertEqual(result, ("Second text", 2))
+        self.assertEqual(result[:2], ("Second text", 2))
         
         # Empty exclusion list should use all indices
         result = self.node.select_text(
@@ -312,7 +331,328 @@ class TestTextSelector(unittest.TestCase):
             index=2,
             filter_indices="-[]"
         )
-        self.assertEqual(result, ("Second text", 2))
+        self.assertEqual(result[:2], ("Second text", 2))
+
+    def test_parsed_segments_and_filters_are_cached(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 2001))
+        self.assertIs(parse_segments(text), parse_segments(text))
+        self.assertEqual(len(parse_segments(text)), 2000)
+        self.assertIs(parse_filter("-[2-5]"), parse_filter("-[2-5]"))
+        self.assertEqual(list(resolve_available_indices(6, "-[2-5]")), [1, 6])
+        self.assertEqual(list(resolve_available_indices(6, "+[9]")), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(list(resolve_available_indices(6, "bogus")), [1, 2, 3, 4, 5, 6])
+        result = self.node.select_text(text, mode="normal", index=1500)
+        self.assertEqual(result[:2], ("Entry 1500", 1500))
+
+    def test_huge_filter_ranges(self):
+        text = "@1 First text\n@2 Second text\n@3 Third text"
+        result = self.node.select_text(text, mode="step", filter_indices="-[2-100000000]")
+        self.assertEqual(result[:2], ("First text", 1))
+        result = self.node.select_text(text, mode="normal", index=3, filter_indices="+[2-100000000]")
+        self.assertEqual(result[:2], ("Third text", 3))
+
+    def test_count_single_matches_list_outputs(self):
+        text = "@1 First text\n@2 Second text\n@3 Third text"
+        result = self.node.select_text(text, mode="normal", index=2)
+        self.assertEqual(result, ("Second text", 2, ["Second text"], [2]))
+
+    def test_count_normal_wraps_over_filtered_indices(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 7))
+        joined, first, texts, indices = self.node.select_text(
+            text, mode="normal", index=3, filter_indices="-[4]", count=4
+        )
+        self.assertEqual(indices, [3, 5, 6, 1])
+        self.assertEqual(texts, ["Entry 3", "Entry 5", "Entry 6", "Entry 1"])
+        self.assertEqual(joined, "Entry 3\nEntry 5\nEntry 6\nEntry 1")
+        self.assertEqual(first, 3)
+
+    def test_count_step_advances_cursor(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 6))
+        first = self.node.select_text(text, mode="step", filter_indices="-[2]", count=3)[3]
+        second = self.node.select_text(text, mode="step", filter_indices="-[2]", count=3)[3]
+        self.assertEqual(first, [1, 3, 4])
+        self.assertEqual(second, [5, 1, 3])
+        self.assertEqual(self.node.select_text(text, mode="step", filter_indices="-[2]")[1], 4)
+
+    def test_count_random_with_and_without_replacement(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 11))
+        single = self.node.select_text(text, mode="random", seed=42)
+        batch = self.node.select_text(text, mode="random", seed=42, count=20)
+        self.assertEqual(len(batch[3]), 20)
+        self.assertEqual(batch[3][0], single[1])
+        unique = self.node.select_text(text, mode="random", seed=42, count=20,
+                                       filter_indices="+[2-8]", replacement=False)[3]
+        self.assertEqual(sorted(unique), list(range(2, 9)))
+        again = self.node.select_text(text, mode="random", seed=42, count=20,
+                                      filter_indices="+[2-8]", replacement=False)[3]
+        self.assertEqual(unique, again)
+
+    def test_markers_carry_label_and_weight(self):
+        self.assertEqual(parse_marker("@sunset:3 warm light"), ("sunset", 3.0))
+        self.assertEqual(parse_marker("@2 Second"), ("2", 1.0))
+        self.assertEqual(parse_marker("@a:b text"), ("a:b", 1.0))
+        self.assertEqual(parse_marker("@night:0.5"), ("night", 0.5))
+        self.assertEqual(parse_marker("plain text"), ("", 1.0))
+        text = "@Sunset:3 warm light\n@night:0 dark sky\n@dawn pale"
+        segment_index = index_segments(text)
+        self.assertIs(segment_index, index_segments(text))
+        self.assertEqual(segment_index.labels, {"sunset": 1, "night": 2, "dawn": 3})
+        self.assertEqual(segment_index.prefix, (0.0, 3.0, 3.0, 4.0))
+        self.assertEqual(segment_index.pick(0.8, IntervalSet.span(1, 3)), 3)
+        self.assertEqual(segment_index.pick(0.5, IntervalSet.span(2, 3)), 3)
+        self.assertIsNone(segment_index.pick(0.5, IntervalSet.span(2, 2)))
+
+    def test_select_by_label(self):
+        text = "@sunset:3 warm light\n@night dark sky\n@dawn pale"
+        self.assertEqual(self.node.select_text(text, label="NIGHT")[:2], ("dark sky", 2))
+        self.assertEqual(self.node.select_text(text, label="dawn", count=2)[3], [3, 1])
+        self.assertEqual(self.node.select_text(text, label="missing", index=1)[:2], ("warm light", 1))
+
+    def test_marker_on_its_own_line(self):
+        text = "@sunset:3\nA red sky over the sea\n@dawn:1\nMorning light"
+        self.assertEqual(self.node.select_text(text, label="sunset")[:2], ("A red sky over the sea", 1))
+        self.assertEqual(self.node.select_text(text, label="dawn")[:2], ("Morning light", 2))
+        self.assertEqual(strip_marker("@dawn:1\tMorning light"), "Morning light")
+        self.assertEqual(strip_marker("@only"), "only")
+
+    def test_weighted_mode_follows_weights_and_filters(self):
+        text = "@a:6 A\n@b:0 B\n@c:2 C\n@d:2 D"
+        picks = self.node.select_text(text, mode="weighted", seed=5, count=1000)[3]
+        self.assertNotIn(2, picks)
+        self.assertGreater(picks.count(1), 500)
+        self.assertEqual(picks, self.node.select_text(text, mode="weighted", seed=5, count=1000)[3])
+        filtered = self.node.select_text(text, mode="weighted", seed=5, count=200, filter_indices="-[1]")[3]
+        self.assertEqual(set(filtered), {3, 4})
+        only_zero = self.node.select_text(text, mode="weighted", seed=5, filter_indices="+[2]")
+        self.assertEqual(only_zero[:2], ("B", 2))
+
+    def test_shuffle_mode_covers_library_before_repeating(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 8))
+        picks = [self.node.select_text(text, mode="shuffle", seed=3)[1] for _ in range(14)]
+        self.assertEqual(sorted(picks[:7]), list(range(1, 8)))
+        self.assertEqual(sorted(picks[7:]), list(range(1, 8)))
+        self.assertNotEqual(picks[:7], picks[7:])
+        batch = ICHIS_Text_Selector().select_text(text, mode="shuffle", seed=3, count=14)[3]
+        self.assertEqual(batch, picks)
+
+    def test_shuffle_mode_respects_filters_and_reset(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 11))
+        first = self.node.select_text(text, mode="shuffle", seed=9, count=6, filter_indices="+[2-7]")[3]
+        self.assertEqual(sorted(first), list(range(2, 8)))
+        again = self.node.select_text(text, mode="shuffle", seed=9, count=6, filter_indices="+[2-7]",
+                                      reset_step=True)[3]
+        self.assertEqual(again, first)
+        other_seed = self.node.select_text(text, mode="shuffle", seed=1, count=6, filter_indices="+[2-7]")[3]
+        self.assertNotEqual(other_seed, first)
+
+    def test_shuffle_mode_over_huge_filter(self):
+        text = "\n".join(f"@{i} Entry {i}" for i in range(1, 6))
+        picks = [self.node.select_text(text, mode="shuffle", seed=2, filter_indices="-[3-100000000]")[1]
+                 for _ in range(4)]
+        self.assertEqual(sorted(picks[:2]), [1, 2])
+        self.assertEqual(sorted(picks[2:]), [1, 2])
+
+
+class TestTextSelectorFileSource(unittest.TestCase):
+    def setUp(self):
+        self.node = ICHIS_Text_Selector()
+        ICHIS_Text_Selector.current_step_index = 0
+        self.tmpdir = tempfile.mkdtemp()
+        self._previous_state_dir = os.environ.get(STATE_DIR_ENV)
+        os.environ[STATE_DIR_ENV] = os.path.join(self.tmpdir, "state")
+
+    def tearDown(self):
+        close_segment_files()
+        if self._previous_state_dir is None:
+            os.environ.pop(STATE_DIR_ENV, None)
+        else:
+            os.environ[STATE_DIR_ENV] = self._previous_state_dir
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, content, name="library.txt"):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            fh.write(content)
+        return path
+
+    def test_file_matches_inline_text(self):
+        content = "intro line\n\n  @1 First text\r\n  more\n\n@2 Second ünïcode\n   @3 Third text\n\n"
+        path = self._write(content)
+        for index in range(1, 5):
+            inline = self.node.select_text(content, mode="normal", index=index)
+            from_file = self.node.select_text("", mode="normal", index=index, source="file", file_path=path)
+            self.assertEqual(from_file, inline)
+        self.assertEqual(len(get_segment_file(path)), 4)
+        index_dir = os.path.join(self.tmpdir, "state", "text_index")
+        self.assertEqual(len(os.listdir(index_dir)), 1)
+
+    def test_file_markers_match_inline_parsing(self):
+        rng = random.Random(5)
+        blanks = [c for c in map(chr, range(0x3001)) if c.isspace()] + ["\ufeff", "\x00", "x"]
+        cases = ["\x1c@u\r\n\x1c@u", "\ufeff@sunset:3 red sky", "\ufeff\n\xa0\n@a\n\u3000@b", "\u2028\n@a"]
+        for _ in range(200):
+            cases.append("".join(
+                rng.choice(["@a ", "\n", "b", rng.choice(blanks)]) for _ in range(rng.randint(1, 12))
+            ))
+        for number, content in enumerate(cases):
+            path = os.path.join(self.tmpdir, f"parity{number}.txt")
+            with open(path, "wb") as fh:
+                fh.write(content.encode("utf-8"))
+            inline = list(parse_segments(content[1:] if content.startswith("\ufeff") else content))
+            self.assertEqual(list(get_segment_file(path)), inline, repr(content))
+        path = os.path.join(self.tmpdir, "parity1.txt")
+        self.assertEqual(self.node.select_text("", label="sunset", source="file", file_path=path)[:2], ("red sky", 1))
+
+    def _index_files(self):
+        index_dir = os.path.join(self.tmpdir, "state", "text_index")
+        return [name for _, _, names in os.walk(index_dir) for name in names]
+
+    def test_file_changes_are_reindexed(self):
+        path = self._write("@1 Old text\n")
+        self.assertEqual(self.node.select_text("", index=1, source="file", file_path=path)[:2], ("Old text", 1))
+        self._write("@1 New text\n@2 Another\n")
+        self.assertEqual(self.node.select_text("", index=2, source="file", file_path=path)[:2], ("Another", 2))
+        # The superseded index is pruned instead of accumulating
+        self.assertEqual(len(self._index_files()), 1)
+
+    def test_large_index_input(self):
+        self.assertEqual(ICHIS_Text_Selector.INPUT_TYPES()["optional"]["index"][1]["max"], 0xFFFFFFFF)
+        path = self._write("\n".join(f"@{i} Entry {i}" for i in range(1, 1501)))
+        self.assertEqual(self.node.select_text("", index=1500, source="file", file_path=path)[:2], ("Entry 1500", 1500))
+
+    def test_missing_and_empty_files(self):
+        missing = os.path.join(self.tmpdir, "missing.txt")
+        self.assertEqual(self.node.select_text("", source="file", file_path=missing), ("", 0, [], []))
+        empty = self._write("", name="empty.txt")
+        self.assertEqual(self.node.select_text("", source="file", file_path=empty), ("", 0, [], []))
+
+    def test_file_labels_and_weights(self):
+        path = self._write("@sunset:3 warm light\n@night:0 dark sky\n@dawn pale\n")
+        self.assertEqual(self.node.select_text("", label="dawn", source="file", file_path=path)[:2], ("pale", 3))
+        picks = self.node.select_text("", mode="weighted", seed=3, count=50, source="file", file_path=path)[3]
+        self.assertNotIn(2, picks)
+
+    def test_step_mode_over_file(self):
+        path = self._write("\n".join(f"@{i} Entry {i}" for i in range(1, 6)))
+        picks = [self.node.select_text("", mode="step", filter_indices="-[2-3]", source="file", file_path=path)[1]
+                 for _ in range(4)]
+        self.assertEqual(picks, [1, 4, 5, 1])
+
+
+class TestTextSelectorDirectorySource(unittest.TestCase):
+    def setUp(self):
+        self.node = ICHIS_Text_Selector()
+        self.tmpdir = tempfile.mkdtemp()
+        self.library = os.path.join(self.tmpdir, "prompts")
+        os.makedirs(os.path.join(self.library, "nested"))
+        self._previous_state_dir = os.environ.get(STATE_DIR_ENV)
+        os.environ[STATE_DIR_ENV] = os.path.join(self.tmpdir, "state")
+        self._write("b_city.txt", "@1 neon streets\n@2 rainy alley")
+        self._write("a_forest.txt", "@1 misty pines")
+        self._write(os.path.join("nested", "c_sea.txt"), "@1 calm waves\n@2 storm\n@3 lighthouse")
+        self._write("notes.md", "@1 not a prompt")
+        # Tests edit files between calls; refresh fully every time unless a test sets a clock
+        self._intervals = mock.patch.multiple(segment_directory, REFRESH_INTERVAL=0.0, STAT_INTERVAL=0.0)
+        self._intervals.start()
+
+    def tearDown(self):
+        self._intervals.stop()
+        clear_segment_directories()
+        close_segment_files()
+        if self._previous_state_dir is None:
+            os.environ.pop(STATE_DIR_ENV, None)
+        else:
+            os.environ[STATE_DIR_ENV] = self._previous_state_dir
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.library, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        return path
+
+    def _select(self, **kwargs):
+        return self.node.select_text("", source="directory", file_path=self.library, **kwargs)
+
+    def test_segments_across_files_in_path_order(self):
+        texts = self._select(count=6)[2]
+        self.assertEqual(texts, ["misty pines", "neon streets", "rainy alley",
+                                 "calm waves", "storm", "lighthouse"])
+        self.assertEqual(self._select(index=5)[:2], ("storm", 5))
+
+    def test_files_as_entries_with_stem_labels(self):
+        texts = self._select(count=3, directory_entries="file")[2]
+        self.assertEqual(texts, ["misty pines", "neon streets\n@2 rainy alley", "calm waves\n@2 storm\n@3 lighthouse"])
+        self.assertEqual(self._select(label="b_city", directory_entries="file")[1], 2)
+
+    def test_added_file_is_indexed_without_recounting_others(self):
+        library = get_segment_directory(self.library)
+        counted = dict(library._counts)
+        self._write("d_desert.txt", "@1 dunes")
+        self.assertEqual(self._select(count=7)[2][3], "dunes")
+        for path, known in counted.items():
+            self.assertIs(library._counts[path], known)
+        self.assertFalse(library.refresh())
+
+    def test_file_edited_in_place_is_recounted(self):
+        self.assertEqual(len(self._select(count=6)[2]), 6)
+        # Rewriting a file keeps its directory's mtime; refresh() re-stats it
+        self._write("a_forest.txt", "@1 misty pines\n@2 old oak")
+        self.assertEqual(self._select(count=3)[2], ["misty pines", "old oak", "neon streets"])
+        self.assertEqual(len(get_segment_directory(self.library)), 7)
+
+    def test_step_mode_and_missing_directory(self):
+        picks = [self._select(mode="step", filter_indices="-[2-3]")[1] for _ in range(5)]
+        self.assertEqual(picks, [1, 4, 5, 6, 1])
+        missing = os.path.join(self.tmpdir, "missing")
+        self.assertEqual(self.node.select_text("", source="directory", file_path=missing), ("", 0, [], []))
+
+    def test_empty_path_is_rejected(self):
+        cwd = os.getcwd()
+        os.chdir(self.library)
+        try:
+            with self.assertRaises(NotADirectoryError):
+                get_segment_directory("  ")
+            self.assertEqual(self.node.select_text("", source="directory", file_path=""), ("", 0, [], []))
+            for source in ("file", "directory"):
+                self.assertIsNone(ICHIS_Text_Selector.IS_CHANGED(source=source, file_path=""))
+        finally:
+            os.chdir(cwd)
+
+    def test_refresh_is_rate_limited(self):
+        clock = [100.0]
+        fake_time = SimpleNamespace(monotonic=lambda: clock[0])
+        with mock.patch.multiple(segment_directory, REFRESH_INTERVAL=1.0, STAT_INTERVAL=10.0, time=fake_time):
+            library = get_segment_directory(self.library)
+            self.assertEqual(len(library), 6)
+            self._write("a_forest.txt", "@1 misty pines\n@2 old oak")
+            with mock.patch.object(os, "stat", wraps=os.stat) as stat:
+                # IS_CHANGED and the run of the same execution refresh once
+                ICHIS_Text_Selector.IS_CHANGED(source="directory", file_path=self.library)
+                self.assertEqual(self._select(index=2)[0], "neon streets")
+                # Only the file that was read is stat'ed, not every known file
+                stated = {call.args[0] for call in stat.call_args_list if call.args[0].startswith(self.library)}
+                self.assertEqual(stated, {os.path.join(self.library, "b_city.txt")})
+                stat.reset_mock()
+                clock[0] += 2
+                self.assertFalse(library.refresh())
+                # Only directories are stat'ed between full re-stats
+                self.assertTrue(all(os.path.isdir(call.args[0]) for call in stat.call_args_list))
+            clock[0] += 10
+            self.assertTrue(library.refresh())
+            self.assertEqual(len(library), 7)
+
+    def test_reading_an_edited_file_marks_it_for_recount(self):
+        clock = [100.0]
+        fake_time = SimpleNamespace(monotonic=lambda: clock[0])
+        with mock.patch.multiple(segment_directory, REFRESH_INTERVAL=1.0, STAT_INTERVAL=10.0, time=fake_time):
+            library = get_segment_directory(self.library)
+            self._write("a_forest.txt", "@1 misty pines\n@2 old oak")
+            clock[0] += 2
+            self.assertEqual(library[0], "@1 misty pines")
+            self.assertTrue(library.refresh())
+            self.assertEqual(len(library), 7)
+
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()